@@ -0,0 +1,213 @@
+"""
+Agent Config - Hot-reloadable prompt, greeting, providers and endpoints
+=======================================================================
+What Sylvia says and who she talks to lives in agent_config.json (plus the
+instructions file it points to) instead of the code, so it can change without a
+redeploy - which would drop the warm job processes and make the next calls pay for
+cold starts and VAD reloads.
+
+The file is parsed, validated and pre-processed (instructions read, greeting filled
+in, service catalog indexed) into an immutable AgentConfig. ConfigStore hands out
+the current snapshot: every new call checks whether any of the files changed and, if
+so, loads and swaps in the new snapshot; calls already running keep the one they
+started with. An invalid edit is logged and the previous snapshot stays in use.
+
+Keys left out of the file fall back to the environment (LLM_PROVIDERS, ...).
+"""
+
+from dataclasses import dataclass, field
+from string import Formatter
+from types import MappingProxyType
+from typing import Mapping
+from urllib.parse import urlsplit
+import hashlib
+import json
+import logging
+import os
+
+import provider_registry
+from service_catalog import CatalogIndex
+
+logger = logging.getLogger(__name__)
+
+# Tool messages the file must define, and the placeholders each may use
+MESSAGE_FIELDS = {
+    "email_confirmed": set(),
+    "email_correction": set(),
+    "crm_already_sent": set(),
+    "crm_email_unconfirmed": {"spelled_email"},
+    "crm_missing_fields": {"missing"},
+    "crm_needs_contact": set(),
+    "crm_sent": {"company", "intent"},
+    "no_service_match": {"services"},
+}
+
+# Keys the file must set; the others have defaults from the environment
+REQUIRED_KEYS = {"greeting", "instructions_path", "messages"}
+
+
+@dataclass(frozen=True)
+class AgentConfig:
+    """One validated, ready-to-use version of the agent configuration."""
+
+    version: str  # Short hash of the files it was loaded from, for the logs
+    instructions: str
+    greeting: str
+    crm_webhook_url: str
+    llm_providers: str
+    tts_providers: str
+    llm_hedge_after: float
+    tts_hedge_after: float
+    service_catalog: CatalogIndex = field(repr=False)
+    messages: Mapping[str, str] = field(repr=False)
+    sources: tuple[str, ...] = ()  # Files it was loaded from, watched for changes
+
+    @property
+    def provider_settings(self) -> tuple:
+        """Everything the LLM/TTS providers are built from; equal settings can share providers."""
+        return (self.llm_providers, self.tts_providers, self.llm_hedge_after, self.tts_hedge_after)
+
+    @property
+    def fixed_phrases(self) -> list[str]:
+        """What Sylvia says word for word on every call: the greeting and placeholder-free messages."""
+        return [self.greeting] + [text for key, text in self.messages.items() if not MESSAGE_FIELDS[key]]
+
+    def message(self, key: str, **values) -> str:
+        return self.messages[key].format(**values)
+
+
+def _check_providers(key: str, specs, kind: str) -> str:
+    if not isinstance(specs, str) or not provider_registry.split_specs(specs):
+        raise ValueError(f"{key} must be a comma-separated list of providers")
+    for spec in provider_registry.split_specs(specs):
+        try:
+            provider_registry.resolve(kind, spec)  # Checks the name only, nothing is imported
+        except ValueError as e:
+            raise ValueError(f"{key}: {str(e)}") from None
+    return specs
+
+
+def _check_messages(messages) -> dict[str, str]:
+    if not isinstance(messages, dict):
+        raise ValueError("messages must be an object")
+    missing = MESSAGE_FIELDS.keys() - messages.keys()
+    unknown = messages.keys() - MESSAGE_FIELDS.keys()
+    if missing or unknown:
+        raise ValueError(f"messages: missing {sorted(missing)}, unknown {sorted(unknown)}")
+
+    for key, text in messages.items():
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f"messages.{key} must be a non-empty string")
+        used = {name for _, name, _, _ in Formatter().parse(text) if name is not None}
+        if used - MESSAGE_FIELDS[key]:
+            allowed = ", ".join(sorted(MESSAGE_FIELDS[key])) or "none"
+            raise ValueError(f"messages.{key}: unknown placeholders {sorted(used - MESSAGE_FIELDS[key])} (allowed: {allowed})")
+    return messages
+
+
+def load_config(path: str, defaults: dict) -> AgentConfig:
+    """Parse and validate the config file; raises ValueError/OSError if it's unusable."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("top level must be an object")
+    unknown = data.keys() - REQUIRED_KEYS - defaults.keys()
+    missing = REQUIRED_KEYS - data.keys()
+    if unknown or missing:
+        raise ValueError(f"missing keys {sorted(missing)}, unknown keys {sorted(unknown)}")
+    settings = {**defaults, **data}
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    instructions_path = os.path.join(base_dir, settings["instructions_path"])
+    catalog_path = os.path.join(base_dir, settings["service_catalog_path"])
+    sources = (os.path.abspath(path), instructions_path, catalog_path)
+
+    greeting = settings["greeting"]
+    if not isinstance(greeting, str) or not greeting.strip():
+        raise ValueError("greeting must be a non-empty string")
+    with open(instructions_path, encoding="utf-8") as f:
+        instructions_raw = f.read()
+    if not instructions_raw.strip():
+        raise ValueError(f"{instructions_path} is empty")
+
+    url = settings["crm_webhook_url"]
+    parts = urlsplit(url) if isinstance(url, str) else None
+    if parts is None or parts.scheme not in ("http", "https") or not parts.netloc:
+        raise ValueError(f"crm_webhook_url must be an http(s) URL, got {url!r}")
+
+    hedges = {}
+    for key in ("llm_hedge_after", "tts_hedge_after"):
+        value = settings[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ValueError(f"{key} must be a positive number of seconds")
+        hedges[key] = float(value)
+
+    catalog = CatalogIndex.load(catalog_path)
+    if not catalog.services():
+        raise ValueError(f"{catalog_path} has no services")
+
+    # Hash over every source file, so an edit to any of them shows up as a new version
+    digest = hashlib.sha256(raw)
+    for source in sources[1:]:
+        with open(source, "rb") as f:
+            digest.update(f.read())
+
+    return AgentConfig(
+        version=digest.hexdigest()[:8],
+        instructions=instructions_raw.strip().replace("{greeting}", greeting),
+        greeting=greeting,
+        crm_webhook_url=url,
+        llm_providers=_check_providers("llm_providers", settings["llm_providers"], "llm"),
+        tts_providers=_check_providers("tts_providers", settings["tts_providers"], "tts"),
+        service_catalog=catalog,
+        messages=MappingProxyType(_check_messages(settings["messages"])),
+        sources=sources,
+        **hedges,
+    )
+
+
+class ConfigStore:
+    """The current AgentConfig of this process, reloaded when its files change."""
+
+    def __init__(self, path: str, defaults: dict):
+        self.path = path
+        self.defaults = defaults
+        self.reloads = 0
+        # The first load has no fallback - a broken file should stop the worker from starting
+        self._config = load_config(path, defaults)
+        self._stamp = self._fingerprint(self._config.sources)
+        logger.info("Agent config %s loaded from %s", self._config.version, path)
+
+    @staticmethod
+    def _fingerprint(sources: tuple[str, ...]) -> tuple:
+        stamp = []
+        for source in sources:
+            try:
+                stat = os.stat(source)
+                stamp.append((source, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append((source, None, None))
+        return tuple(stamp)
+
+    def current(self) -> AgentConfig:
+        """The latest valid config; a few stat() calls unless something changed."""
+        stamp = self._fingerprint(self._config.sources)
+        if stamp == self._stamp:
+            return self._config
+
+        # Remember the stamp even if loading fails, so a broken file is reported once
+        self._stamp = stamp
+        try:
+            config = load_config(self.path, self.defaults)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error("Keeping agent config %s, %s is invalid: %s", self._config.version, self.path, e)
+            return self._config
+
+        if config.version != self._config.version:
+            logger.info("Agent config reloaded: %s -> %s", self._config.version, config.version)
+            self.reloads += 1
+        if config.sources != self._config.sources:
+            self._stamp = self._fingerprint(config.sources)  # It points at other files now
+        self._config = config
+        return config
@@ -0,0 +1,206 @@
+"""
+Answer Cache - Instant replies to recurring visitor questions
+=============================================================
+Most calls start with the same few questions ("what do you do?", "how much does it
+cost?", "do you build websites?"). Sylvia's llm_node looks the visitor's turn up
+here first and, on a hit, speaks the stored answer without an LLM request.
+
+Questions are matched on the word sets of a normalized transcript (lowercase, no
+punctuation or filler words), so "So what do you guys do?" finds "what do you do"
+but "what did you do?" doesn't. Pronouns and other words that tie a question to the
+conversation have to match exactly: "what is my email?" never gets the answer to
+"what is your email". Answers come from two places:
+
+- curated: faq_answers.json, several phrasings per answer, never expire
+- learned (opt-in): LLM replies to short, tool-free questions on a topic the
+  curated answers already cover, stored in a SQLite database shared by the
+  worker's job processes, with a TTL and LRU eviction. Questions that only make
+  sense in their conversation ("can you repeat that?", "what was my email?") are
+  never learned, since their answers would be replayed to other visitors.
+
+The caller decides when a canned answer would be wrong for the conversation (e.g.
+mid lead capture) and skips the cache for that turn. lookup() and store() block on
+SQLite, so async callers run them in a thread.
+"""
+
+from dataclasses import dataclass
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import latency_metrics
+
+# Words that don't change what's being asked
+FILLER_WORDS = {
+    "actually", "ah", "basically", "er", "guys", "hey", "hi", "hm", "hmm", "just", "like",
+    "ok", "okay", "please", "so", "uh", "um", "well", "yeah",
+}
+
+# Words that don't say what a question is about
+QUESTION_WORDS = {
+    "a", "about", "an", "and", "any", "are", "can", "could", "do", "does", "for", "how", "is",
+    "much", "of", "or", "tell", "the", "to", "what", "when", "where", "which", "who", "why",
+    "will", "with", "would", "you", "your",
+}
+
+# Words that tie a question to the conversation it was asked in
+CONTEXT_WORDS = {
+    "again", "am", "he", "her", "him", "i", "it", "me", "mean", "meant", "mine", "my",
+    "our", "pardon", "really", "repeat", "said", "say", "she", "sorry", "that", "their",
+    "them", "these", "they", "this", "those", "us", "we",
+}
+
+
+def normalize_question(text: str) -> str:
+    words = re.sub(r"[^\w\s]", " ", text.casefold()).split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+
+@dataclass
+class CachedAnswer:
+    question: str  # Normalized question it was stored under
+    answer: str
+    source: str  # "curated" or "learned"
+    similarity: float  # Jaccard similarity of the two questions' word sets
+
+
+def similarity(question: str, known: str) -> float:
+    """How alike two normalized questions are, 0.0 if they differ in a conversation-bound word."""
+    asked, words = set(question.split()), set(known.split())
+    if asked & CONTEXT_WORDS != words & CONTEXT_WORDS:
+        return 0.0
+    return len(asked & words) / len(asked | words)
+
+
+class AnswerCache:
+    """Curated and learned answers, looked up by the word sets of the question."""
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float,
+        max_entries: int = 256,
+        min_similarity: float = 0.85,
+        curated: dict[str, str] | None = None,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.min_similarity = min_similarity
+        self.curated = curated or {}  # normalized question -> answer
+        # Topics a learned answer has to be about: the content words of the curated questions
+        self.topics = {word for question in self.curated for word in question.split()}
+        self.topics -= QUESTION_WORDS | CONTEXT_WORDS
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()  # One connection, used from the caller's worker threads
+
+    @staticmethod
+    def load_curated(path: str) -> dict[str, str]:
+        """normalized question -> answer, from [{"questions": [...], "answer": "..."}]."""
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        return {
+            normalize_question(question): entry["answer"]
+            for entry in entries
+            for question in entry["questions"]
+        }
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                " question TEXT PRIMARY KEY,"
+                " answer TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+        return self._db
+
+    def lookup(self, text: str) -> CachedAnswer | None:
+        """Best curated or learned answer for a question, if one is similar enough."""
+        with self._lock:
+            return self._lookup(text)
+
+    def _lookup(self, text: str) -> CachedAnswer | None:
+        question = normalize_question(text)
+        if not question:
+            return None
+
+        learned = self.db.execute(
+            "SELECT question, answer FROM answers WHERE created_at > ?", (time.time() - self.ttl,)
+        ).fetchall()
+        candidates = [(q, a, "curated") for q, a in self.curated.items()]
+        candidates += [(q, a, "learned") for q, a in learned]
+
+        best: CachedAnswer | None = None
+        for known, answer, source in candidates:
+            score = similarity(question, known)
+            if score >= self.min_similarity and (best is None or score > best.similarity):
+                best = CachedAnswer(question=known, answer=answer, source=source, similarity=score)
+
+        if best is None:
+            self.misses += 1
+            latency_metrics.observe_answer_cache("miss")
+            return None
+
+        self.hits += 1
+        latency_metrics.observe_answer_cache(best.source)
+        if best.source == "learned":
+            self.db.execute("UPDATE answers SET last_used = ? WHERE question = ?", (time.time(), best.question))
+        return best
+
+    def skip(self) -> None:
+        """Count a turn the cache wasn't consulted for."""
+        self.skipped += 1
+        latency_metrics.observe_answer_cache("skipped")
+
+    def learnable(self, question: str) -> bool:
+        """Whether the answer to a normalized question can be replayed to other visitors."""
+        words = set(question.split())
+        return bool(words) and not words & CONTEXT_WORDS and bool(words & self.topics)
+
+    def store(self, text: str, answer: str) -> bool:
+        """Remember a generated answer, evicting expired and least recently used ones.
+
+        Returns False if the question isn't one whose answer may be shared.
+        """
+        question = normalize_question(text)
+        if question in self.curated or not self.learnable(question):
+            return False
+
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO answers (question, answer, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (question, answer, now, now),
+            )
+            self.db.execute(
+                "DELETE FROM answers WHERE question NOT IN"
+                " (SELECT question FROM answers ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        return True
+
+    def stats(self) -> dict:
+        """Cache counters for logging."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
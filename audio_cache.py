@@ -0,0 +1,468 @@
+"""
+Audio Cache - Pre-synthesized speech for Sylvia
+===============================================
+Keeps synthesized TTS audio as raw PCM so fixed phrases (like the greeting) can be
+played straight into a session without a provider round trip.
+
+Audio lives in memory, and optionally on disk as WAV files that are mmap'd on load,
+so every worker process on a host shares one copy of each phrase. The disk tier is
+bounded: the oldest files are removed once it grows past its size limit.
+
+CachedTTS wraps the session TTS so fixed phrases (the greeting, tool messages,
+curated FAQ answers) are streamed from the cache instead of being synthesized again.
+Only text that is part of one of those phrases is cached; everything else - in
+particular read-backs of a visitor's email or phone number - goes straight to the
+provider and is never kept in memory or written to disk.
+"""
+
+from livekit import rtc
+from livekit.agents import tts as agents_tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import unicodedata
+import wave
+
+from provider_router import RoutedChunkedStream, RoutedTTS
+
+logger = logging.getLogger(__name__)
+
+# Length of each frame streamed back into the session
+FRAME_MS = 20
+
+
+@dataclass
+class CachedAudio:
+    """16-bit PCM audio plus the format needed to turn it back into frames."""
+
+    pcm: bytes | memoryview
+    sample_rate: int
+    num_channels: int
+
+    @property
+    def duration(self) -> float:
+        """Length of the audio in seconds."""
+        return len(self.pcm) / (2 * self.num_channels * self.sample_rate)
+
+    def frames(self, frame_ms: int = FRAME_MS) -> Iterator[rtc.AudioFrame]:
+        """Slice the PCM into fixed-size audio frames."""
+        samples_per_frame = self.sample_rate * frame_ms // 1000
+        frame_bytes = samples_per_frame * self.num_channels * 2
+        view = memoryview(self.pcm)
+        for start in range(0, len(view), frame_bytes):
+            chunk = view[start:start + frame_bytes]
+            yield rtc.AudioFrame(
+                data=chunk,
+                sample_rate=self.sample_rate,
+                num_channels=self.num_channels,
+                samples_per_channel=len(chunk) // (2 * self.num_channels),
+            )
+
+    async def stream(self, frame_ms: int = FRAME_MS) -> AsyncIterator[rtc.AudioFrame]:
+        """Async frame iterator, in the shape AgentSession.say(audio=...) expects."""
+        for frame in self.frames(frame_ms):
+            yield frame
+
+
+def tts_voice(tts: agents_tts.TTS) -> str:
+    """Best-effort voice identifier for a TTS plugin instance."""
+    opts = getattr(tts, "_opts", None)
+    return str(getattr(opts, "voice", None) or getattr(opts, "voice_id", None) or "")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different spellings share one cache entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(tts: agents_tts.TTS, text: str) -> str:
+    """Cache key for a phrase spoken by a specific provider, model and voice."""
+    parts = [tts.provider, tts.model, tts_voice(tts), normalize_text(text)]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def load(cache_dir: str, key: str) -> CachedAudio | None:
+    """Load cached audio from disk, memory-mapping the PCM data."""
+    path = os.path.join(cache_dir, f"{key}.wav")
+    try:
+        with wave.open(path, "rb") as wav:
+            sample_rate = wav.getframerate()
+            num_channels = wav.getnchannels()
+            data_size = wav.getnframes() * num_channels * wav.getsampwidth()
+
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except FileNotFoundError:
+        return None
+    except (OSError, EOFError, wave.Error) as e:
+        logger.warning("Ignoring unreadable audio cache entry %s: %s", path, e)
+        return None
+
+    # The PCM payload is the tail of the WAV file
+    return CachedAudio(
+        pcm=memoryview(mapped)[len(mapped) - data_size:],
+        sample_rate=sample_rate,
+        num_channels=num_channels,
+    )
+
+
+def save(cache_dir: str, key: str, audio: CachedAudio) -> None:
+    """Write audio to the disk cache atomically, so concurrent readers never see a partial file."""
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f, wave.open(f, "wb") as wav:
+            wav.setnchannels(audio.num_channels)
+            wav.setsampwidth(2)
+            wav.setframerate(audio.sample_rate)
+            wav.writeframes(audio.pcm)
+        os.replace(tmp_path, os.path.join(cache_dir, f"{key}.wav"))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def prune(cache_dir: str, max_bytes: int) -> int:
+    """Delete the oldest WAV files until the disk cache fits in max_bytes; returns files removed.
+
+    Processes that still have a removed file mmap'd keep their copy until they drop it.
+    """
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            if entry.name.endswith(".wav"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Pruned by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total -= size
+    return removed
+
+
+async def synthesize(tts: agents_tts.TTS, text: str) -> CachedAudio:
+    """Synthesize a phrase with the given TTS and collect it into one PCM buffer."""
+    frames = []
+    async with tts.synthesize(text) as stream:
+        async for ev in stream:
+            frames.append(ev.frame)
+
+    if not frames:
+        raise ValueError(f"TTS returned no audio for: {text!r}")
+
+    combined = rtc.combine_audio_frames(frames)
+    return CachedAudio(
+        pcm=bytes(combined.data.cast("B")),
+        sample_rate=combined.sample_rate,
+        num_channels=combined.num_channels,
+    )
+
+
+def presynthesize(
+    tts: agents_tts.TTS,
+    text: str,
+    *,
+    cache_dir: str | None = None,
+    timeout: float = 5.0,
+) -> CachedAudio | None:
+    """Return audio for a fixed phrase, synthesizing it only if it isn't cached yet.
+
+    Meant for prewarm(), which runs before the process event loop exists: synthesis
+    runs on a short-lived loop, so ``tts`` must be a dedicated instance and is closed
+    afterwards. Returns None if synthesis fails, letting callers fall back to live TTS.
+    """
+    key = cache_key(tts, text)
+
+    if cache_dir:
+        cached = load(cache_dir, key)
+        if cached is not None:
+            asyncio.run(tts.aclose())
+            logger.info("Loaded cached audio for %r (%.1fs)", text, cached.duration)
+            return cached
+
+    async def _synthesize() -> CachedAudio:
+        try:
+            return await asyncio.wait_for(synthesize(tts, text), timeout)
+        finally:
+            await tts.aclose()
+
+    try:
+        audio = asyncio.run(_synthesize())
+    except Exception as e:
+        logger.warning("Could not pre-synthesize %r: %s", text, e)
+        return None
+
+    if cache_dir:
+        try:
+            save(cache_dir, key, audio)
+        except OSError as e:
+            logger.warning("Could not write audio cache entry: %s", e)
+
+    logger.info("Pre-synthesized audio for %r (%.1fs)", text, audio.duration)
+    return audio
+
+
+class CachedTTS(agents_tts.TTS):
+    """TTS wrapper that serves fixed phrases from a bounded LRU (plus optional disk tier).
+
+    Keys are (provider, model, voice, normalized text) of the provider that actually
+    spoke the phrase - behind a RoutedTTS that can be a fallback, and lookups use the
+    provider the router would try first. Text is cacheable if it's part of one of the
+    phrases given to set_phrases() - the session splits replies into sentences, so a
+    sentence of a tool message counts. Misses are streamed through from the wrapped
+    TTS as they arrive and stored once complete; hits never call the provider. Other
+    text is passed through untouched.
+
+    If the wrapped TTS streams, so does this one: text is held back only while it can
+    still turn out to be a fixed phrase, then streamed to the provider as it arrives.
+    """
+
+    def __init__(
+        self,
+        tts: agents_tts.TTS,
+        *,
+        phrases: Iterable[str] = (),
+        max_entries: int = 256,
+        max_chars: int = 200,
+        cache_dir: str | None = None,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ):
+        super().__init__(
+            capabilities=agents_tts.TTSCapabilities(streaming=tts.capabilities.streaming),
+            sample_rate=tts.sample_rate,
+            num_channels=tts.num_channels,
+        )
+        self._wrapped_tts = tts
+        self._max_entries = max_entries
+        self._max_chars = max_chars
+        self._cache_dir = cache_dir
+        self._max_disk_bytes = max_disk_bytes
+        self._entries: OrderedDict[str, CachedAudio] = OrderedDict()
+        self._phrases: tuple[str, ...] = ()
+        self.set_phrases(phrases)
+
+        # Hit/miss counters, see stats()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.characters_saved = 0
+
+    @property
+    def model(self) -> str:
+        return self._wrapped_tts.model
+
+    @property
+    def provider(self) -> str:
+        return self._wrapped_tts.provider
+
+    def stats(self) -> dict:
+        """Cache counters for logging and metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bypassed": self.bypassed,
+            "characters_saved": self.characters_saved,
+            "entries": len(self._entries),
+        }
+
+    def set_phrases(self, phrases: Iterable[str]) -> None:
+        """Replace the fixed phrases whose text may be cached (e.g. after a config reload)."""
+        self._phrases = tuple(normalize_text(phrase) for phrase in phrases if phrase)
+
+    def cacheable(self, text: str) -> bool:
+        """Whether text is (part of) a fixed phrase and short enough to be worth caching."""
+        text = normalize_text(text)
+        return bool(text) and len(text) <= self._max_chars and any(text in phrase for phrase in self._phrases)
+
+    def _speaking_tts(self) -> agents_tts.TTS:
+        """The provider the next request would be answered by."""
+        if isinstance(self._wrapped_tts, RoutedTTS):
+            return self._wrapped_tts.preferred()
+        return self._wrapped_tts
+
+    async def get(self, text: str) -> CachedAudio | None:
+        """Look a phrase up in memory, then on disk (promoting disk hits into memory); disk reads run in a thread."""
+        key = cache_key(self._speaking_tts(), text)
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            return audio
+
+        if self._cache_dir:
+            audio = await asyncio.to_thread(load, self._cache_dir, key)
+            if audio is not None and (audio.sample_rate, audio.num_channels) != (self.sample_rate, self.num_channels):
+                return None  # Written for another router setup
+            if audio is not None:
+                self._remember(key, audio)
+        return audio
+
+    async def put(self, text: str, audio: CachedAudio, *, spoken_by: agents_tts.TTS | None = None) -> None:
+        """Store synthesized audio for a fixed phrase; the disk write runs in a thread.
+
+        spoken_by is the provider that produced the audio, if it isn't the one get() would look up.
+        """
+        if not self.cacheable(text):
+            return
+
+        key = cache_key(spoken_by or self._speaking_tts(), text)
+        self._remember(key, audio)
+        if self._cache_dir:
+            await asyncio.to_thread(self._save, key, audio)
+
+    def _save(self, key: str, audio: CachedAudio) -> None:
+        try:
+            save(self._cache_dir, key, audio)
+            removed = prune(self._cache_dir, self._max_disk_bytes)
+        except OSError as e:
+            logger.warning("Could not write audio cache entry: %s", e)
+            return
+        if removed:
+            logger.debug("Pruned %s audio cache entries over %s bytes", removed, self._max_disk_bytes)
+
+    def _remember(self, key: str, audio: CachedAudio) -> None:
+        self._entries[key] = audio
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def _speak(self, text: str, output_emitter: agents_tts.AudioEmitter, conn_options: APIConnectOptions) -> None:
+        """Push the audio for text, from the cache if possible; fixed phrases that miss are stored."""
+        cacheable = self.cacheable(text)
+        audio = await self.get(text) if cacheable else None
+        if audio is not None:
+            self.hits += 1
+            self.characters_saved += len(text)
+            output_emitter.push(bytes(audio.pcm))
+            return
+
+        if cacheable:
+            self.misses += 1
+        else:
+            self.bypassed += 1
+        pcm = bytearray()
+        async with self._wrapped_tts.synthesize(text, conn_options=conn_options) as stream:
+            async for ev in stream:
+                data = bytes(ev.frame.data.cast("B"))
+                if cacheable:
+                    pcm.extend(data)
+                output_emitter.push(data)
+
+        if pcm:
+            await self.put(
+                text,
+                CachedAudio(pcm=bytes(pcm), sample_rate=self.sample_rate, num_channels=self.num_channels),
+                # A routed request may have been answered by a fallback provider
+                spoken_by=stream.provider_tts if isinstance(stream, RoutedChunkedStream) else None,
+            )
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "_CachedChunkedStream":
+        return _CachedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(
+        self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "_CachedSynthesizeStream":
+        return _CachedSynthesizeStream(tts=self, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        self._wrapped_tts.prewarm()
+
+    async def aclose(self) -> None:
+        await self._wrapped_tts.aclose()
+
+
+class _CachedChunkedStream(agents_tts.ChunkedStream):
+    def __init__(self, *, tts: CachedTTS, input_text: str, conn_options: APIConnectOptions):
+        # Retries are handled by the wrapped TTS, like livekit's StreamAdapter does
+        super().__init__(
+            tts=tts,
+            input_text=input_text,
+            conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout),
+        )
+        self._cached_tts = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: agents_tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=self._cached_tts.sample_rate,
+            num_channels=self._cached_tts.num_channels,
+            mime_type="audio/pcm",
+        )
+        await self._cached_tts._speak(self.input_text, output_emitter, self._wrapped_conn_options)
+        output_emitter.flush()
+
+
+class _CachedSynthesizeStream(agents_tts.SynthesizeStream):
+    def __init__(self, *, tts: CachedTTS, conn_options: APIConnectOptions):
+        super().__init__(tts=tts, conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout))
+        self._cached_tts = tts
+        self._wrapped_conn_options = conn_options
+
+    async def _run(self, output_emitter: agents_tts.AudioEmitter) -> None:
+        cached_tts = self._cached_tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=cached_tts.sample_rate,
+            num_channels=cached_tts.num_channels,
+            mime_type="audio/pcm",
+            stream=True,
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+
+        async def _forward(stream: agents_tts.SynthesizeStream) -> None:
+            async for ev in stream:
+                output_emitter.push(bytes(ev.frame.data.cast("B")))
+
+        # One segment per stream: text up to the first flush
+        text = ""
+        live: agents_tts.SynthesizeStream | None = None
+        forward: asyncio.Task | None = None
+        try:
+            async for data in self._input_ch:
+                if isinstance(data, self._FlushSentinel):
+                    break
+                if live is not None:
+                    live.push_text(data)
+                    continue
+
+                text += data
+                if text.strip() and not cached_tts.cacheable(text):
+                    # Can't be a fixed phrase any more: stream it from here on
+                    cached_tts.bypassed += 1
+                    live = cached_tts._wrapped_tts.stream(conn_options=self._wrapped_conn_options)
+                    live.push_text(text)
+                    forward = asyncio.create_task(_forward(live))
+
+            if live is not None:
+                live.end_input()
+                await forward
+            elif text.strip():
+                await cached_tts._speak(text, output_emitter, self._wrapped_conn_options)
+            output_emitter.end_segment()
+        finally:
+            if forward is not None:
+                await utils.aio.cancel_and_wait(forward)
+            if live is not None:
+                await live.aclose()
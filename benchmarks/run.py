@@ -0,0 +1,352 @@
+"""
+Sylvia Conversation Benchmark
+=============================
+Drives a real AgentSession with the Sylvia agent through scripted conversations, with
+local stand-ins for STT/LLM/TTS and a local HTTP server in place of the n8n webhook.
+
+Reports per-turn time-to-first-audio, tool calls and LLM tokens, plus CRM post latency
+and total call duration, as JSON that can be compared between commits.
+
+Usage:
+    python -m benchmarks.run --profile typical --output bench.json
+    python -m benchmarks.run --profile typical --baseline bench.json
+    python -m benchmarks.run --profile flaky --fallback-profile typical
+"""
+
+from aiohttp import web
+from livekit.agents import AgentSession, metrics
+from . import stubs
+from agent_config import load_config
+from answer_cache import AnswerCache
+from crm_outbox import CrmOutbox
+from endpointing import EndpointingController, EndpointingDelays
+from lead_index import LeadIndex
+from provider_router import ProviderRouter, RoutedLLM, RoutedTTS
+from session_archive import ArchiveWriter, SessionRecorder, read_archive
+import audio_cache
+import latency_metrics
+import sylvia_agent
+import argparse
+import asyncio
+import httpx
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCENARIOS_PATH = os.path.join(os.path.dirname(__file__), "scenarios.json")
+
+# How long the agent must stay idle before a turn is considered finished
+SETTLE_SECONDS = 0.3
+TURN_TIMEOUT = 30.0
+
+
+async def start_crm_server(latency: float) -> tuple[web.AppRunner, str, list]:
+    """Local stand-in for the n8n webhook. Returns (runner, url, received payloads)."""
+    received = []
+
+    async def webhook(request: web.Request) -> web.Response:
+        received.append(await request.json())
+        await asyncio.sleep(latency)
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_post("/webhook/sylvia-voice-agent", webhook)
+    app.router.add_route("HEAD", "/", lambda request: web.Response())
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/webhook/sylvia-voice-agent", received
+
+
+class TurnRecorder:
+    """Collects per-turn metrics from AgentSession events."""
+
+    def __init__(self, session: AgentSession, audio_out: stubs.BenchAudioOutput):
+        self.audio_out = audio_out
+        self.turns: list[dict] = []
+        self.state = "initializing"
+        self.last_state_change = time.perf_counter()
+        self.state_changes = 0
+        self._current: dict | None = None
+        self._turn_start = 0.0
+
+        session.on("agent_state_changed", self._on_state_changed)
+        session.on("metrics_collected", self._on_metrics)
+        session.on("function_tools_executed", self._on_tools)
+
+    def begin(self, label: str) -> None:
+        self._turn_start = time.perf_counter()
+        self._current = {
+            "turn": label,
+            "ttfa": None,
+            "tool_calls": [],
+            "llm_requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+        }
+        self._first_frame_index = len(self.audio_out.first_frame_times)
+        self._changes_at_begin = self.state_changes
+        self.turns.append(self._current)
+
+    def end(self) -> None:
+        frames = self.audio_out.first_frame_times[self._first_frame_index:]
+        if frames:
+            self._current["ttfa"] = round(frames[0] - self._turn_start, 4)
+        self._current["duration"] = round(time.perf_counter() - self._turn_start, 4)
+
+    def _on_state_changed(self, ev) -> None:
+        self.state = ev.new_state
+        self.last_state_change = time.perf_counter()
+        self.state_changes += 1
+
+    def _on_metrics(self, ev) -> None:
+        if self._current is not None and isinstance(ev.metrics, metrics.LLMMetrics):
+            self._current["llm_requests"] += 1
+            self._current["prompt_tokens"] += ev.metrics.prompt_tokens
+            self._current["completion_tokens"] += ev.metrics.completion_tokens
+
+    def _on_tools(self, ev) -> None:
+        if self._current is not None:
+            self._current["tool_calls"].extend(call.name for call in ev.function_calls)
+
+    async def wait_idle(self) -> None:
+        """Wait until the agent has spoken (if it's going to) and gone back to listening."""
+        deadline = time.perf_counter() + TURN_TIMEOUT
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(0.02)
+            if self.state_changes == self._changes_at_begin:
+                continue  # the agent hasn't picked up this turn yet
+            idle_for = time.perf_counter() - self.last_state_change
+            if self.state == "listening" and idle_for >= SETTLE_SECONDS:
+                return
+        raise TimeoutError(f"agent did not finish the turn within {TURN_TIMEOUT}s")
+
+
+def _llm_steps(raw_steps: list[dict]) -> list[stubs.LLMStep]:
+    return [stubs.LLMStep(text=step.get("text", ""), tool_calls=step.get("tool_calls", [])) for step in raw_steps]
+
+
+async def run_scenario(
+    name: str,
+    scenario: dict,
+    profile: stubs.LatencyProfile,
+    fallback_profile: stubs.LatencyProfile | None = None,
+) -> dict:
+    runner, crm_url, crm_payloads = await start_crm_server(profile.crm_latency)
+
+    crm_latencies = []
+
+    async def _on_request(request):
+        request.extensions["bench_start"] = time.perf_counter()
+
+    async def _on_response(response):
+        if response.request.url.path.endswith("/sylvia-voice-agent"):
+            crm_latencies.append(round(time.perf_counter() - response.request.extensions["bench_start"], 4))
+
+    crm_client = httpx.AsyncClient(timeout=10.0, event_hooks={"request": [_on_request], "response": [_on_response]})
+    outbox_dir = tempfile.TemporaryDirectory(prefix="sylvia-bench-outbox-")
+    crm_outbox = CrmOutbox(crm_client, crm_url, outbox_dir.name, batch_size=sylvia_agent.CRM_BATCH_SIZE)
+    crm_outbox.start()
+    answer_cache = None
+    if sylvia_agent.ANSWER_CACHE:
+        answer_cache = AnswerCache(
+            os.path.join(outbox_dir.name, "answer_cache.sqlite3"),
+            ttl=sylvia_agent.ANSWER_CACHE_TTL_HOURS * 3600,
+            curated=AnswerCache.load_curated(sylvia_agent.FAQ_ANSWERS_PATH),
+        )
+    lead_index = LeadIndex(os.path.join(outbox_dir.name, "lead_index.sqlite3"), ttl=sylvia_agent.LEAD_DEDUP_TTL_DAYS * 86400)
+
+    config = load_config(sylvia_agent.AGENT_CONFIG_PATH, sylvia_agent.CONFIG_DEFAULTS)
+    stub_stt = stubs.StubSTT(profile)
+    stub_llm = stubs.StubLLM(profile)
+    stub_tts = stubs.StubTTS(profile)
+    stub_ttses = [stub_tts]
+
+    # Same composition as prewarm()/entrypoint(), with the stubs in place of the providers
+    session_llm, provider_tts = stub_llm, stub_tts
+    if fallback_profile is not None:
+        fallback_tts = stubs.StubTTS(fallback_profile)
+        stub_ttses.append(fallback_tts)
+        session_llm = RoutedLLM(ProviderRouter(
+            "llm",
+            {"primary": stub_llm, "fallback": stub_llm.replica(fallback_profile)},
+            hedge_after=sylvia_agent.LLM_HEDGE_AFTER,
+        ))
+        provider_tts = RoutedTTS(ProviderRouter(
+            "tts",
+            {"primary": stub_tts, "fallback": fallback_tts},
+            hedge_after=sylvia_agent.TTS_HEDGE_AFTER,
+        ))
+    tts = provider_tts
+    if sylvia_agent.TTS_CACHE:
+        tts = audio_cache.CachedTTS(
+            provider_tts, phrases=sylvia_agent._cacheable_phrases(config), max_entries=sylvia_agent.TTS_CACHE_SIZE
+        )
+    greeting_audio = None
+    if sylvia_agent.GREETING_CACHE:
+        greeting_audio = await audio_cache.synthesize(provider_tts, config.greeting)
+
+    session = AgentSession(
+        stt=stub_stt,
+        llm=session_llm,
+        tts=tts,
+        turn_detection="stt",
+        min_endpointing_delay=sylvia_agent.MIN_ENDPOINTING_DELAY,
+        max_endpointing_delay=sylvia_agent.MAX_ENDPOINTING_DELAY,
+    )
+    audio_out = stubs.BenchAudioOutput()
+    session.output.audio = audio_out
+    recorder = TurnRecorder(session, audio_out)
+    agent = sylvia_agent.Sylvia(
+        config=config,
+        crm_outbox=crm_outbox,
+        lead_index=lead_index,
+        answer_cache=answer_cache,
+        greeting_audio=greeting_audio,
+        speculative=sylvia_agent.SPECULATIVE_LLM,
+    )
+    archive = session_recorder = None
+    if sylvia_agent.SESSION_ARCHIVE and ArchiveWriter.available():
+        archive = ArchiveWriter(os.path.join(outbox_dir.name, "sessions"))
+        archive.start()
+        session_recorder = SessionRecorder(archive, name, session, agent.lead)
+        session_recorder.start(config=config.version)
+    latency_metrics.TurnLatencyTracker(session, on_turn=session_recorder.record_turn if session_recorder else None)
+    EndpointingController(
+        session,
+        normal=EndpointingDelays(sylvia_agent.MIN_ENDPOINTING_DELAY, sylvia_agent.MAX_ENDPOINTING_DELAY),
+        dictation=EndpointingDelays(
+            sylvia_agent.DICTATION_MIN_ENDPOINTING_DELAY, sylvia_agent.DICTATION_MAX_ENDPOINTING_DELAY
+        ),
+    )
+
+    call_start = time.perf_counter()
+    recorder.begin("greeting")
+    stub_llm.script([stubs.LLMStep(text=config.greeting)])
+    await session.start(agent=agent)
+    await recorder.wait_idle()
+    recorder.end()
+    if greeting_audio is not None:
+        stub_llm.steps.clear()  # the greeting step was never used
+
+    for index, turn in enumerate(scenario["turns"], start=1):
+        stub_llm.script(_llm_steps(turn["llm"]))
+        recorder.begin(str(index))
+        stub_stt.say(turn["user"])
+        await recorder.wait_idle()
+        recorder.end()
+        stub_llm.steps.clear()  # steps for turns answered without the LLM (answer cache)
+
+    await session.aclose()
+    call_duration = time.perf_counter() - call_start
+    archive_rows = None
+    if archive is not None:
+        await archive.aclose()
+        archive_rows = read_archive(archive.directory).num_rows
+
+    await crm_outbox.aclose(timeout=sylvia_agent.CRM_FLUSH_TIMEOUT)
+    await crm_client.aclose()
+    outbox_dir.cleanup()
+    await runner.cleanup()
+
+    ttfas = [turn["ttfa"] for turn in recorder.turns if turn["ttfa"] is not None]
+    return {
+        "scenario": name,
+        "turns": recorder.turns,
+        "summary": {
+            "call_duration": round(call_duration, 4),
+            "ttfa_mean": round(statistics.mean(ttfas), 4) if ttfas else None,
+            "ttfa_max": max(ttfas) if ttfas else None,
+            "tool_calls": sum(len(turn["tool_calls"]) for turn in recorder.turns),
+            "llm_requests": sum(turn["llm_requests"] for turn in recorder.turns),
+            "prompt_tokens": sum(turn["prompt_tokens"] for turn in recorder.turns),
+            "completion_tokens": sum(turn["completion_tokens"] for turn in recorder.turns),
+            "tts_requests": sum(stub.requests for stub in stub_ttses),
+            "tts_characters": sum(stub.characters for stub in stub_ttses),
+            "crm_posts": len(crm_payloads),
+            "crm_latencies": crm_latencies,
+            "archive_rows": archive_rows,
+        },
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print per-scenario summary deltas against a previous run."""
+    baseline_by_name = {r["scenario"]: r["summary"] for r in baseline["scenarios"]}
+    for result in results["scenarios"]:
+        before = baseline_by_name.get(result["scenario"])
+        if before is None:
+            continue
+        print(f"\n{result['scenario']} (vs {baseline.get('revision') or 'baseline'}):")
+        for key, value in result["summary"].items():
+            old = before.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)):
+                delta = value - old
+                pct = f" ({delta / old:+.1%})" if old else ""
+                print(f"  {key:18} {old:>10} -> {value:<10} {delta:+.4g}{pct}")
+
+
+async def main(args: argparse.Namespace) -> dict:
+    with open(SCENARIOS_PATH) as f:
+        scenarios = json.load(f)
+    if args.scenario:
+        scenarios = {name: scenarios[name] for name in args.scenario}
+
+    profile = stubs.PROFILES[args.profile]
+    fallback_profile = stubs.PROFILES[args.fallback_profile] if args.fallback_profile else None
+    results = []
+    for name, scenario in scenarios.items():
+        for _ in range(args.repeat):
+            results.append(await run_scenario(name, scenario, profile, fallback_profile))
+
+    return {
+        "revision": _git_revision(),
+        "profile": args.profile,
+        "fallback_profile": args.fallback_profile,
+        "scenarios": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run Sylvia's offline conversation benchmark")
+    parser.add_argument("--profile", choices=sorted(stubs.PROFILES), default="typical")
+    parser.add_argument(
+        "--fallback-profile",
+        choices=sorted(stubs.PROFILES),
+        help="Route LLM/TTS through a second provider with this profile (hedging and failover)",
+    )
+    parser.add_argument("--scenario", action="append", help="Scenario name (repeatable, default: all)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = asyncio.run(main(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
@@ -0,0 +1,269 @@
+"""
+Sylvia Startup Benchmark
+========================
+Measures what it costs to bring up a worker, the way LiveKit starts one on Linux:
+
+- main process: imports sylvia_agent and preloads the configured plugins
+- forkserver: imports the registered plugin packages once; job processes fork from it
+- job process: imports sylvia_agent again and runs prewarm() until it can take a call
+
+Each stage runs in fresh interpreters: a few plain runs for the timings (the median
+is reported), plus one under `python -X importtime` that breaks every phase down by
+the package its import time went to - that one runs slower, so its numbers are for
+comparing packages with each other, not with the timings. "job_cold" repeats the
+job process without the forkserver, i.e. what a process pays when nothing was
+preloaded. Nothing touches the network: API keys are dummies and the greeting isn't
+synthesized.
+
+Exits non-zero when the worker's cold start (all three stages) or a job process's
+time-to-ready is over budget, so it can gate changes that slow down autoscaling.
+
+Usage:
+    python -m benchmarks.startup
+    python -m benchmarks.startup --budget 4.0 --job-budget 0.5 --output startup.json
+    python -m benchmarks.startup --baseline startup.json
+"""
+
+from types import SimpleNamespace
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PHASE_MARKER = "# startup phase: "
+
+# Keep the job process offline and out of the repo's .cache
+CHILD_ENV = {
+    "OPENAI_API_KEY": "sk-startup-benchmark",
+    "DEEPGRAM_API_KEY": "startup-benchmark",
+    "ELEVEN_API_KEY": "startup-benchmark",
+    "ANTHROPIC_API_KEY": "startup-benchmark",
+    "GOOGLE_API_KEY": "startup-benchmark",
+    "GROQ_API_KEY": "startup-benchmark",
+    "CARTESIA_API_KEY": "startup-benchmark",
+    "GREETING_CACHE": "false",
+    "METRICS_PORT": "0",
+}
+
+
+class _Phases:
+    """Wall time per phase; markers on stderr split the -X importtime output the same way."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    def run(self, name: str, fnc, *args):
+        print(f"{PHASE_MARKER}{name}", file=sys.stderr, flush=True)
+        start = time.perf_counter()
+        result = fnc(*args)
+        self.seconds[name] = time.perf_counter() - start
+        return result
+
+
+def _import(*modules: str) -> None:
+    for module in modules:
+        __import__(module)
+
+
+def child(stage: str, preload: list[str]) -> dict:
+    """One stage, run inside the measured interpreter."""
+    phases = _Phases()
+    if stage == "main":
+        sylvia_agent = phases.run("import", _import, "sylvia_agent") or sys.modules["sylvia_agent"]
+        if hasattr(sylvia_agent, "preload_plugins"):
+            phases.run("preload", sylvia_agent.preload_plugins)
+    else:
+        if preload:
+            phases.run("forkserver", _import, *preload)
+        phases.run("import", _import, "sylvia_agent")
+        proc = SimpleNamespace(userdata={})
+        phases.run("prewarm", sys.modules["sylvia_agent"].prewarm, proc)
+
+    from livekit.agents import Plugin
+    return {
+        "phases": phases.seconds,
+        "plugins": [plugin.package for plugin in Plugin.registered_plugins] + ["av"],
+        "modules": len(sys.modules),
+    }
+
+
+def _package(module: str) -> str:
+    """Group key for import time: livekit.agents, livekit.plugins.<name>, else the top-level package."""
+    parts = module.split(".")
+    if parts[0] == "livekit" and len(parts) > 1:
+        return ".".join(parts[:3] if parts[1] == "plugins" else parts[:2])
+    return parts[0]
+
+
+def parse_importtime(stderr: str) -> dict[str, dict[str, float]]:
+    """Seconds of import time per package, per phase (self time, so packages add up)."""
+    phases: dict[str, dict[str, float]] = {}
+    current = None
+    for line in stderr.splitlines():
+        if line.startswith(PHASE_MARKER):
+            current = phases.setdefault(line[len(PHASE_MARKER):].strip(), {})
+            continue
+        if current is None or not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        package = _package(name.strip())
+        current[package] = current.get(package, 0.0) + int(self_us) / 1e6
+    return phases
+
+
+def run_stage(stage: str, preload: list[str], cache_dir: str, importtime: bool = False) -> dict:
+    """Run one stage in a fresh interpreter and collect its timings."""
+    env = {**os.environ, **CHILD_ENV, "PYTHONPATH": REPO_DIR}
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    command = [sys.executable, "-m", "benchmarks.startup", "--child", stage]
+    if importtime:
+        command[1:1] = ["-X", "importtime"]
+    if preload:
+        command += ["--preload", ",".join(preload)]
+
+    # Relative cache paths and .env lookup resolve in a scratch directory, not the repo
+    done = subprocess.run(command, cwd=cache_dir, env=env, capture_output=True, text=True)
+    if done.returncode != 0:
+        sys.stderr.write(done.stderr[-4000:])
+        raise RuntimeError(f"{stage} stage failed with exit code {done.returncode}")
+
+    result = json.loads(done.stdout.strip().splitlines()[-1])
+    result["imports"] = parse_importtime(done.stderr) if importtime else {}
+    return result
+
+
+def _median_run(stage: str, preload: list[str], repeat: int) -> dict:
+    """Phase timings of the median run, plus the import breakdown of one more run."""
+    runs = []
+    for i in range(repeat + 1):
+        with tempfile.TemporaryDirectory(prefix="sylvia-startup-") as cache_dir:
+            runs.append(run_stage(stage, preload, cache_dir, importtime=i == repeat))
+    traced = runs.pop()
+    runs.sort(key=lambda r: sum(r["phases"].values()))
+    return {**runs[len(runs) // 2], "imports": traced["imports"]}
+
+
+def _top(imports: dict[str, float], limit: int) -> dict[str, float]:
+    ranked = sorted(imports.items(), key=lambda item: item[1], reverse=True)
+    return {package: round(seconds, 4) for package, seconds in ranked[:limit]}
+
+
+def main(args: argparse.Namespace) -> dict:
+    from .run import _git_revision  # Imports the agent, so not in the measured children
+
+    main_stage = _median_run("main", [], args.repeat)
+    # What LiveKit's worker hands to set_forkserver_preload()
+    preload = main_stage["plugins"]
+    forkserver_job = _median_run("job", preload, args.repeat)
+    cold_job = _median_run("job", [], args.repeat)
+
+    def job_ready(run: dict) -> float:
+        return run["phases"]["import"] + run["phases"]["prewarm"]
+
+    main_seconds = sum(main_stage["phases"].values())
+    forkserver_seconds = forkserver_job["phases"].get("forkserver", 0.0)
+    stages = {
+        "main": main_stage,
+        "forkserver": {
+            "phases": {"forkserver": forkserver_job["phases"].get("forkserver", 0.0)},
+            "imports": {"forkserver": forkserver_job["imports"].get("forkserver", {})},
+        },
+        "job": {**forkserver_job, "phases": {k: v for k, v in forkserver_job["phases"].items() if k != "forkserver"}},
+        "job_cold": cold_job,
+    }
+    summary = {
+        "main_seconds": round(main_seconds, 4),
+        "forkserver_seconds": round(forkserver_seconds, 4),
+        "job_ready_seconds": round(job_ready(forkserver_job), 4),
+        "job_ready_cold_seconds": round(job_ready(cold_job), 4),
+        "cold_start_seconds": round(main_seconds + forkserver_seconds + job_ready(forkserver_job), 4),
+        "job_modules": forkserver_job["modules"],
+    }
+
+    return {
+        "revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "preload": preload,
+        "summary": summary,
+        "stages": {
+            name: {
+                "phases": {phase: round(seconds, 4) for phase, seconds in stage["phases"].items()},
+                "imports": {
+                    phase: _top(imports, args.top)
+                    for phase, imports in stage["imports"].items()
+                    if phase in stage["phases"]
+                },
+            }
+            for name, stage in stages.items()
+        },
+    }
+
+
+def report(results: dict) -> None:
+    """Human-readable breakdown, on stderr so stdout stays JSON."""
+    out = sys.stderr
+    summary = results["summary"]
+    print(f"\nWorker cold start: {summary['cold_start_seconds']:.3f}s", file=out)
+    for name, stage in results["stages"].items():
+        total = sum(stage["phases"].values())
+        phases = ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in stage["phases"].items())
+        print(f"  {name:10} {total:7.3f}s  ({phases})", file=out)
+        for phase, imports in stage["imports"].items():
+            top = ", ".join(f"{package} {seconds * 1000:.0f}ms" for package, seconds in list(imports.items())[:5])
+            if top:
+                print(f"  {'':10} {'':8}  {phase}: {top}", file=out)
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Print summary deltas against a previous run."""
+    print(f"\nvs {baseline.get('revision') or 'baseline'}:", file=sys.stderr)
+    for key, value in results["summary"].items():
+        old = baseline["summary"].get(key)
+        if isinstance(old, (int, float)):
+            delta = value - old
+            pct = f" ({delta / old:+.1%})" if old else ""
+            print(f"  {key:24} {old:>10} -> {value:<10} {delta:+.4g}{pct}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Sylvia's worker startup time")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage; the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="Packages listed per phase")
+    parser.add_argument("--budget", type=float, help="Max worker cold start in seconds")
+    parser.add_argument("--job-budget", type=float, help="Max job process time-to-ready in seconds")
+    parser.add_argument("--output", help="Write JSON results to this file (default: stdout)")
+    parser.add_argument("--baseline", help="Previous JSON results to compare against")
+    parser.add_argument("--child", choices=["main", "job"], help=argparse.SUPPRESS)
+    parser.add_argument("--preload", default="", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, list(filter(None, args.preload.split(","))))))
+        sys.exit(0)
+
+    results = main(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    report(results)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+    over = []
+    if args.budget is not None and results["summary"]["cold_start_seconds"] > args.budget:
+        over.append(f"cold start {results['summary']['cold_start_seconds']:.3f}s > {args.budget}s")
+    if args.job_budget is not None and results["summary"]["job_ready_seconds"] > args.job_budget:
+        over.append(f"job process ready {results['summary']['job_ready_seconds']:.3f}s > {args.job_budget}s")
+    if over:
+        print(f"\nOver budget: {'; '.join(over)}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,350 @@
+"""
+Local stand-ins for Deepgram, OpenAI and the room audio output
+==============================================================
+Each stub implements the real livekit plugin interface, so AgentSession and Sylvia run
+their normal pipeline; only the network calls are replaced by configurable delays.
+"""
+
+from livekit import rtc
+from livekit.agents import llm, stt, tts, utils
+from livekit.agents.llm import utils as llm_utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, APIConnectOptions
+from livekit.agents.voice import io
+from dataclasses import dataclass, field
+import asyncio
+import json
+import time
+
+SAMPLE_RATE = 24000
+
+# Roughly how fast Sylvia talks, used to size the stub TTS audio
+SECONDS_PER_CHAR = 0.065
+
+
+@dataclass
+class LatencyProfile:
+    """Provider latencies, in seconds."""
+
+    stt_final_delay: float  # end of user speech -> final transcript
+    llm_ttft: float  # request -> first token
+    llm_tokens_per_second: float
+    tts_ttfb: float  # request -> first audio byte
+    crm_latency: float  # webhook processing time
+    stall_every: int = 0  # every n-th LLM/TTS request stalls before its first token/byte
+    stall_delay: float = 0.0  # extra delay of a stalled request
+
+    def first_response_delay(self, base: float, request_number: int) -> float:
+        stalled = self.stall_every and request_number % self.stall_every == 0
+        return base + self.stall_delay if stalled else base
+
+
+PROFILES = {
+    "instant": LatencyProfile(0.0, 0.0, 10_000.0, 0.0, 0.0),
+    "fast": LatencyProfile(0.15, 0.25, 120.0, 0.12, 0.05),
+    "typical": LatencyProfile(0.3, 0.6, 60.0, 0.3, 0.4),
+    "slow": LatencyProfile(0.6, 1.5, 30.0, 0.8, 2.5),
+    # Typical, but every fourth LLM/TTS request stalls - the tail a fallback provider should cut
+    "flaky": LatencyProfile(0.3, 0.6, 60.0, 0.3, 0.4, stall_every=4, stall_delay=3.0),
+}
+
+
+def estimate_tokens(payload) -> int:
+    """Same chars/token heuristic the compaction stage uses."""
+    return len(json.dumps(payload, default=str)) // 4
+
+
+class StubSTT(stt.STT):
+    """Streaming STT that emits scripted utterances when the benchmark "speaks"."""
+
+    def __init__(self, profile: LatencyProfile):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.profile = profile
+        self._utterances: asyncio.Queue[str] = asyncio.Queue()
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def provider(self) -> str:
+        return "benchmark"
+
+    def say(self, text: str) -> None:
+        """Queue a user utterance; it's emitted as if the user just stopped speaking."""
+        self._utterances.put_nowait(text)
+
+    async def _recognize_impl(self, buffer, *, language=NOT_GIVEN, conn_options=DEFAULT_API_CONNECT_OPTIONS):
+        raise NotImplementedError("StubSTT only supports streaming")
+
+    def stream(self, *, language=NOT_GIVEN, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        return _StubRecognizeStream(stt=self, conn_options=conn_options)
+
+
+class _StubRecognizeStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        stub: StubSTT = self._stt
+
+        async def _drain_input():
+            # Audio is ignored, but the input channel must keep being consumed
+            async for _ in self._input_ch:
+                pass
+
+        drain = asyncio.create_task(_drain_input())
+        try:
+            while True:
+                text = await stub._utterances.get()
+                request_id = utils.shortuuid()
+                self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.START_OF_SPEECH))
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(
+                        type=stt.SpeechEventType.INTERIM_TRANSCRIPT,
+                        request_id=request_id,
+                        alternatives=[stt.SpeechData(language="en-US", text=text)],
+                    )
+                )
+                await asyncio.sleep(stub.profile.stt_final_delay)
+                self._event_ch.send_nowait(
+                    stt.SpeechEvent(
+                        type=stt.SpeechEventType.FINAL_TRANSCRIPT,
+                        request_id=request_id,
+                        alternatives=[stt.SpeechData(language="en-US", text=text, confidence=1.0)],
+                    )
+                )
+                self._event_ch.send_nowait(stt.SpeechEvent(type=stt.SpeechEventType.END_OF_SPEECH))
+        finally:
+            await utils.aio.cancel_and_wait(drain)
+
+
+@dataclass
+class LLMStep:
+    """One scripted LLM response: text, tool calls, or both."""
+
+    text: str = ""
+    tool_calls: list[dict] = field(default_factory=list)
+
+
+class StubLLM(llm.LLM):
+    """LLM that replays scripted responses and reports estimated token usage.
+
+    Requests without tools (e.g. conversation summarization) get a canned summary and
+    don't consume a scripted step. A request that answers the same item as the previous
+    one (a discarded speculative draft being regenerated) gets the same step again.
+    """
+
+    def __init__(self, profile: LatencyProfile, *, script: "_Script | None" = None):
+        super().__init__()
+        self.profile = profile
+        self.requests = 0
+        self._script = script or _Script()
+
+    @property
+    def steps(self) -> list[LLMStep]:
+        return self._script.steps
+
+    def replica(self, profile: LatencyProfile) -> "StubLLM":
+        """Another provider with different latencies, answering from the same script."""
+        return StubLLM(profile, script=self._script)
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def provider(self) -> str:
+        return "benchmark"
+
+    def script(self, steps: list[LLMStep]) -> None:
+        self.steps.extend(steps)
+
+    def chat(self, *, chat_ctx: llm.ChatContext, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        tools = tools or []
+        script = self._script
+        request = _answered_item(chat_ctx)
+        if not tools:
+            step = LLMStep(text="Visitor discussed automation needs with Sylvia.")
+        elif request is not None and request == script.last_request:
+            step = script.last_step
+        elif script.steps:
+            step = script.steps.pop(0)
+        else:
+            step = LLMStep(text="Sure thing - anything else I can help with?")
+        if tools:
+            script.last_request, script.last_step = request, step
+        self.requests += 1
+        return _StubLLMStream(
+            self,
+            step=step,
+            first_delay=self.profile.first_response_delay(self.profile.llm_ttft, self.requests),
+            chat_ctx=chat_ctx,
+            tools=tools,
+            conn_options=conn_options,
+        )
+
+
+@dataclass
+class _Script:
+    """Scripted steps, shared by a StubLLM and its replicas."""
+
+    steps: list[LLMStep] = field(default_factory=list)
+    last_request: tuple[str, str] | None = None
+    last_step: LLMStep | None = None
+
+
+def _answered_item(chat_ctx: llm.ChatContext) -> tuple[str, str] | None:
+    """The last non-system item of a request: the user message or tool output being answered."""
+    for item in reversed(chat_ctx.items):
+        if item.type == "message" and item.role != "system":
+            return (item.role, item.text_content or "")
+        if item.type == "function_call_output":
+            return (item.call_id, item.output)
+    return None
+
+
+class _StubLLMStream(llm.LLMStream):
+    def __init__(self, stub: StubLLM, *, step: LLMStep, first_delay: float, chat_ctx, tools, conn_options):
+        super().__init__(stub, chat_ctx=chat_ctx, tools=tools, conn_options=conn_options)
+        self._step = step
+        self._first_delay = first_delay
+
+    async def _run(self) -> None:
+        profile: LatencyProfile = self._llm.profile
+        messages, _ = self._chat_ctx.to_provider_format("openai")
+        schemas = [
+            llm_utils.build_strict_openai_schema(tool)
+            for tool in self._tools
+            if llm.is_function_tool(tool)
+        ]
+        prompt_tokens = estimate_tokens(messages) + estimate_tokens(schemas)
+
+        await asyncio.sleep(self._first_delay)
+        request_id = utils.shortuuid()
+        completion_tokens = 0
+
+        for word in self._step.text.split(" ") if self._step.text else []:
+            token = word + " "
+            completion_tokens += 1
+            self._event_ch.send_nowait(
+                llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(role="assistant", content=token))
+            )
+            await asyncio.sleep(1 / profile.llm_tokens_per_second)
+
+        if self._step.tool_calls:
+            # Strict schemas make OpenAI send every parameter, with null for the ones it skips
+            parameters = {
+                schema["function"]["name"]: schema["function"]["parameters"]["properties"]
+                for schema in schemas
+            }
+            calls = [
+                llm.FunctionToolCall(
+                    name=call["name"],
+                    arguments=json.dumps(
+                        {**dict.fromkeys(parameters.get(call["name"], {})), **call.get("arguments", {})}
+                    ),
+                    call_id=utils.shortuuid("call_"),
+                )
+                for call in self._step.tool_calls
+            ]
+            completion_tokens += estimate_tokens([c.model_dump() for c in calls])
+            self._event_ch.send_nowait(
+                llm.ChatChunk(id=request_id, delta=llm.ChoiceDelta(role="assistant", tool_calls=calls))
+            )
+
+        self._event_ch.send_nowait(
+            llm.ChatChunk(
+                id=request_id,
+                usage=llm.CompletionUsage(
+                    completion_tokens=completion_tokens,
+                    prompt_tokens=prompt_tokens,
+                    total_tokens=prompt_tokens + completion_tokens,
+                ),
+            )
+        )
+
+
+class StubTTS(tts.TTS):
+    """Non-streaming TTS that returns a quiet tone sized to the text."""
+
+    def __init__(self, profile: LatencyProfile):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+        )
+        self.profile = profile
+        self.requests = 0
+        self.characters = 0
+        self._opts = type("_Opts", (), {"voice": "stub"})()
+
+    @property
+    def model(self) -> str:
+        return "stub"
+
+    @property
+    def provider(self) -> str:
+        return "benchmark"
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        self.requests += 1
+        self.characters += len(text)
+        return _StubChunkedStream(
+            tts=self,
+            input_text=text,
+            first_delay=self.profile.first_response_delay(self.profile.tts_ttfb, self.requests),
+            conn_options=conn_options,
+        )
+
+
+class _StubChunkedStream(tts.ChunkedStream):
+    def __init__(self, *, first_delay: float, **kwargs):
+        super().__init__(**kwargs)
+        self._first_delay = first_delay
+
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        await asyncio.sleep(self._first_delay)
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            mime_type="audio/pcm",
+        )
+        num_samples = max(1, int(len(self.input_text) * SECONDS_PER_CHAR * SAMPLE_RATE))
+        output_emitter.push(b"\x10\x00" * num_samples)
+        output_emitter.flush()
+
+
+class BenchAudioOutput(io.AudioOutput):
+    """Audio sink that timestamps the first frame of each segment and plays out instantly."""
+
+    def __init__(self):
+        super().__init__(
+            label="BenchAudioOutput",
+            capabilities=io.AudioOutputCapabilities(pause=False),
+            sample_rate=SAMPLE_RATE,
+        )
+        self.first_frame_times: list[float] = []
+        self.audio_duration = 0.0
+        self._segment_started = False
+        self._segment_duration = 0.0
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if not self._segment_started:
+            self._segment_started = True
+            self.first_frame_times.append(time.perf_counter())
+        self._segment_duration += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if self._segment_started:
+            self._finish_segment(interrupted=False)
+
+    def clear_buffer(self) -> None:
+        if self._segment_started:
+            self._finish_segment(interrupted=True)
+
+    def _finish_segment(self, *, interrupted: bool) -> None:
+        self.audio_duration += self._segment_duration
+        position = self._segment_duration
+        self._segment_started = False
+        self._segment_duration = 0.0
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
@@ -0,0 +1,151 @@
+"""
+Conversation Compaction - Bounded LLM context for long calls
+============================================================
+Keeps the prompt sent to the LLM within a token budget. Older turns are folded into a
+running summary in the background, while the most recent turns are kept verbatim.
+
+The instructions always stay first and untouched so the provider's prompt cache keeps
+hitting; the summary goes right after them, followed by the verbatim history.
+"""
+
+from livekit.agents import llm
+from typing import Callable
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+SUMMARY_PROMPT = """You maintain a running summary of a sales voice call between Sylvia (Synctrack's AI automation consultant) and a website visitor.
+
+Update the existing summary with the new transcript lines. Keep every concrete fact: the visitor's name, company, contact details, needs, pain points, services discussed, objections and commitments. Drop greetings and small talk. Reply with the updated summary only, in at most 120 words."""
+
+
+def estimate_tokens(item: llm.ChatItem) -> int:
+    """Estimate the token count of a chat item."""
+    if item.type == "message":
+        text = item.text_content or ""
+    elif item.type == "function_call":
+        text = item.name + item.arguments
+    else:
+        text = item.output
+    return len(text) // CHARS_PER_TOKEN + 4  # per-item overhead
+
+
+def _transcript_line(item: llm.ChatItem) -> str:
+    if item.type == "message":
+        speaker = {"assistant": "Sylvia", "user": "Visitor"}.get(item.role, "[note]")
+        return f"{speaker}: {item.text_content or ''}"
+    if item.type == "function_call":
+        return f"[tool call] {item.name}({item.arguments})"
+    return f"[tool result] {item.output}"
+
+
+class ConversationCompactor:
+    """Rolling summarization of older turns, keeping the last N user turns verbatim."""
+
+    def __init__(
+        self,
+        *,
+        token_budget: int = 3000,
+        keep_turns: int = 6,
+        on_summary: Callable[[str], None] | None = None,
+    ):
+        """
+        Args:
+            token_budget: Max estimated tokens of conversation history (excluding instructions)
+            keep_turns: Number of most recent user turns that are never summarized
+            on_summary: Called with the new summary whenever it is updated
+        """
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.on_summary = on_summary
+
+        self.summary = ""
+        self._summarized_ids: set[str] = set()
+        self._summarize_task: asyncio.Task | None = None
+
+    def compact(self, chat_ctx: llm.ChatContext, summarizer: llm.LLM) -> llm.ChatContext:
+        """Return the context to send to the LLM, scheduling summarization when over budget.
+
+        Never blocks on summarization: until a new summary is ready, the turns waiting to be
+        summarized are still sent verbatim.
+        """
+        # Only the leading system messages are the static prefix; later ones (per-turn
+        # notes) stay in place within the history
+        instructions = []
+        history = []
+        for item in chat_ctx.items:
+            if not history and item.type == "message" and item.role in ("system", "developer"):
+                instructions.append(item)
+            elif item.id not in self._summarized_ids:
+                history.append(item)
+
+        history_tokens = sum(estimate_tokens(item) for item in history)
+        summary_tokens = len(self.summary) // CHARS_PER_TOKEN
+        logger.info(
+            "LLM context: %s history items, ~%s history tokens, ~%s summary tokens",
+            len(history), history_tokens, summary_tokens,
+        )
+
+        if history_tokens > self.token_budget and not self._summarizing:
+            older = self._older_than_recent_turns(history)
+            if older:
+                self._summarize_task = asyncio.create_task(self._summarize(older, summarizer))
+
+        items = list(instructions)
+        if self.summary:
+            items.append(
+                llm.ChatMessage(
+                    role="system",
+                    content=[f"Summary of the conversation so far:\n{self.summary}"],
+                )
+            )
+        items.extend(history)
+        return llm.ChatContext(items)
+
+    @property
+    def _summarizing(self) -> bool:
+        return self._summarize_task is not None and not self._summarize_task.done()
+
+    def _older_than_recent_turns(self, history: list[llm.ChatItem]) -> list[llm.ChatItem]:
+        """Items before the last `keep_turns` user messages (cut on a user turn, so tool
+        calls and their outputs are never split)."""
+        user_indexes = [
+            i for i, item in enumerate(history) if item.type == "message" and item.role == "user"
+        ]
+        if len(user_indexes) <= self.keep_turns:
+            return []
+        return history[:user_indexes[-self.keep_turns]]
+
+    async def _summarize(self, items: list[llm.ChatItem], summarizer: llm.LLM) -> None:
+        transcript = "\n".join(_transcript_line(item) for item in items)
+        request = llm.ChatContext.empty()
+        request.add_message(role="system", content=SUMMARY_PROMPT)
+        request.add_message(
+            role="user",
+            content=f"Existing summary:\n{self.summary or '(none)'}\n\nNew transcript:\n{transcript}",
+        )
+
+        try:
+            parts = []
+            async with summarizer.chat(chat_ctx=request) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        parts.append(chunk.delta.content)
+        except Exception as e:
+            logger.warning("Conversation summarization failed: %s", e)
+            return
+
+        summary = "".join(parts).strip()
+        if not summary:
+            return
+
+        self.summary = summary
+        self._summarized_ids.update(item.id for item in items)
+        logger.info("Compacted %s chat items into a ~%s token summary", len(items), len(summary) // CHARS_PER_TOKEN)
+
+        if self.on_summary:
+            self.on_summary(summary)
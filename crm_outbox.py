@@ -0,0 +1,278 @@
+"""
+CRM Outbox - Durable, non-blocking lead delivery to the n8n webhook
+===================================================================
+send_to_crm and on_exit append the lead to an on-disk outbox and return right away;
+a background task delivers it over the pooled CRM client, retrying with exponential
+backoff until n8n accepts it. Every lead carries an idempotency key, so a retry (or a
+replay after a crash) can't create a duplicate on the receiving side.
+
+Each job process owns one append-only JSONL file in the outbox directory and holds
+an exclusive lock on it while alive. Files whose lock is free belong to processes
+that died (or exited before delivering), and are claimed and replayed by the next
+outbox that starts. Writes and fsyncs to it run in a thread, off the event loop.
+
+A lead that fails for any reason other than the network or a retryable status (n8n
+rejecting it, a payload that can't be sent) goes to dead-letter.jsonl and the
+outbox moves on to the next one.
+"""
+
+from datetime import datetime
+from typing import Callable
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import random
+import time
+import uuid
+
+import httpx
+
+import latency_metrics
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying; any other non-2xx response means n8n will never accept the lead
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CrmOutbox:
+    """Queue of leads waiting for delivery to the CRM webhook."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        directory: str,
+        batch_size: int = 1,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.client = client
+        self.url = url
+        self.directory = directory
+        self.batch_size = max(1, batch_size)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._pending: dict[str, dict] = {}  # idempotency key -> payload, in enqueue order
+        self._on_delivered: dict[str, Callable[[str], None]] = {}  # idempotency key -> callback
+        self._file = None
+        self._io_lock: asyncio.Lock | None = None  # Orders file writes against _pending changes
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        """Open this process's outbox file, claim orphaned ones and start delivering.
+
+        Must be called from the job's event loop.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"outbox-{uuid.uuid4().hex}.jsonl")
+        self._file = open(path, "a", encoding="utf-8")
+        fcntl.flock(self._file, fcntl.LOCK_EX)  # Held until this process exits
+
+        for orphan in glob.glob(os.path.join(self.directory, "outbox-*.jsonl")):
+            if orphan != path:
+                self._claim(orphan)
+
+        self._io_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        if self._pending:
+            logger.info("📬 Replaying %s undelivered lead(s) from the CRM outbox", len(self._pending))
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, payload: dict, on_delivered: Callable[[str], None] | None = None) -> str:
+        """Durably queue a lead for delivery. Returns its idempotency key.
+
+        on_delivered(key) runs in a thread once the CRM accepts the lead, and never if it
+        rejects it. It isn't persisted: leads replayed by another process don't call it.
+        Call after start().
+        """
+        key = uuid.uuid4().hex
+        payload = {**payload, "idempotency_key": key}
+        async with self._io_lock:
+            await asyncio.to_thread(self._append, {"op": "enqueue", "key": key, "payload": payload})
+            self._pending[key] = payload
+        if on_delivered is not None:
+            self._on_delivered[key] = on_delivered
+        logger.info("📥 Lead queued for CRM: %s from %s", payload.get("name"), payload.get("company"))
+
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return key
+
+    async def aclose(self, timeout: float = 5.0) -> None:
+        """Give queued leads up to `timeout` seconds to go out, then stop.
+
+        Anything still undelivered stays on disk for the next outbox to replay.
+        """
+        if self._task is None:
+            return
+
+        deadline = time.monotonic() + timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # The file (and its lock) stays open until the process exits, so leads queued
+        # after this point are still persisted for replay
+        if self._pending:
+            logger.warning("⚠️ %s lead(s) left in the CRM outbox for replay", len(self._pending))
+
+    def _append(self, record: dict) -> None:
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _claim(self, path: str) -> None:
+        """Take over a dead process's outbox file, if nobody else holds it."""
+        try:
+            f = open(path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # Owner is still alive
+            if os.fstat(f.fileno()).st_nlink == 0:
+                return  # Another process claimed it while we waited for the lock
+
+            pending = {}
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if record["op"] == "enqueue":
+                        pending[record["key"]] = dict(record["payload"])
+                    else:
+                        for key in record["keys"]:
+                            pending.pop(key, None)
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Skipping unreadable line in %s", path)  # e.g. a torn write from a crash
+
+            # Re-queue into our own file before dropping the orphan
+            for key, payload in pending.items():
+                self._append({"op": "enqueue", "key": key, "payload": payload})
+            self._pending.update(pending)
+            os.unlink(path)
+
+    async def _mark(self, op: str, keys: list[str]) -> None:
+        async with self._io_lock:
+            for key in keys:
+                self._pending.pop(key, None)
+            if self._pending:
+                await asyncio.to_thread(self._append, {"op": op, "keys": keys})
+            else:
+                # Nothing left to replay - start the log over
+                await asyncio.to_thread(self._file.truncate, 0)
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+
+            batch = list(self._pending.items())[:self.batch_size]
+            keys = [key for key, _ in batch]
+            try:
+                outcome = await self._deliver(batch)
+            except Exception:
+                # Not the network: a lead that can't be sent as it is, so retrying won't help
+                logger.exception("Could not send %s lead(s) to the CRM", len(batch))
+                outcome = "rejected"
+
+            try:
+                if outcome == "delivered":
+                    # Before marking, so aclose() waits for the callbacks too
+                    await self._notify_delivered(keys)
+                    await self._mark("delivered", keys)
+                    attempt = 0
+                    continue
+                if outcome == "rejected":
+                    await asyncio.to_thread(self._dead_letter, batch)
+                    for key in keys:
+                        self._on_delivered.pop(key, None)
+                    await self._mark("dead", keys)
+                    attempt = 0
+                    continue
+            except OSError as e:
+                # The outcome is settled in memory; the file may replay it, which the idempotency key absorbs
+                for key in keys:
+                    self._pending.pop(key, None)
+                logger.error("Could not update the CRM outbox file: %s", e)
+                continue
+
+            delay = self._backoff(attempt)
+            attempt += 1
+            logger.warning("CRM delivery failed, retrying in %.1fs (%s pending)", delay, len(self._pending))
+            await asyncio.sleep(delay)
+
+    async def _notify_delivered(self, keys: list[str]) -> None:
+        for key in keys:
+            callback = self._on_delivered.pop(key, None)
+            if callback is None:
+                continue
+            try:
+                await asyncio.to_thread(callback, key)
+            except Exception as e:
+                logger.error("Delivered-lead callback failed for %s: %s", key, e)
+
+    async def _deliver(self, batch: list[tuple[str, dict]]) -> str:
+        """POST one batch. Returns "delivered", "rejected" (permanent) or "retry"."""
+        payloads = [payload for _, payload in batch]
+        headers = {"Content-Type": "application/json"}
+        if len(batch) == 1:
+            headers["Idempotency-Key"] = batch[0][0]
+
+        started = time.perf_counter()
+        try:
+            logger.info("📤 Sending %s lead(s) to CRM webhook: %s", len(batch), self.url)
+            response = await self.client.post(
+                self.url,
+                json=payloads if self.batch_size > 1 else payloads[0],
+                headers=headers,
+                timeout=10.0,
+            )
+        except httpx.HTTPError as e:
+            latency_metrics.observe_crm_webhook(time.perf_counter() - started, "error")
+            logger.error("Error sending to CRM: %s", e)
+            return "retry"
+
+        if response.is_success:
+            latency_metrics.observe_crm_webhook(time.perf_counter() - started, "success")
+            for payload in payloads:
+                logger.info("✅ Lead sent to CRM: %s from %s", payload["name"], payload["company"])
+            return "delivered"
+
+        latency_metrics.observe_crm_webhook(time.perf_counter() - started, "rejected")
+        logger.error("❌ CRM webhook failed: %s - %s", response.status_code, response.text)
+        return "retry" if response.status_code in RETRYABLE_STATUSES else "rejected"
+
+    def _dead_letter(self, batch: list[tuple[str, dict]]) -> None:
+        """Keep leads n8n refused, so they can be fixed and re-sent by hand."""
+        path = os.path.join(self.directory, "dead-letter.jsonl")
+        with open(path, "a", encoding="utf-8") as f:
+            for key, payload in batch:
+                record = {"key": key, "payload": payload, "failed_at": datetime.utcnow().isoformat() + "Z"}
+                f.write(json.dumps(record, default=str) + "\n")
+        logger.error("❌ %s lead(s) rejected by the CRM, saved to %s", len(batch), path)
@@ -0,0 +1,109 @@
+"""
+Email Validation - Normalize emails and catch domain typos before read-back
+==========================================================================
+Turns what the STT heard into a well-formed address and spots likely domain typos
+("gmial dot com" -> "gmail.com") before Sylvia spells it back, so fewer read-backs
+end in "no, that's wrong" and a letter-by-letter respell.
+
+A typo only yields a suggestion for Sylvia to offer; the address stored is always the
+one the visitor gave or confirmed.
+"""
+
+from dataclasses import dataclass
+from typing import Collection
+import re
+
+# Spoken tokens inside an email address
+SPOKEN_SYMBOLS = {
+    "at": "@",
+    "dot": ".",
+    "period": ".",
+    "point": ".",
+    "underscore": "_",
+    "dash": "-",
+    "hyphen": "-",
+    "minus": "-",
+    "plus": "+",
+}
+
+# Mailbox providers for our visitors (US + DACH). Only these are ever suggested, so a
+# company domain that happens to be one letter off (hive.com, mall.com) is left alone
+PROVIDER_DOMAINS = frozenset({
+    "gmail.com", "googlemail.com", "outlook.com", "hotmail.com", "yahoo.com", "icloud.com",
+    "gmx.de", "gmx.net", "web.de", "t-online.de", "live.com", "aol.com", "protonmail.com",
+    "yahoo.de", "hotmail.de", "outlook.de", "freenet.de", "posteo.de", "mailbox.org",
+})
+
+# TLDs the STT (or the visitor) commonly gets wrong; only applied to provider domains
+TLD_TYPOS = {
+    "con": "com", "cmo": "com", "comm": "com", "vom": "com", "xom": "com", "ocm": "com",
+    "cpm": "com", "coom": "com", "nett": "net", "ner": "net", "nte": "net", "dee": "de",
+}
+
+EMAIL_SYNTAX_RE = re.compile(
+    r"^[a-z0-9](?:[a-z0-9._%+-]*[a-z0-9_%+-])?@[a-z0-9](?:[a-z0-9-]*[a-z0-9])?"
+    r"(?:\.[a-z0-9](?:[a-z0-9-]*[a-z0-9])?)*\.[a-z]{2,}$"
+)
+
+
+@dataclass
+class EmailCheck:
+    """Result of checking an email address the visitor gave us."""
+
+    original: str
+    email: str | None  # Normalized address as given, None if invalid
+    suggestion: str | None = None  # Likely intended address, for the agent to offer
+
+    @property
+    def valid(self) -> bool:
+        return self.email is not None
+
+
+def normalize_email(raw: str) -> str:
+    """Turn spoken/STT forms ("John Dot Smith at acme dot com") into "john.smith@acme.com"."""
+    text = raw.strip().lower()
+    text = re.sub(r"^mailto:", "", text)
+    tokens = re.split(r"[\s,]+", text)
+    return "".join(SPOKEN_SYMBOLS.get(token, token) for token in tokens if token).strip(".!?")
+
+
+def _transpositions(domain: str):
+    for i in range(len(domain) - 1):
+        if domain[i] != domain[i + 1]:
+            yield domain[:i] + domain[i + 1] + domain[i] + domain[i + 2:]
+
+
+def suggest_domain(domain: str) -> str | None:
+    """The provider domain a misheard/mistyped one most likely meant, or None if it looks fine.
+
+    Only a mistyped TLD ("gmail.con") and/or one swapped pair of letters ("gmial.com")
+    count, and only when that turns it into a provider domain.
+    """
+    if domain in PROVIDER_DOMAINS:
+        return None
+
+    name, _, tld = domain.rpartition(".")
+    candidates = [domain]
+    if tld in TLD_TYPOS:
+        candidates.insert(0, f"{name}.{TLD_TYPOS[tld]}")
+    for candidate in candidates:
+        if candidate in PROVIDER_DOMAINS:
+            return candidate
+        for swapped in _transpositions(candidate):
+            if swapped in PROVIDER_DOMAINS:
+                return swapped
+    return None
+
+
+def check_email(raw: str, known_domains: Collection[str] = ()) -> EmailCheck:
+    """Normalize an email, validate its syntax and suggest a fix for a likely domain typo.
+
+    known_domains are domains the visitor already stood by; they get no suggestion.
+    """
+    email = normalize_email(raw)
+    if not EMAIL_SYNTAX_RE.match(email) or ".." in email:
+        return EmailCheck(original=raw, email=None)
+
+    local, domain = email.split("@", 1)
+    suggestion = None if domain in known_domains else suggest_domain(domain)
+    return EmailCheck(original=raw, email=email, suggestion=f"{local}@{suggestion}" if suggestion else None)
@@ -0,0 +1,81 @@
+"""
+Endpointing - How long Sylvia waits before answering
+====================================================
+The turn-detector model decides whether the visitor has finished their thought;
+the endpointing delays bound how long Sylvia waits after they stop speaking
+(min when the model says the turn is over, max when it says it isn't).
+
+Reading out an email address or phone number is full of pauses that look like a
+finished turn, so while one is being dictated - or Sylvia has just asked for one -
+the controller switches the session to longer, stricter delays, and back once the
+turn is done.
+"""
+
+from dataclasses import dataclass
+import logging
+import re
+
+from livekit.agents import AgentSession
+
+from lead_extraction import is_dictating
+
+logger = logging.getLogger(__name__)
+
+# Sylvia asking for contact details ("What's the best email to reach you?")
+ASKS_FOR_CONTACT_RE = re.compile(
+    r"\b(?:what'?s|what is|can I (?:get|have)|could you|share|best|your)\b[^.!?]*"
+    r"\b(?:e-?mail|phone|number)\b[^.!]*\?",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class EndpointingDelays:
+    min_delay: float
+    max_delay: float
+
+
+class EndpointingController:
+    """Switches a session between normal and dictation endpointing delays."""
+
+    def __init__(self, session: AgentSession, normal: EndpointingDelays, dictation: EndpointingDelays):
+        self.session = session
+        self.normal = normal
+        self.dictation = dictation
+        self._expecting_contact = False  # Sylvia just asked for an email/phone
+        self._dictating = False  # The current user turn looks like one being read out
+        self._strict = False
+
+        session.on("user_input_transcribed", self._on_user_input_transcribed)
+        session.on("conversation_item_added", self._on_conversation_item_added)
+
+    def _on_user_input_transcribed(self, ev) -> None:
+        # Interim transcripts arrive before the user stops speaking, in time to change the delay
+        if not self._dictating and is_dictating(ev.transcript):
+            self._dictating = True
+            self._apply()
+
+    def _on_conversation_item_added(self, ev) -> None:
+        item = ev.item
+        if getattr(item, "type", None) != "message":
+            return
+        if item.role == "user":
+            # Turn committed - the next one starts from scratch
+            self._dictating = False
+            self._expecting_contact = False
+        elif item.role == "assistant":
+            self._expecting_contact = bool(ASKS_FOR_CONTACT_RE.search(item.text_content or ""))
+        self._apply()
+
+    def _apply(self) -> None:
+        strict = self._dictating or self._expecting_contact
+        if strict == self._strict:
+            return
+        self._strict = strict
+
+        delays = self.dictation if strict else self.normal
+        logger.info("Endpointing: %s (%ss-%ss)", "dictation" if strict else "normal", delays.min_delay, delays.max_delay)
+        self.session.update_options(
+            min_endpointing_delay=delays.min_delay,
+            max_endpointing_delay=delays.max_delay,
+        )
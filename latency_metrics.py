@@ -0,0 +1,276 @@
+"""
+Latency Metrics - Per-turn timings for the voice pipeline
+=========================================================
+Records, for every user turn, how long each stage took after the visitor stopped
+speaking:
+
+    end of user speech -> STT final -> end of turn -> LLM first token
+                       -> TTS first byte -> Sylvia starts speaking
+
+plus per-tool execution spans, CRM webhook latency/outcome, the outcomes of
+speculative LLM replies (with the tokens discarded drafts cost), answer cache
+lookups and per-provider first-response latency, hedges and failovers. Everything is
+observed into Prometheus histograms (one set per worker, aggregated across its job
+processes) and each turn's timeline is logged when the next one starts.
+
+Every job runs in its own process, so the histograms use prometheus_client's
+multiprocess mode: start_metrics_server() must run in the main worker process
+before any job process is started. Job processes are single use and each one
+writes its own *_{pid}.db files, so a job folds them into the worker's *_merged.db
+files on shutdown (mark_process_dead()); only jobs that crash leave theirs
+behind, until the worker restarts and clears the directory.
+"""
+
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+from typing import Callable
+import fcntl
+import glob
+import logging
+import os
+import shutil
+import tempfile
+
+from livekit.agents import AgentSession, metrics
+import prometheus_client
+from prometheus_client import multiprocess
+from prometheus_client.mmap_dict import MmapedDict
+
+logger = logging.getLogger(__name__)
+
+# Voice response budgets are ~1s, so resolution matters most below 2s
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+# Stages of a turn, in pipeline order
+TURN_STAGES = ("stt_final", "end_of_turn", "llm_first_token", "tts_first_byte", "agent_speaking")
+
+TURN_STAGE_SECONDS = prometheus_client.Histogram(
+    "sylvia_turn_stage_seconds",
+    "Time from the end of user speech until each pipeline stage",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+TOOL_SECONDS = prometheus_client.Histogram(
+    "sylvia_tool_seconds",
+    "Function tool execution time",
+    ["tool", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+CRM_WEBHOOK_SECONDS = prometheus_client.Histogram(
+    "sylvia_crm_webhook_seconds",
+    "CRM webhook request time",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SPECULATIONS = prometheus_client.Counter(
+    "sylvia_llm_speculations_total",
+    "Speculative LLM replies by outcome (hit, miss, cancelled)",
+    ["outcome"],
+)
+
+SPECULATION_WASTED_TOKENS = prometheus_client.Counter(
+    "sylvia_llm_speculation_wasted_tokens_total",
+    "Tokens spent on speculative LLM replies that were discarded",
+    ["kind"],
+)
+
+ANSWER_CACHE_LOOKUPS = prometheus_client.Counter(
+    "sylvia_answer_cache_lookups_total",
+    "Answer cache lookups by outcome (curated or learned hit, miss, skipped)",
+    ["outcome"],
+)
+
+PROVIDER_FIRST_RESPONSE_SECONDS = prometheus_client.Histogram(
+    "sylvia_provider_first_response_seconds",
+    "Time to first token (LLM) or first audio (TTS) per provider",
+    ["stage", "provider"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PROVIDER_EVENTS = prometheus_client.Counter(
+    "sylvia_provider_events_total",
+    "Provider router events (hedged, error, failover, cooldown)",
+    ["stage", "provider", "event"],
+)
+
+
+# Metric types whose per-process samples add up, so a finished job's file can be
+# summed into the worker's merged file (live gauges are dropped instead)
+MERGED_TYPES = ("counter", "histogram", "summary")
+
+# Held exclusively while a job merges its files, shared while a scrape reads them,
+# so a scrape never sees a job's samples twice or not at all
+MERGE_LOCK = ".merge.lock"
+
+
+@contextmanager
+def _merge_lock(metrics_dir: str, operation: int):
+    with open(os.path.join(metrics_dir, MERGE_LOCK), "a") as lock:
+        fcntl.flock(lock, operation)
+        yield
+
+
+class _MergeAwareCollector(multiprocess.MultiProcessCollector):
+    def collect(self):
+        with _merge_lock(self._path, fcntl.LOCK_SH):
+            return super().collect()
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve the worker's metrics on :{port}/metrics, aggregated across job processes.
+
+    Must be called in the main process before the worker starts, so the job
+    processes inherit PROMETHEUS_MULTIPROC_DIR and write their samples there.
+    """
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        # Samples from a previous run of this worker would otherwise be merged in
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+    else:
+        metrics_dir = tempfile.mkdtemp(prefix="sylvia-metrics-")
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = metrics_dir
+
+    registry = prometheus_client.CollectorRegistry()
+    _MergeAwareCollector(registry, path=metrics_dir)
+    prometheus_client.start_http_server(port, registry=registry)
+    logger.info("📈 Metrics available on :%s/metrics", port)
+
+
+def mark_process_dead() -> None:
+    """Fold this job process's samples into the worker's merged files, then remove its own.
+
+    Call last on job shutdown: anything observed afterwards is lost. Does nothing
+    when metrics aren't enabled.
+    """
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not metrics_dir:
+        return
+
+    pid = os.getpid()
+    multiprocess.mark_process_dead(pid, metrics_dir)
+    with _merge_lock(metrics_dir, fcntl.LOCK_EX):
+        for kind in MERGED_TYPES:
+            for path in glob.glob(os.path.join(metrics_dir, f"{kind}_{pid}.db")):
+                merged = MmapedDict(os.path.join(metrics_dir, f"{kind}_merged.db"))
+                try:
+                    for key, value, _, _ in MmapedDict.read_all_values_from_file(path):
+                        total, _ = merged.read_value(key)
+                        merged.write_value(key, total + value, 0.0)
+                finally:
+                    merged.close()
+                os.remove(path)
+
+
+def observe_crm_webhook(duration: float, outcome: str) -> None:
+    """Record one CRM webhook call ("success", "rejected" or "error")."""
+    CRM_WEBHOOK_SECONDS.labels(outcome=outcome).observe(duration)
+
+
+def observe_speculation(outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    """Record one speculative reply ("hit", "miss" or "cancelled") and the tokens it wasted."""
+    SPECULATIONS.labels(outcome=outcome).inc()
+    SPECULATION_WASTED_TOKENS.labels(kind="prompt").inc(prompt_tokens)
+    SPECULATION_WASTED_TOKENS.labels(kind="completion").inc(completion_tokens)
+
+
+def observe_answer_cache(outcome: str) -> None:
+    """Record one answer cache lookup ("curated", "learned", "miss" or "skipped")."""
+    ANSWER_CACHE_LOOKUPS.labels(outcome=outcome).inc()
+
+
+def observe_provider_latency(stage: str, provider: str, duration: float) -> None:
+    """Record a provider's time to first token/audio for a request it answered."""
+    PROVIDER_FIRST_RESPONSE_SECONDS.labels(stage=stage, provider=provider).observe(duration)
+
+
+def observe_provider_event(stage: str, provider: str, event: str) -> None:
+    """Count a router event ("hedged", "error", "failover" or "cooldown") for a provider."""
+    PROVIDER_EVENTS.labels(stage=stage, provider=provider, event=event).inc()
+
+
+@dataclass
+class TurnTimeline:
+    """Stage offsets (seconds after end of user speech) for one user turn."""
+
+    speech_id: str
+    user_speech_end: float  # wall clock, time.time()
+    stages: dict[str, float] = field(default_factory=dict)
+    tools: list[tuple[str, float]] = field(default_factory=list)
+
+    def record(self, stage: str, at: float) -> None:
+        """Record the first time a stage was reached (later LLM/TTS calls in the turn don't count)."""
+        if stage in self.stages:
+            return
+        offset = max(0.0, at - self.user_speech_end)
+        self.stages[stage] = offset
+        TURN_STAGE_SECONDS.labels(stage=stage).observe(offset)
+
+    def describe(self) -> str:
+        parts = [f"{stage}={self.stages[stage]:.3f}s" for stage in TURN_STAGES if stage in self.stages]
+        parts += [f"tool:{name}={duration:.3f}s" for name, duration in self.tools]
+        return " ".join(parts) or "no stages recorded"
+
+
+class TurnLatencyTracker:
+    """Builds a TurnTimeline per user turn from AgentSession events."""
+
+    def __init__(self, session: AgentSession, on_turn: Callable[[TurnTimeline], None] | None = None):
+        self.session = session
+        self.on_turn = on_turn  # Called with each finished turn (e.g. to archive it)
+        self.current: TurnTimeline | None = None
+
+        session.on("metrics_collected", self._on_metrics_collected)
+        session.on("agent_state_changed", self._on_agent_state_changed)
+        session.on("function_tools_executed", self._on_function_tools_executed)
+        session.on("close", lambda ev: self._finish_turn())
+
+    def _turn_for(self, speech_id: str | None) -> TurnTimeline | None:
+        if self.current is not None and speech_id == self.current.speech_id:
+            return self.current
+        return None
+
+    def _current_speech_id(self) -> str | None:
+        speech = self.session.current_speech
+        return speech.id if speech is not None else None
+
+    def _finish_turn(self) -> None:
+        if self.current is not None:
+            logger.info("⏱️ Turn latency: %s", self.current.describe())
+            if self.on_turn is not None:
+                self.on_turn(self.current)
+            self.current = None
+
+    def _on_metrics_collected(self, ev) -> None:
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics):
+            self._finish_turn()
+            if not m.last_speaking_time:
+                return  # End of speech wasn't detected, nothing to measure from
+            self.current = TurnTimeline(speech_id=m.speech_id, user_speech_end=m.last_speaking_time)
+            self.current.record("stt_final", m.last_speaking_time + m.transcription_delay)
+            self.current.record("end_of_turn", m.last_speaking_time + m.end_of_utterance_delay)
+        elif isinstance(m, metrics.LLMMetrics):
+            # Metrics are emitted when the request finishes; work back to the first token
+            if (turn := self._turn_for(m.speech_id)) and not m.cancelled:
+                turn.record("llm_first_token", m.timestamp - m.duration + m.ttft)
+        elif isinstance(m, metrics.TTSMetrics):
+            if (turn := self._turn_for(m.speech_id)) and not m.cancelled:
+                turn.record("tts_first_byte", m.timestamp - m.duration + m.ttfb)
+
+    def _on_agent_state_changed(self, ev) -> None:
+        if ev.new_state == "speaking" and (turn := self._turn_for(self._current_speech_id())):
+            turn.record("agent_speaking", ev.created_at)
+
+    def _on_function_tools_executed(self, ev) -> None:
+        turn = self.current
+        for call, output in ev.zipped():
+            finished_at = output.created_at if output is not None else ev.created_at
+            duration = max(0.0, finished_at - call.created_at)
+            outcome = "error" if output is None or output.is_error else "success"
+            TOOL_SECONDS.labels(tool=call.name, outcome=outcome).observe(duration)
+            if turn is not None:
+                turn.tools.append((call.name, duration))
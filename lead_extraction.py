@@ -0,0 +1,198 @@
+"""
+Lead Extraction - Local slot filling from transcripts
+=====================================================
+Pulls names, companies, emails and phone numbers out of the visitor's final transcript
+with precompiled regexes, before the LLM sees the turn. Captured values go straight
+into lead_data, so the LLM only has to confirm them instead of spending a tool call
+round trip on each one.
+
+Handles spoken forms the STT produces, like "john dot smith at acme dot com" or
+"five five five, zero one two three".
+"""
+
+from email_validation import normalize_email
+import re
+
+# Words that look like an email local part in "<word> at <domain>" but never are:
+# pronouns, contraction tails the STT splits off ("that s", "we re") and verbs
+_NOT_EMAIL_LOCAL = {
+    "am", "are", "be", "based", "is", "it", "located", "me", "them", "us", "was", "we",
+    "were", "work", "working", "you", "i", "he", "she", "they", "here", "there", "still",
+    "s", "re", "m", "ve", "ll", "d", "t", "that", "what", "now", "right", "also", "only",
+    "met", "meet", "meeting", "saw", "see", "seen", "found", "find", "live", "lives",
+    "living", "stay", "staying", "stayed", "arrive", "arrived", "start", "started", "worked",
+    "works", "look", "looking", "call", "called", "calling", "reach", "reached", "sell",
+    "selling", "shop", "shopping", "bought", "buy", "sign", "signed", "post", "posted",
+    "job", "jobs", "employed", "hired", "interned", "studied", "study", "studying",
+}
+
+# Number words the STT produces when someone reads out digits
+_DIGIT_WORDS = {
+    "zero": "0", "oh": "0", "o": "0", "one": "1", "two": "2", "three": "3", "four": "4",
+    "five": "5", "six": "6", "seven": "7", "eight": "8", "nine": "9",
+}
+
+# Legal-form suffixes that mark a company name
+_COMPANY_SUFFIXES = (
+    r"Inc|LLC|L\.L\.C|Ltd|Limited|GmbH|UG|AG|KG|Corp|Corporation|Co|Company|PLC|LLP|"
+    r"S\.?A|S\.?L|B\.?V|Pty|Group|Holdings|Solutions|Technologies|Labs|Studio|Agency"
+)
+
+# Capitalized words that follow a name or company cue without being one (compared lowercased)
+_STOP_WORDS = {
+    "doing", "fine", "good", "great", "glad", "happy", "here", "interested", "just", "looking",
+    "not", "okay", "ok", "really", "still", "sure", "thinking", "trying", "very", "well",
+    "calling", "curious", "wondering", "busy", "sorry", "excited", "from", "with", "at",
+    "amazing", "awesome", "helpful", "perfect", "maybe", "currently", "using", "also", "only",
+    "actually", "basically", "probably", "the", "a", "an", "this", "that", "it", "we", "our",
+    "my", "your", "you", "they", "some", "all", "no", "yes", "thanks", "thank", "hello", "hi",
+}
+
+EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+
+SPOKEN_EMAIL_RE = re.compile(
+    r"(?<![\w'’])([a-z0-9]+(?:\s+(?:dot|period|underscore|dash|hyphen)\s+[a-z0-9]+)*)"
+    r"\s+at\s+"
+    r"([a-z0-9-]+(?:\s+(?:dot|period)\s+[a-z]{2,})+)\b",
+    re.IGNORECASE,
+)
+
+PHONE_RE = re.compile(r"(?<![\w@])(\+?\d[\d\s().-]{5,}\d)(?![\w@])")
+
+# A number is only a phone number if it's written like one ("555-0123", "+49 30 ...")
+# or is long enough and the visitor is talking about a phone
+_PHONE_GROUPING_RE = re.compile(r"^\+|\d[\s().-]+\d")
+PHONE_CONTEXT_RE = re.compile(
+    r"\b(?:phone|number|call|cell|mobile|landline|reach|text|whatsapp|tel)\b", re.IGNORECASE
+)
+
+DATE_RE = re.compile(r"\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}")
+
+_DIGIT_WORD_RUN_RE = re.compile(
+    r"\b(?:(?:%s)\b[\s,-]*){7,}" % "|".join(_DIGIT_WORDS),
+    re.IGNORECASE,
+)
+
+# Signs the visitor is in the middle of reading out an email address or phone number
+DICTATION_RE = re.compile(
+    r"@|\b(?:dot|underscore|hyphen)\b"  # email symbols
+    r"|\d(?:[\s-]*\d){2,}"  # digits
+    r"|\b(?:%s)(?:[\s,-]+(?:%s)){2,}\b"  # number words
+    r"|\b[a-z](?:[\s-]+[a-z]\b){3,}"  # letter-by-letter spelling
+    % ("|".join(_DIGIT_WORDS), "|".join(_DIGIT_WORDS)),
+    re.IGNORECASE,
+)
+
+# A capitalized span only counts after a cue that introduces a name or company:
+# "my name is Sarah", or "I'm Sarah from ..." (not "I'm Interested", "this is Amazing")
+NAME_RE = re.compile(
+    r"\b(?:[Mm]y name is|[Mm]y name's|[Nn]ame's)\s+([A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)?)"
+    r"|\b(?:[Tt]his is|I am|I'm)\s+([A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)?),?\s+(?:from|with|at|here)\b"
+)
+
+# "from/at Acme GmbH", but not "CRM Solutions" on its own
+COMPANY_WITH_SUFFIX_RE = re.compile(
+    r"\b(?:from|at)\s+((?:[A-Z0-9][\w&'-]*\s+){0,3}[A-Z0-9][\w&'-]*,?\s+(?:%s)\.?)(?=[\s,.!?]|$)"
+    % _COMPANY_SUFFIXES
+)
+
+COMPANY_PHRASE_RE = re.compile(
+    r"\b(?:I work (?:at|for)|I'm with|[Ww]e're called|[Mm]y company is|[Oo]ur company is|[Cc]ompany (?:is )?called|"
+    r"I run|I own|(?:I'm|I am|[Tt]his is|[Mm]y name is)\s+[A-Z][a-z'-]+(?:\s+[A-Z][a-z'-]+)?,?\s+(?:from|with|at))\s+"
+    r"((?:[A-Z0-9][\w&'-]*)(?:\s+[A-Z0-9][\w&'-]*){0,3})"
+)
+
+
+def normalize_phone(raw: str) -> str | None:
+    """Keep a leading + and the digits; reject anything that can't be a phone number."""
+    digits = re.sub(r"\D", "", raw)
+    if not 7 <= len(digits) <= 15:
+        return None
+    return f"+{digits}" if raw.strip().startswith("+") else digits
+
+
+def extract_email(text: str) -> str | None:
+    match = EMAIL_RE.search(text)
+    if match:
+        return match.group(0).lower()
+
+    for match in SPOKEN_EMAIL_RE.finditer(text):
+        local, domain = match.group(1), match.group(2)
+        if local.split()[-1].lower() in _NOT_EMAIL_LOCAL:
+            continue
+        return normalize_email(f"{local} at {domain}")
+    return None
+
+
+def extract_phone(text: str) -> str | None:
+    # Digits read out as words ("five five five ...") become numerals, one group per word
+    text = _DIGIT_WORD_RUN_RE.sub(
+        lambda m: " ".join(_DIGIT_WORDS[w.lower()] for w in re.findall(r"[a-z]+", m.group(0), re.I)) + " ",
+        text,
+    )
+    for match in PHONE_RE.finditer(text):
+        raw = match.group(1).strip()
+        if DATE_RE.fullmatch(raw):
+            continue
+        phone = normalize_phone(raw)
+        if not phone:
+            continue
+        # Plain numbers ("1000000 customers") need 10+ digits and talk of a phone
+        if _PHONE_GROUPING_RE.search(raw) or (len(phone) >= 10 and PHONE_CONTEXT_RE.search(text)):
+            return phone
+    return None
+
+
+def _is_stop_word(span: str) -> bool:
+    return span.split()[0].lower() in _STOP_WORDS
+
+
+def extract_name(text: str) -> str | None:
+    for match in NAME_RE.finditer(text):
+        name = match.group(1) or match.group(2)
+        if not _is_stop_word(name):
+            return name
+    return None
+
+
+def extract_company(text: str) -> str | None:
+    for regex in (COMPANY_WITH_SUFFIX_RE, COMPANY_PHRASE_RE):
+        for match in regex.finditer(text):
+            company = match.group(1).strip().rstrip(",.")
+            if not _is_stop_word(company):
+                return company
+    return None
+
+
+def extract_lead_fields(text: str) -> dict[str, str]:
+    """Extract whatever lead fields the transcript contains.
+
+    Returns:
+        Mapping of lead_data keys ("name", "company", "email", "phone") to values
+    """
+    fields = {}
+    email = extract_email(text)
+    if email:
+        fields["email"] = email
+        # Don't mistake the email for a company ("at acme dot com")
+        text = EMAIL_RE.sub(" ", text)
+        text = SPOKEN_EMAIL_RE.sub(" ", text)
+
+    phone = extract_phone(text)
+    if phone:
+        fields["phone"] = phone
+
+    name = extract_name(text)
+    if name:
+        fields["name"] = name
+
+    company = extract_company(text)
+    if company and company != name:
+        fields["company"] = company
+
+    return fields
+
+
+def is_dictating(text: str) -> bool:
+    """True if a (partial) transcript looks like an email or phone number being read out."""
+    return bool(DICTATION_RE.search(text))
@@ -0,0 +1,146 @@
+"""
+Lead Index - Cross-session lead deduplication
+=============================================
+Remembers which leads this worker already handed to the CRM, so returning
+visitors, reconnects and repeat calls from the same person don't each start a new
+n8n workflow run. A repeat with nothing new is skipped; a repeat with new details
+is sent as an update that points at the original lead (`duplicate_of`).
+
+Leads are keyed by normalized email and/or phone plus company and expire after a
+TTL. A lead is only recorded once the CRM has accepted it, so a lead that was
+rejected or never delivered doesn't suppress the person's next call. The index is a
+SQLite database shared by every job process on the worker.
+"""
+
+from dataclasses import dataclass
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Fields compared to decide whether a repeat lead carries anything new. Only contact
+# details: the LLM words the intent differently on every call, so comparing it would
+# turn nearly every repeat into an update
+COMPARED_FIELDS = ("name", "email", "phone", "company")
+
+# Legal-form words dropped from company names ("Acme Corp." == "acme")
+COMPANY_SUFFIXES = {
+    "inc", "llc", "ltd", "limited", "gmbh", "ug", "ag", "kg", "corp", "corporation",
+    "co", "company", "plc", "llp",
+}
+
+
+def normalize_company(company: str) -> str:
+    words = re.sub(r"[^\w\s]", " ", company.casefold()).split()
+    while len(words) > 1 and words[-1] in COMPANY_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def normalize_fields(lead: dict) -> dict[str, str]:
+    """The compared fields a lead has, normalized so spelling and formatting don't count as changes."""
+    normalizers = {
+        "name": lambda value: " ".join(value.casefold().split()),
+        "email": lambda value: value.strip().lower(),
+        "phone": lambda value: re.sub(r"[^0-9]", "", value),
+        "company": normalize_company,
+    }
+    return {field: normalizers[field](lead[field]) for field in COMPARED_FIELDS if lead.get(field)}
+
+
+def dedup_keys(lead: dict) -> list[str]:
+    """Index keys for a lead: one per contact method, each scoped to the company."""
+    company = normalize_company(lead.get("company") or "")
+    keys = []
+    if lead.get("email"):
+        keys.append(f"email:{lead['email'].strip().lower()}|{company}")
+    if lead.get("phone"):
+        keys.append(f"phone:{re.sub(r'[^0-9]', '', lead['phone'])}|{company}")
+    return keys
+
+
+@dataclass
+class LeadMatch:
+    """A lead we already sent, and what the new one adds to it."""
+
+    idempotency_key: str  # Key of the lead first sent to the CRM
+    new_fields: dict[str, str]  # Fields that are new or changed since then
+
+
+class LeadIndex:
+    """Persistent record of leads sent to the CRM in the last `ttl` seconds."""
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()  # Called from worker threads (the outbox, to_thread)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Short writes from several job processes at once - WAL keeps readers unblocked
+            self._db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS leads ("
+                " dedup_key TEXT PRIMARY KEY,"
+                " idempotency_key TEXT NOT NULL,"
+                " fields TEXT NOT NULL,"
+                " sent_at REAL NOT NULL)"
+            )
+        return self._db
+
+    def lookup(self, lead: dict) -> LeadMatch | None:
+        """Find a live entry for this lead (by email or phone, within the same company)."""
+        keys = dedup_keys(lead)
+        if not keys:
+            return None  # No contact info, nothing to recognize a repeat by
+
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            row = self.db.execute(
+                f"SELECT idempotency_key, fields FROM leads"
+                f" WHERE dedup_key IN ({placeholders}) AND sent_at > ?"
+                f" ORDER BY sent_at DESC LIMIT 1",
+                (*keys, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+
+        idempotency_key, fields = row
+        known = normalize_fields(json.loads(fields))
+        new_fields = {
+            field: lead[field]
+            for field, value in normalize_fields(lead).items()
+            if value != known.get(field)
+        }
+        return LeadMatch(idempotency_key=idempotency_key, new_fields=new_fields)
+
+    def record(self, lead: dict, idempotency_key: str) -> None:
+        """Remember a lead the CRM accepted (merged with what we knew about it before)."""
+        keys = dedup_keys(lead)
+        if not keys:
+            return
+
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._lock, self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.execute("DELETE FROM leads WHERE sent_at <= ?", (now - self.ttl,))
+            row = self.db.execute(
+                f"SELECT fields FROM leads WHERE dedup_key IN ({placeholders})"
+                f" ORDER BY sent_at DESC LIMIT 1",
+                keys,
+            ).fetchone()
+            fields = json.loads(row[0]) if row else {}
+            fields.update(normalize_fields(lead))
+            self.db.executemany(
+                "INSERT OR REPLACE INTO leads (dedup_key, idempotency_key, fields, sent_at)"
+                " VALUES (?, ?, ?, ?)",
+                [(key, idempotency_key, json.dumps(fields), now) for key in keys],
+            )
@@ -0,0 +1,136 @@
+"""
+Lead State - Slot filling and readiness for CRM delivery
+========================================================
+Holds the lead Sylvia is collecting and decides what happens next:
+
+    collecting -> email_pending_verification -> ready -> sent
+
+The stage is derived from the captured fields, so every caller (the update_lead tool,
+send_to_crm, on_exit, the transcript extractor) sees the same readiness rules. The
+extractor only fills empty fields; corrections go through update_lead.
+"""
+
+from datetime import datetime
+from enum import Enum
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields the visitor can give us
+LEAD_FIELDS = ("name", "company", "email", "phone", "intent")
+
+# MINIMUM REQUIRED to capture a lead (contact info is preferred but optional on exit)
+REQUIRED_FIELDS = ("name", "company", "intent")
+
+
+class LeadStage(str, Enum):
+    COLLECTING = "collecting"
+    EMAIL_PENDING_VERIFICATION = "email_pending_verification"
+    READY = "ready"
+    SENT = "sent"
+
+
+class LeadState:
+    """The lead captured during one session."""
+
+    def __init__(self):
+        # Lead tracking
+        self.data = {
+            "name": None,
+            "email": None,
+            "phone": None,
+            "company": None,
+            "intent": None,
+            "conversation_summary": [],
+            "email_verified": False,
+            "sent_to_crm": False  # Track if already sent to prevent duplicates
+        }
+        self._last_stage = LeadStage.COLLECTING
+
+    @property
+    def stage(self) -> LeadStage:
+        if self.data["sent_to_crm"]:
+            return LeadStage.SENT
+        if self.data["email"] and not self.data["email_verified"]:
+            return LeadStage.EMAIL_PENDING_VERIFICATION
+        if not self.missing_fields():
+            return LeadStage.READY
+        return LeadStage.COLLECTING
+
+    @property
+    def has_contact(self) -> bool:
+        return bool(self.data["email"] or self.data["phone"])
+
+    def missing_fields(self) -> list[str]:
+        """Required fields that haven't been captured yet."""
+        return [field for field in REQUIRED_FIELDS if not self.data[field]]
+
+    def update(self, **fields: str | None) -> dict[str, str]:
+        """Store any lead fields that changed.
+
+        Returns:
+            The delta: fields whose value actually changed
+        """
+        delta = {
+            field: value.strip()
+            for field, value in fields.items()
+            if field in LEAD_FIELDS and value and value.strip() and value.strip() != self.data[field]
+        }
+        self.data.update(delta)
+        if "email" in delta:
+            self.data["email_verified"] = False  # Reset verification when new email is captured
+
+        if delta:
+            logger.info("Lead updated: %s", ', '.join(delta))
+            self._log_transition()
+        return delta
+
+    def fill(self, **fields: str | None) -> dict[str, str]:
+        """Store only the fields that are still empty; for guesses that mustn't overwrite confirmed values.
+
+        Returns:
+            The delta: fields that were filled
+        """
+        return self.update(**{field: value for field, value in fields.items() if field in LEAD_FIELDS and not self.data[field]})
+
+    def confirm_email(self, is_correct: bool) -> None:
+        self.data["email_verified"] = is_correct
+        self._log_transition()
+
+    def mark_sent(self) -> None:
+        self.data["sent_to_crm"] = True  # Mark as sent only on success
+        self._log_transition()
+
+    def _log_transition(self) -> None:
+        stage = self.stage
+        if stage != self._last_stage:
+            logger.info("Lead stage: %s -> %s", self._last_stage.value, stage.value)
+            self._last_stage = stage
+
+    def crm_payload(self, summary: str | None = None) -> dict:
+        """Build the n8n CRM payload for this lead."""
+        has_email = bool(self.data["email"])
+        has_phone = bool(self.data["phone"])
+
+        # Prepare summary with note if no contact info
+        summary_text = summary or " | ".join(self.data["conversation_summary"])
+
+        if not self.has_contact:
+            # Add note that lead didn't provide contact info
+            note = "Lead declined to provide contact info. Directed to reach out via info@synctrack.de"
+            summary_text = f"{note} | {summary_text}" if summary_text else note
+        elif not has_email and has_phone:
+            # Note: Got phone but not email
+            note = "Lead provided phone only (no email)"
+            summary_text = f"{note} | {summary_text}" if summary_text else note
+
+        return {
+            "source": "voice",
+            "name": self.data["name"],
+            "email": self.data["email"] if has_email else "Not provided - will contact via info@synctrack.de",
+            "phone": self.data["phone"] if has_phone else "Not provided",
+            "company": self.data["company"],
+            "intent": self.data["intent"],
+            "summary": summary_text if summary_text else "Lead captured via voice agent",
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
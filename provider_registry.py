@@ -0,0 +1,159 @@
+"""
+Provider Registry - Speech and model plugins resolved from configuration
+========================================================================
+Every STT, LLM, TTS, VAD and turn-detection provider Sylvia can use is registered
+here by name, with the LiveKit plugin module it comes from. Plugins are imported
+when a provider is first built, so a worker configured for e.g. Anthropic and
+ElevenLabs never imports the OpenAI plugin - not in its main process, not in the
+forkserver its job processes are forked from, and not in the job processes.
+
+LiveKit plugins register themselves on import, which has to happen on the main
+thread, and the worker only preloads (and `download-files` only downloads for) the
+plugins registered before it starts. sylvia_agent.preload_plugins() therefore
+imports the configured providers up front; a provider a reloaded config switches to
+later is imported by the job process that first builds it.
+
+Config specs look like "provider" or "provider:argument", where the argument is the
+model (STT, LLM) or voice (TTS).
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable
+import importlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Provider:
+    kind: str  # "stt", "llm", "tts", "vad" or "turn_detector"
+    name: str
+    module: str  # Plugin module, imported on first use
+    build: Callable[..., Any]  # (plugin module, argument, client) -> model instance
+    extra: str | None = None  # uv extra that installs the plugin, for optional ones
+
+
+PROVIDERS: dict[tuple[str, str], Provider] = {}
+
+
+def register(kind: str, name: str, module: str, extra: str | None = None):
+    """Decorator adding a builder function to the registry."""
+    def decorator(build):
+        PROVIDERS[(kind, name)] = Provider(kind, name, module, build, extra)
+        return build
+    return decorator
+
+
+def names(kind: str) -> set[str]:
+    """Provider names registered for one kind."""
+    return {name for provider_kind, name in PROVIDERS if provider_kind == kind}
+
+
+def split_specs(specs: str) -> list[str]:
+    """The entries of a comma-separated provider list."""
+    return [spec for spec in (spec.strip() for spec in specs.split(",")) if spec]
+
+
+def resolve(kind: str, spec: str) -> tuple[Provider, str]:
+    """The registered provider for a spec, plus its argument ("" if none)."""
+    name, _, argument = spec.strip().partition(":")
+    provider = PROVIDERS.get((kind, name))
+    if provider is None:
+        raise ValueError(f"Unknown {kind} provider {name!r} (known: {', '.join(sorted(names(kind)))})")
+    return provider, argument
+
+
+def build(kind: str, spec: str, client=None):
+    """Import the provider's plugin if needed and build an instance.
+
+    client is the process's shared OpenAI client; only the OpenAI providers use it.
+    Raises ImportError if the plugin isn't installed.
+    """
+    provider, argument = resolve(kind, spec)
+    return provider.build(importlib.import_module(provider.module), argument, client)
+
+
+def preload(kind: str, specs: str) -> list[str]:
+    """Import the plugins of a provider list; call on the main thread. Returns the modules imported.
+
+    Providers whose optional plugin isn't installed are logged and skipped, like
+    when they are built.
+    """
+    modules = []
+    for spec in split_specs(specs):
+        provider, _ = resolve(kind, spec)
+        try:
+            importlib.import_module(provider.module)
+        except ImportError as e:
+            logger.warning("Not preloading %s provider %s: %s%s", kind, spec, e, install_hint(provider))
+            continue
+        modules.append(provider.module)
+    return modules
+
+
+def install_hint(provider: Provider) -> str:
+    return f" (uv sync --extra {provider.extra})" if provider.extra else ""
+
+
+# Speech-to-Text
+
+@register("stt", "deepgram", "livekit.plugins.deepgram")
+def _deepgram_stt(plugin, model, client):
+    return plugin.STT(model=model or "nova-2", language="en-US")
+
+
+# Large Language Models (optional ones: uv sync --extra llm)
+
+LLM_TEMPERATURE = 0.8  # Higher temp for more natural, conversational responses
+
+
+@register("llm", "openai", "livekit.plugins.openai")
+def _openai_llm(plugin, model, client):
+    return plugin.LLM(client=client, temperature=LLM_TEMPERATURE, **({"model": model} if model else {}))
+
+
+@register("llm", "anthropic", "livekit.plugins.anthropic", extra="llm")
+def _anthropic_llm(plugin, model, client):
+    return plugin.LLM(temperature=LLM_TEMPERATURE, **({"model": model} if model else {}))
+
+
+@register("llm", "google", "livekit.plugins.google", extra="llm")
+def _google_llm(plugin, model, client):
+    return plugin.LLM(temperature=LLM_TEMPERATURE, **({"model": model} if model else {}))
+
+
+@register("llm", "groq", "livekit.plugins.groq", extra="llm")
+def _groq_llm(plugin, model, client):
+    return plugin.LLM(temperature=LLM_TEMPERATURE, **({"model": model} if model else {}))
+
+
+# Text-to-Speech (optional ones: uv sync --extra tts)
+
+@register("tts", "openai", "livekit.plugins.openai")
+def _openai_tts(plugin, voice, client):
+    return plugin.TTS(voice=voice or "nova", client=client)  # nova: friendly female voice
+
+
+@register("tts", "elevenlabs", "livekit.plugins.elevenlabs")
+def _elevenlabs_tts(plugin, voice, client):
+    voice_id = voice or os.getenv("ELEVENLABS_VOICE_ID")  # Cloned voice
+    return plugin.TTS(voice_id=voice_id) if voice_id else plugin.TTS()
+
+
+@register("tts", "cartesia", "livekit.plugins.cartesia", extra="tts")
+def _cartesia_tts(plugin, voice, client):
+    return plugin.TTS(voice=voice) if voice else plugin.TTS()
+
+
+# Voice activity and end-of-turn detection
+
+@register("vad", "silero", "livekit.plugins.silero")
+def _silero_vad(plugin, argument, client):
+    return plugin.VAD.load()
+
+
+@register("turn_detector", "english", "livekit.plugins.turn_detector.english")
+def _english_turn_detector(plugin, argument, client):
+    return plugin.EnglishModel()
@@ -0,0 +1,420 @@
+"""
+Provider Router - Hedged requests and failover across LLM/TTS providers
+=======================================================================
+Wraps several LLM (or TTS) providers as one, in order of preference. Each request
+goes to the first healthy provider; if it hasn't produced its first token / first
+audio within the stage's hedge deadline, the same request is also sent to the next
+provider and whichever answers first is used (the other is cancelled). A provider
+that errors before answering is failed over immediately.
+
+Per provider the router keeps a rolling window of first-response latencies and
+errors. A provider is put on cooldown (tried last) when it keeps answering slower
+than the deadline, when most of its recent requests failed, or at once on quota and
+auth errors (e.g. ElevenLabs credits running out). After the cooldown it gets
+traffic again - still hedged, so a provider that hasn't recovered costs little.
+
+Once a response has started it is never switched, so errors mid-response are
+raised as usual. Health is tracked per job process.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+import asyncio
+import logging
+import statistics
+import time
+
+from livekit import rtc
+from livekit.agents import APIStatusError, llm, tts as agents_tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, APIConnectOptions
+
+import latency_metrics
+
+logger = logging.getLogger(__name__)
+
+# Statuses that won't go away by retrying: out of credits, rate limited, bad key
+QUOTA_STATUSES = {401, 402, 403, 429}
+
+# A stream that ended without producing anything
+_EMPTY = object()
+
+
+@dataclass
+class ProviderHealth:
+    """Rolling first-response latency and error record of one provider."""
+
+    name: str
+    window: int = 20
+    latencies: deque = field(default_factory=deque)
+    errors: deque = field(default_factory=deque)  # True per failed request, False per success
+    cooldown_until: float = 0.0
+    requests: int = 0
+    hedged: int = 0  # Requests where this provider was slow and another was asked too
+    wins: int = 0  # Requests this provider answered first
+
+    def __post_init__(self):
+        self.latencies = deque(maxlen=self.window)
+        self.errors = deque(maxlen=self.window)
+
+    @property
+    def cooling_down(self) -> bool:
+        return time.monotonic() < self.cooldown_until
+
+    def error_rate(self) -> float:
+        return sum(self.errors) / len(self.errors) if self.errors else 0.0
+
+    def percentile(self, q: float) -> float | None:
+        if len(self.latencies) < 2:
+            return self.latencies[0] if self.latencies else None
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[int(q * 100) - 1]
+
+    def stats(self) -> dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "wins": self.wins,
+            "hedged": self.hedged,
+            "error_rate": round(self.error_rate(), 3),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+        }
+
+
+@dataclass
+class _Attempt:
+    name: str
+    stream: Any  # llm.LLMStream or tts.ChunkedStream
+    started: float
+
+
+async def _first(stream) -> Any:
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _EMPTY
+
+
+class ProviderRouter:
+    """Picks providers for one pipeline stage and races them on slow or failed requests."""
+
+    def __init__(
+        self,
+        stage: str,
+        providers: dict[str, Any],
+        hedge_after: float,
+        min_samples: int = 5,
+        error_threshold: float = 0.5,
+        cooldown: float = 30.0,
+        quota_cooldown: float = 300.0,
+    ):
+        self.stage = stage  # "llm" or "tts"
+        self.providers = providers  # name -> provider, in order of preference
+        self.hedge_after = hedge_after
+        self.min_samples = min_samples
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.quota_cooldown = quota_cooldown
+        self.health = {name: ProviderHealth(name) for name in providers}
+
+    def ranked(self) -> list[str]:
+        """Healthy providers in order of preference, then those cooling down (soonest back first)."""
+        names = list(self.providers)
+        healthy = [name for name in names if not self.health[name].cooling_down]
+        cooling = sorted(
+            (name for name in names if self.health[name].cooling_down),
+            key=lambda name: self.health[name].cooldown_until,
+        )
+        return healthy + cooling
+
+    def stats(self) -> dict:
+        return {name: health.stats() for name, health in self.health.items()}
+
+    def _start_cooldown(self, name: str, seconds: float, reason: str) -> None:
+        health = self.health[name]
+        if health.cooling_down:
+            return
+        logger.warning("%s provider %s on cooldown for %.0fs: %s", self.stage, name, seconds, reason)
+        health.cooldown_until = time.monotonic() + seconds
+        # Judge it on fresh samples when it's back
+        health.latencies.clear()
+        health.errors.clear()
+        latency_metrics.observe_provider_event(self.stage, name, "cooldown")
+
+    def record_latency(self, name: str, latency: float, *, answered: bool = True) -> None:
+        """Record a first-response latency (a lower bound if the request was cancelled first)."""
+        health = self.health[name]
+        health.latencies.append(latency)
+        if answered:
+            health.errors.append(False)
+            latency_metrics.observe_provider_latency(self.stage, name, latency)
+
+        median = health.percentile(0.5)
+        if len(health.latencies) >= self.min_samples and median > self.hedge_after and len(self.providers) > 1:
+            self._start_cooldown(name, self.cooldown, f"median first response {median:.2f}s")
+
+    def record_error(self, name: str, error: Exception) -> None:
+        health = self.health[name]
+        health.errors.append(True)
+        latency_metrics.observe_provider_event(self.stage, name, "error")
+
+        if isinstance(error, APIStatusError) and error.status_code in QUOTA_STATUSES:
+            self._start_cooldown(name, self.quota_cooldown, f"HTTP {error.status_code}")
+        elif len(health.errors) >= self.min_samples and health.error_rate() > self.error_threshold:
+            self._start_cooldown(name, self.cooldown, f"error rate {health.error_rate():.0%}")
+
+    async def open(self, start: Callable[[Any], Any]) -> tuple[str, Any, Any]:
+        """Start a request with `start(provider)` and return (provider name, first item, stream).
+
+        The first item is the winner's first chunk/frame; the caller reads the rest from
+        the stream and must close it.
+        """
+        ranked = self.ranked()
+        pending: dict[asyncio.Task, _Attempt] = {}
+        hedge_at = time.monotonic() + self.hedge_after
+        last_error: Exception | None = None
+        winner: _Attempt | None = None
+        try:
+            next_index = self._launch(ranked[0], start, pending, 0)
+
+            while pending:
+                can_hedge = next_index < len(ranked)
+                timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge and len(pending) == 1 else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Deadline missed - ask the next provider too, keep the slow one running
+                    slow = next(iter(pending.values()))
+                    self.health[slow.name].hedged += 1
+                    latency_metrics.observe_provider_event(self.stage, slow.name, "hedged")
+                    logger.info(
+                        "%s provider %s slower than %ss, hedging with %s",
+                        self.stage, slow.name, self.hedge_after, ranked[next_index],
+                    )
+                    next_index = self._launch(ranked[next_index], start, pending, next_index)
+                    hedge_at = float("inf")
+                    continue
+
+                for task in done:
+                    attempt = pending.pop(task)
+                    try:
+                        first = task.result()
+                    except Exception as e:
+                        last_error = e
+                        self.record_error(attempt.name, e)
+                        logger.warning("%s provider %s failed: %s", self.stage, attempt.name, e)
+                        await attempt.stream.aclose()
+                        if not pending and next_index < len(ranked):
+                            latency_metrics.observe_provider_event(self.stage, attempt.name, "failover")
+                            next_index = self._launch(ranked[next_index], start, pending, next_index)
+                            hedge_at = time.monotonic() + self.hedge_after
+                        continue
+
+                    if winner is None:
+                        winner, winner_first = attempt, first
+                    else:
+                        await attempt.stream.aclose()  # Both answered in the same tick
+
+                if winner is not None:
+                    break
+
+            if winner is None:
+                raise last_error or RuntimeError(f"no {self.stage} provider available")
+
+            now = time.monotonic()
+            self.health[winner.name].wins += 1
+            self.record_latency(winner.name, now - winner.started)
+            for attempt in pending.values():
+                self.record_latency(attempt.name, now - attempt.started, answered=False)
+            return winner.name, winner_first, winner.stream
+        finally:
+            for task, attempt in pending.items():
+                task.cancel()
+                await attempt.stream.aclose()
+
+    def _launch(self, name: str, start: Callable[[Any], Any], pending: dict, next_index: int) -> int:
+        attempt = _Attempt(name=name, stream=start(self.providers[name]), started=time.monotonic())
+        self.health[name].requests += 1
+        pending[asyncio.create_task(_first(attempt.stream))] = attempt
+        return next_index + 1
+
+
+class RoutedLLM(llm.LLM):
+    """LLM that sends each request through a ProviderRouter."""
+
+    def __init__(self, router: ProviderRouter):
+        super().__init__()
+        self.router = router
+        self._primary: llm.LLM = next(iter(router.providers.values()))
+
+    @property
+    def model(self) -> str:
+        return self._primary.model
+
+    @property
+    def provider(self) -> str:
+        return self._primary.provider
+
+    def chat(
+        self,
+        *,
+        chat_ctx: llm.ChatContext,
+        tools: list | None = None,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+        parallel_tool_calls=NOT_GIVEN,
+        tool_choice=NOT_GIVEN,
+        extra_kwargs=NOT_GIVEN,
+    ) -> "_RoutedLLMStream":
+        return _RoutedLLMStream(
+            self,
+            chat_ctx=chat_ctx,
+            tools=tools or [],
+            conn_options=conn_options,
+            request_kwargs={
+                "parallel_tool_calls": parallel_tool_calls,
+                "tool_choice": tool_choice,
+                "extra_kwargs": extra_kwargs,
+            },
+        )
+
+    def prewarm(self) -> None:
+        for provider in self.router.providers.values():
+            provider.prewarm()
+
+    async def aclose(self) -> None:
+        for provider in self.router.providers.values():
+            await provider.aclose()
+
+
+class _RoutedLLMStream(llm.LLMStream):
+    def __init__(self, routed: RoutedLLM, *, chat_ctx, tools, conn_options: APIConnectOptions, request_kwargs: dict):
+        # Failing over replaces retries: each provider gets one attempt per request
+        super().__init__(
+            routed,
+            chat_ctx=chat_ctx,
+            tools=tools,
+            conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout),
+        )
+        self._router = routed.router
+        self._provider_conn_options = APIConnectOptions(max_retry=0, timeout=conn_options.timeout)
+        self._request_kwargs = request_kwargs
+
+    async def _run(self) -> None:
+        name, first, stream = await self._router.open(
+            lambda provider: provider.chat(
+                chat_ctx=self._chat_ctx,
+                tools=self._tools,
+                conn_options=self._provider_conn_options,
+                **self._request_kwargs,
+            )
+        )
+        try:
+            if first is not _EMPTY:
+                self._event_ch.send_nowait(first)
+            async for chunk in stream:
+                self._event_ch.send_nowait(chunk)
+        except Exception as e:
+            self._router.record_error(name, e)
+            raise
+        finally:
+            await stream.aclose()
+
+
+class RoutedTTS(agents_tts.TTS):
+    """TTS that sends each request through a ProviderRouter, resampling to the primary's rate.
+
+    Raises ValueError if the providers' channel counts differ; only the rate is converted.
+    """
+
+    def __init__(self, router: ProviderRouter):
+        self._primary: agents_tts.TTS = next(iter(router.providers.values()))
+        mismatched = [name for name, provider in router.providers.items() if provider.num_channels != self._primary.num_channels]
+        if mismatched:
+            raise ValueError(
+                f"TTS providers {', '.join(mismatched)} don't have the primary's {self._primary.num_channels} channel(s)"
+            )
+        super().__init__(
+            capabilities=agents_tts.TTSCapabilities(streaming=False),
+            sample_rate=self._primary.sample_rate,
+            num_channels=self._primary.num_channels,
+        )
+        self.router = router
+
+    @property
+    def model(self) -> str:
+        return "+".join(provider.model for provider in self.router.providers.values())
+
+    @property
+    def provider(self) -> str:
+        return "+".join(self.router.providers)
+
+    def preferred(self) -> agents_tts.TTS:
+        """The provider the next request goes to first."""
+        return self.router.providers[self.router.ranked()[0]]
+
+    def synthesize(
+        self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "RoutedChunkedStream":
+        return RoutedChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def prewarm(self) -> None:
+        for provider in self.router.providers.values():
+            provider.prewarm()
+
+    async def aclose(self) -> None:
+        for provider in self.router.providers.values():
+            await provider.aclose()
+
+
+class RoutedChunkedStream(agents_tts.ChunkedStream):
+    """One routed synthesis; provider_tts is the provider that answered, once audio has started."""
+
+    def __init__(self, *, tts: RoutedTTS, input_text: str, conn_options: APIConnectOptions):
+        super().__init__(
+            tts=tts,
+            input_text=input_text,
+            conn_options=APIConnectOptions(max_retry=0, timeout=conn_options.timeout),
+        )
+        self._routed_tts = tts
+        self._provider_conn_options = APIConnectOptions(max_retry=0, timeout=conn_options.timeout)
+        self.provider_tts: agents_tts.TTS | None = None
+
+    async def _run(self, output_emitter: agents_tts.AudioEmitter) -> None:
+        routed = self._routed_tts
+        output_emitter.initialize(
+            request_id=utils.shortuuid(),
+            sample_rate=routed.sample_rate,
+            num_channels=routed.num_channels,
+            mime_type="audio/pcm",
+        )
+
+        name, first, stream = await routed.router.open(
+            lambda provider: provider.synthesize(self.input_text, conn_options=self._provider_conn_options)
+        )
+        self.provider_tts = routed.router.providers[name]
+        resampler: rtc.AudioResampler | None = None
+
+        def push(frame: rtc.AudioFrame) -> None:
+            nonlocal resampler
+            frames = [frame]
+            if frame.sample_rate != routed.sample_rate:
+                if resampler is None:
+                    resampler = rtc.AudioResampler(frame.sample_rate, routed.sample_rate, num_channels=frame.num_channels)
+                frames = resampler.push(frame)
+            for out in frames:
+                output_emitter.push(bytes(out.data.cast("B")))
+
+        try:
+            if first is not _EMPTY:
+                push(first.frame)
+            async for ev in stream:
+                push(ev.frame)
+            if resampler is not None:
+                for out in resampler.flush():
+                    output_emitter.push(bytes(out.data.cast("B")))
+        except Exception as e:
+            routed.router.record_error(name, e)
+            raise
+        finally:
+            await stream.aclose()
+        output_emitter.flush()
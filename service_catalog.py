@@ -0,0 +1,100 @@
+"""
+Service Catalog - Keyword search over Synctrack's services and FAQ
+==================================================================
+The service descriptions and common questions live in service_catalog.json. At
+startup they are loaded into an in-memory BM25 index, so the lookup_services tool
+can answer with just the few entries relevant to what the visitor asked instead of
+putting the whole catalog into the LLM context on every call.
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+import json
+import math
+import re
+
+# Words that carry no meaning for matching a question to an entry (every question is about Synctrack)
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "as", "at", "be", "can", "could", "do", "does",
+    "for", "from", "have", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "our",
+    "so", "synctrack", "tell", "that", "the", "this", "to", "us", "we", "what", "with", "you", "your",
+}
+
+# Crude suffix stripping so "automate", "automating" and "automation" match
+SUFFIXES = ("ations", "ation", "ating", "ates", "ated", "ate", "ings", "ing", "ers", "er", "ies", "es", "ed", "s", "e")
+
+# Title words count this many times towards an entry's terms
+TITLE_WEIGHT = 2
+
+
+def _stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [_stem(word) for word in re.findall(r"[a-z0-9]+", text.casefold()) if word not in STOPWORDS]
+
+
+@dataclass
+class CatalogEntry:
+    id: str
+    kind: str  # "service" or "faq"
+    title: str
+    text: str
+    keywords: list[str] = field(default_factory=list)
+
+    @property
+    def snippet(self) -> str:
+        return f"{self.title}: {self.text}"
+
+    def terms(self) -> list[str]:
+        return tokenize(self.title) * TITLE_WEIGHT + tokenize(self.text) + tokenize(" ".join(self.keywords))
+
+
+class CatalogIndex:
+    """BM25 ranking over the catalog entries."""
+
+    def __init__(self, entries: list[CatalogEntry], k1: float = 1.2, b: float = 0.75):
+        self.entries = entries
+        self.k1 = k1
+        self.b = b
+
+        self._term_counts = [Counter(entry.terms()) for entry in entries]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._avg_length = sum(self._lengths) / len(entries) if entries else 0.0
+
+        document_frequency = Counter(term for counts in self._term_counts for term in counts)
+        self._idf = {
+            term: math.log(1 + (len(entries) - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "CatalogIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls([CatalogEntry(**entry) for entry in json.load(f)])
+
+    def search(self, query: str, top_k: int = 3, min_relative_score: float = 0.3) -> list[CatalogEntry]:
+        """The best matches for `query`, dropping those far below the top score."""
+        terms = set(tokenize(query))
+        scored = []
+        for entry, counts, length in zip(self.entries, self._term_counts, self._lengths):
+            score = 0.0
+            for term in terms & counts.keys():
+                tf = counts[term]
+                norm = self.k1 * (1 - self.b + self.b * length / self._avg_length)
+                score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scored.append((score, entry))
+
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        if not scored:
+            return []
+        cutoff = scored[0][0] * min_relative_score
+        return [entry for score, entry in scored[:top_k] if score >= cutoff]
+
+    def services(self) -> list[CatalogEntry]:
+        return [entry for entry in self.entries if entry.kind == "service"]
@@ -0,0 +1,452 @@
+"""
+Session Archive - Transcripts, tool calls and timings for offline analysis
+==========================================================================
+Records every call - what the visitor and Sylvia said, tool calls with their
+arguments, results and durations, lead stage transitions and per-turn stage
+timings - so prompts and latency can be tuned from real conversations.
+
+Rows are appended to bounded in-memory column buffers (a few list appends, never
+I/O on the event loop). A background task flushes them in batches: each batch is
+encoded as one zstd-compressed Arrow record batch in a worker thread and appended
+to an Arrow IPC stream file under <dir>/date=YYYY-MM-DD/. Files rotate at a size
+limit and at midnight (UTC); a stream file is readable up to its last complete
+batch even if the process died mid-write. If the writer falls behind, new rows are
+dropped and counted instead of growing memory.
+
+Job processes are single-use, so every call starts its own small file. When a job
+starts, the files of days that ended over an hour ago are merged into one file per
+day (compact()), so a partition holds one file per call only for today.
+
+All rows share one schema:
+
+    session  call id (room name)        turn   user turn number (0 = greeting)
+    ts       UTC timestamp              kind   user, agent, tool, lead_stage, timing, session
+    name     tool / stage / event name  text   transcript, tool output, previous stage
+    value    seconds (timings, tools)   detail JSON (tool arguments, flags)
+
+Needs pyarrow (`uv sync --extra archive`). Read the archive with this module:
+
+    python session_archive.py --date 2026-10-17 --session <room>
+    python session_archive.py --stats
+"""
+
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import fcntl
+import glob
+import json
+import logging
+import os
+import sys
+import time
+
+from livekit.agents import AgentSession
+
+from lead_state import LeadState
+from latency_metrics import TurnTimeline
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("session", "turn", "ts", "kind", "name", "text", "value", "detail")
+
+# Extension of the Arrow IPC stream files
+SUFFIX = ".arrows"
+
+# A day's files are merged once the day is over by this much and no file changed for COMPACT_IDLE
+COMPACT_AFTER = timedelta(hours=1)
+COMPACT_IDLE = 600.0
+
+
+def _schema():
+    import pyarrow as pa
+
+    text = pa.dictionary(pa.int32(), pa.string())  # Few distinct values, repeated on every row
+    return pa.schema([
+        ("session", text),
+        ("turn", pa.int32()),
+        ("ts", pa.timestamp("ms", tz="UTC")),
+        ("kind", text),
+        ("name", text),
+        ("text", pa.string()),
+        ("value", pa.float64()),
+        ("detail", pa.string()),
+    ])
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, timezone.utc).strftime("%Y-%m-%d")
+
+
+class ArchiveWriter:
+    """Per-process row buffer, flushed to rotating Arrow IPC files by a background task."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_file_bytes: int = 64 * 1024 * 1024,
+        flush_interval: float = 5.0,
+        batch_rows: int = 500,
+        max_buffered_rows: int = 20_000,
+        compression: str = "zstd",
+    ):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.flush_interval = flush_interval
+        self.batch_rows = batch_rows
+        self.max_buffered_rows = max_buffered_rows
+        self.compression = compression
+
+        self.rows_written = 0
+        self.dropped = 0
+        self._columns = {name: [] for name in COLUMNS}
+        self._buffered = 0
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+        # Current output file, only touched from the flush thread
+        self._sink = None
+        self._stream = None
+        self._path: str | None = None
+        self._file_day: str | None = None
+
+    @staticmethod
+    def available() -> bool:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def append(
+        self,
+        session: str,
+        kind: str,
+        *,
+        turn: int = 0,
+        name: str | None = None,
+        text: str | None = None,
+        value: float | None = None,
+        detail: dict | None = None,
+        ts: float | None = None,
+    ) -> None:
+        """Buffer one row; cheap enough to call from event handlers on the audio loop."""
+        if self._buffered >= self.max_buffered_rows:
+            self.dropped += 1
+            return
+
+        columns = self._columns
+        columns["session"].append(session)
+        columns["turn"].append(turn)
+        columns["ts"].append(int((ts if ts is not None else time.time()) * 1000))
+        columns["kind"].append(kind)
+        columns["name"].append(name)
+        columns["text"].append(text)
+        columns["value"].append(value)
+        columns["detail"].append(json.dumps(detail, default=str) if detail else None)
+        self._buffered += 1
+
+        if self._buffered >= self.batch_rows and self._wake is not None:
+            self._wake.set()
+
+    def start(self) -> None:
+        """Start the flush task (needs the job's event loop, so not in prewarm)."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            await asyncio.to_thread(compact_finished_days, self.directory)
+        except Exception as e:
+            logger.warning("Could not compact the session archive: %s", e)
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write everything buffered so far as one record batch, off the event loop."""
+        if not self._buffered:
+            return
+        columns, self._columns = self._columns, {name: [] for name in COLUMNS}
+        rows, self._buffered = self._buffered, 0
+        try:
+            await asyncio.to_thread(self._write, columns)
+            self.rows_written += rows
+        except Exception as e:
+            logger.warning("Could not archive %s session rows: %s", rows, e)
+
+    def _write(self, columns: dict[str, list]) -> None:
+        import pyarrow as pa
+
+        # A batch straddling midnight goes to two day partitions
+        days = [_day(ts) for ts in columns["ts"]]
+        for day in dict.fromkeys(days):
+            if len(set(days)) == 1:
+                part = columns
+            else:
+                keep = [i for i, d in enumerate(days) if d == day]
+                part = {name: [values[i] for i in keep] for name, values in columns.items()}
+            schema = _schema()
+            batch = pa.record_batch([pa.array(part[f.name], type=f.type) for f in schema], schema=schema)
+            self._stream_for(day).write_batch(batch)
+
+    def _stream_for(self, day: str):
+        import pyarrow as pa
+
+        if self._stream is not None and (day != self._file_day or self._sink.tell() >= self.max_file_bytes):
+            self._close_file()
+        if self._stream is None:
+            partition = os.path.join(self.directory, f"date={day}")
+            os.makedirs(partition, exist_ok=True)
+            self._path = os.path.join(partition, f"call-{os.getpid()}-{time.time_ns()}{SUFFIX}")
+            self._sink = pa.OSFile(self._path, "wb")
+            self._stream = pa.ipc.new_stream(
+                self._sink, _schema(), options=pa.ipc.IpcWriteOptions(compression=self.compression)
+            )
+            self._file_day = day
+        return self._stream
+
+    def _close_file(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._sink.close()
+            logger.debug("Closed session archive file %s", self._path)
+        self._stream = self._sink = self._path = self._file_day = None
+
+    async def aclose(self) -> None:
+        """Stop the flush task, write what's left and close the file."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await asyncio.to_thread(self._close_file)
+        if self.dropped:
+            logger.warning("Session archive dropped %s rows (writer fell behind)", self.dropped)
+
+
+def compact(directory: str, day: str) -> str | None:
+    """Merge one day's files into a single file, unless another process is already at it.
+
+    Returns the merged file's path, or None if there was nothing to merge. A crash
+    after the merged file is in place but before the parts are deleted leaves those
+    rows in the partition twice.
+    """
+    import pyarrow as pa
+
+    partition = os.path.join(directory, f"date={day}")
+    with open(os.path.join(partition, ".compact.lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return None
+        parts = sorted(glob.glob(os.path.join(partition, f"*{SUFFIX}")))
+        if len(parts) < 2:
+            return None
+
+        table = read_archive(directory, day, paths=parts, decode=False).unify_dictionaries().combine_chunks()
+        path = os.path.join(partition, f"day-{time.time_ns()}{SUFFIX}")
+        with pa.OSFile(path + ".tmp", "wb") as sink:
+            with pa.ipc.new_stream(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd")) as stream:
+                stream.write_table(table)
+        os.replace(path + ".tmp", path)
+        for part in parts:
+            os.unlink(part)
+        logger.info("Compacted %s session archive files for %s", len(parts), day)
+        return path
+
+
+def compact_finished_days(directory: str) -> list[str]:
+    """compact() every day that ended over COMPACT_AFTER ago and whose files stopped changing."""
+    finished = (datetime.now(timezone.utc) - COMPACT_AFTER).strftime("%Y-%m-%d")
+    merged = []
+    for partition in sorted(glob.glob(os.path.join(directory, "date=*"))):
+        day = os.path.basename(partition)[len("date="):]
+        parts = glob.glob(os.path.join(partition, f"*{SUFFIX}"))
+        if day >= finished or len(parts) < 2:
+            continue
+        if time.time() - max(os.path.getmtime(part) for part in parts) < COMPACT_IDLE:
+            continue
+        path = compact(directory, day)
+        if path:
+            merged.append(path)
+    return merged
+
+
+def _arguments(raw: str):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+class SessionRecorder:
+    """Feeds one call's transcript, tool calls, lead stages and turn timings to an ArchiveWriter."""
+
+    def __init__(self, writer: ArchiveWriter, session_id: str, session: AgentSession, lead: LeadState):
+        self.writer = writer
+        self.session_id = session_id
+        self.lead = lead
+        self.turn = 0  # User turns so far; the greeting is turn 0
+        self._stage = lead.stage
+
+        session.on("conversation_item_added", self._on_conversation_item_added)
+        session.on("function_tools_executed", self._on_function_tools_executed)
+        session.on("close", self._on_close)
+
+    def _append(self, kind: str, **fields) -> None:
+        self.writer.append(self.session_id, kind, turn=self.turn, **fields)
+
+    def start(self, **detail) -> None:
+        self._append("session", name="start", detail=detail)
+
+    def _check_stage(self) -> None:
+        stage = self.lead.stage
+        if stage != self._stage:
+            self._append("lead_stage", name=stage.value, text=self._stage.value)
+            self._stage = stage
+
+    def _on_conversation_item_added(self, ev) -> None:
+        item = ev.item
+        if item.type != "message" or item.role not in ("user", "assistant"):
+            return
+        if item.role == "user":
+            self.turn += 1
+        self._append(
+            "user" if item.role == "user" else "agent",
+            text=item.text_content,
+            detail={"interrupted": True} if item.interrupted else None,
+            ts=ev.created_at,
+        )
+        self._check_stage()
+
+    def _on_function_tools_executed(self, ev) -> None:
+        for call, output in ev.zipped():
+            finished_at = output.created_at if output is not None else ev.created_at
+            self._append(
+                "tool",
+                name=call.name,
+                text=output.output if output is not None else None,
+                value=max(0.0, finished_at - call.created_at),
+                detail={"arguments": _arguments(call.arguments), "error": output is None or output.is_error},
+                ts=call.created_at,
+            )
+        self._check_stage()
+
+    def record_turn(self, timeline: TurnTimeline) -> None:
+        """Stage offsets of a finished turn (TurnLatencyTracker's on_turn callback)."""
+        for stage, offset in timeline.stages.items():
+            self._append("timing", name=stage, value=offset, detail={"speech_id": timeline.speech_id})
+
+    def _on_close(self, ev) -> None:
+        self._check_stage()
+        self._append("session", name="end", detail={"reason": str(getattr(ev, "reason", ""))})
+
+
+# Reader ---------------------------------------------------------------------------
+
+
+def read_archive(directory: str, date: str | None = None, paths: list[str] | None = None, decode: bool = True):
+    """All rows under `directory` (optionally one day, or only `paths`) as a pyarrow Table.
+
+    decode turns the dictionary columns into plain strings, for filtering and sorting.
+    """
+    import pyarrow as pa
+
+    if paths is None:
+        paths = sorted(glob.glob(os.path.join(directory, f"date={date or '*'}", f"*{SUFFIX}")))
+    batches = []
+    for path in paths:
+        try:
+            with pa.OSFile(path, "rb") as source:
+                reader = pa.ipc.open_stream(source)
+                while True:
+                    try:
+                        batches.append(reader.read_next_batch())
+                    except StopIteration:
+                        break
+        except (pa.ArrowInvalid, OSError) as e:
+            # A file still being written, or cut off by a crash: keep the complete batches
+            logger.warning("Stopped reading %s: %s", path, e)
+    schema = _schema()
+    table = pa.Table.from_batches(batches, schema=schema)
+    if not decode:
+        return table
+    # Dictionaries differ from batch to batch; decode them for filtering and sorting
+    plain = pa.schema([
+        field.with_type(pa.string()) if pa.types.is_dictionary(field.type) else field for field in schema
+    ])
+    return table.cast(plain)
+
+
+def _print_rows(table) -> None:
+    for row in table.to_pylist():
+        ts = row["ts"].strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        value = f" {row['value']:.3f}s" if row["value"] is not None else ""
+        name = f" {row['name']}" if row["name"] else ""
+        text = f" | {row['text']}" if row["text"] else ""
+        print(f"{ts} {row['session']} #{row['turn']} {row['kind']}{name}{value}{text}")
+
+
+def _print_stats(table) -> None:
+    import pyarrow.compute as pc
+
+    sessions = pc.count_distinct(table["session"]).as_py()
+    users = table.filter(pc.equal(table["kind"], "user")).num_rows
+    print(f"{sessions} sessions, {users} user turns, {table.num_rows} rows")
+
+    for kind in ("timing", "tool"):
+        rows = table.filter(pc.equal(table["kind"], kind))
+        if not rows.num_rows:
+            continue
+        print(f"\n{kind + ' (seconds)':<30} {'count':>6} {'p50':>7} {'p95':>7} {'max':>7}")
+        for name in sorted(set(rows["name"].to_pylist())):
+            values = rows.filter(pc.equal(rows["name"], name))["value"]
+            p50, p95 = pc.quantile(values, q=[0.5, 0.95]).to_pylist()
+            print(f"  {name:<28} {len(values):>6} {p50:>7.3f} {p95:>7.3f} {pc.max(values).as_py():>7.3f}")
+
+    stages = table.filter(pc.equal(table["kind"], "lead_stage"))
+    if stages.num_rows:
+        print("\nlead stages reached")
+        for entry in pc.value_counts(stages["name"]).to_pylist():
+            print(f"  {entry['values']:<28} {entry['counts']:>6}")
+
+
+if __name__ == "__main__":
+    if not ArchiveWriter.available():
+        sys.exit("Reading the session archive needs pyarrow: uv sync --extra archive")
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    parser = argparse.ArgumentParser(description="Read Sylvia's session archive")
+    parser.add_argument("--dir", default=os.getenv("SESSION_ARCHIVE_DIR", ".cache/sessions"))
+    parser.add_argument("--date", help="Day to read (YYYY-MM-DD, default: all)")
+    parser.add_argument("--session", help="Only this session (room name)")
+    parser.add_argument("--kind", action="append", help="Only these row kinds (repeatable)")
+    parser.add_argument("--stats", action="store_true", help="Print timing/tool percentiles instead of rows")
+    parser.add_argument("--compact", action="store_true", help="Merge each finished day's files into one first")
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_finished_days(args.dir)
+
+    table = read_archive(args.dir, args.date)
+    if args.session:
+        table = table.filter(pc.equal(table["session"], args.session))
+    if args.kind:
+        table = table.filter(pc.is_in(table["kind"], value_set=pa.array(args.kind)))
+    table = table.sort_by([("session", "ascending"), ("ts", "ascending")]) if table.num_rows else table
+
+    if args.stats:
+        _print_stats(table)
+    else:
+        _print_rows(table)
@@ -0,0 +1,211 @@
+"""
+Speculation - Drafting Sylvia's reply before the visitor's turn is over
+=======================================================================
+Normally the LLM request only starts once Deepgram's transcript is final and the
+turn detector has decided the visitor is done. With speculation on, Sylvia starts
+drafting as soon as a stable transcript segment arrives (Deepgram only finalizes a
+segment once it won't change), while endpointing is still waiting.
+
+When the turn is committed, the draft is used if the committed transcript matches
+the one it was drafted from (ignoring case, punctuation and spacing) and nothing
+else in the context changed - e.g. no lead fields were pre-filled for this turn.
+Otherwise it is discarded and the reply is generated as usual. A new segment that
+changes the transcript cancels the draft and starts a new one.
+
+Hit rate and the tokens spent on discarded drafts are counted per call and in the
+worker's Prometheus metrics, to weigh the saved latency against the extra cost.
+"""
+
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Callable
+import asyncio
+import logging
+import re
+
+from livekit.agents import NOT_GIVEN, Agent, AgentSession, ModelSettings, llm
+
+import latency_metrics
+from conversation_compaction import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Generates a reply the way llm_node would, without consulting the speculation
+ReplyGenerator = Callable[
+    [llm.ChatContext, list, ModelSettings], AsyncIterable[llm.ChatChunk | str]
+]
+
+_END = object()
+
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, without punctuation and with single spaces."""
+    return " ".join(re.sub(r"[^\w\s@]", " ", text.casefold()).split())
+
+
+@dataclass
+class SpeculationStats:
+    """Outcomes of this call's drafts and the tokens they wasted."""
+
+    hits: int = 0  # Draft used as the reply
+    misses: int = 0  # Turn ended with a different transcript or context
+    cancelled: int = 0  # Replaced by a newer draft before the turn ended
+    wasted_prompt_tokens: int = 0
+    wasted_completion_tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        drafts = self.hits + self.misses + self.cancelled
+        return self.hits / drafts if drafts else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "cancelled": self.cancelled,
+            "hit_rate": self.hit_rate,
+            "wasted_prompt_tokens": self.wasted_prompt_tokens,
+            "wasted_completion_tokens": self.wasted_completion_tokens,
+        }
+
+
+@dataclass
+class _Draft:
+    transcript: str  # Normalized transcript the draft answers
+    context_ids: list[str]  # Chat items the draft was generated on
+    tools: list
+    prompt_tokens: int  # Estimated until the provider reports usage
+    completion_tokens: int = 0
+    chunks: asyncio.Queue = field(default_factory=asyncio.Queue)
+    error: BaseException | None = None
+    task: asyncio.Task | None = None
+
+
+class SpeculativeReplies:
+    """Drafts an agent's reply from stable transcript segments while the visitor is still talking."""
+
+    def __init__(self, agent: Agent, generate: ReplyGenerator):
+        self.agent = agent
+        self._generate = generate
+        self.stats = SpeculationStats()
+        self._session: AgentSession | None = None
+        self._turn_transcript = ""  # Stable segments of the current user turn
+        self._draft: _Draft | None = None
+
+    def attach(self, session: AgentSession) -> None:
+        self._session = session
+        session.on("user_input_transcribed", self._on_user_input_transcribed)
+        session.on("conversation_item_added", self._on_conversation_item_added)
+        session.on("close", lambda ev: self._discard("cancelled"))
+
+    def _on_user_input_transcribed(self, ev) -> None:
+        if not ev.is_final or not ev.transcript.strip():
+            return
+        self._turn_transcript = f"{self._turn_transcript} {ev.transcript}".strip()
+
+        # A barge-in while Sylvia is replying changes the context anyway
+        if self._session.agent_state in ("thinking", "speaking"):
+            return
+        self.speculate(self._turn_transcript)
+
+    def _on_conversation_item_added(self, ev) -> None:
+        if getattr(ev.item, "type", None) == "message" and ev.item.role == "user":
+            # Turn committed; its draft stays around until llm_node asks for it
+            self._turn_transcript = ""
+
+    def speculate(self, transcript: str) -> None:
+        """Start drafting a reply to `transcript`, replacing a draft for a different one."""
+        normalized = normalize_transcript(transcript)
+        if self._draft is not None and self._draft.transcript == normalized:
+            return
+        self._discard("cancelled")
+
+        chat_ctx = self.agent.chat_ctx.copy()
+        context_ids = [item.id for item in chat_ctx.items]
+        chat_ctx.add_message(role="user", content=transcript)
+        tools = list(self.agent.tools)
+
+        draft = _Draft(
+            transcript=normalized,
+            context_ids=context_ids,
+            tools=tools,
+            prompt_tokens=sum(estimate_tokens(item) for item in chat_ctx.items),
+        )
+        draft.task = asyncio.create_task(self._run(draft, self._generate(chat_ctx, tools, ModelSettings())))
+        self._draft = draft
+        logger.debug("Speculating on: %s", transcript)
+
+    async def _run(self, draft: _Draft, stream: AsyncIterable[llm.ChatChunk | str]) -> None:
+        try:
+            async for chunk in stream:
+                if isinstance(chunk, str):
+                    draft.completion_tokens += len(chunk) // CHARS_PER_TOKEN
+                elif chunk.usage is not None:
+                    draft.prompt_tokens = chunk.usage.prompt_tokens
+                    draft.completion_tokens = chunk.usage.completion_tokens
+                elif chunk.delta and chunk.delta.content:
+                    draft.completion_tokens += len(chunk.delta.content) // CHARS_PER_TOKEN
+                draft.chunks.put_nowait(chunk)
+        except Exception as e:
+            draft.error = e
+        finally:
+            draft.chunks.put_nowait(_END)
+
+    def take(
+        self, chat_ctx: llm.ChatContext, tools: list, model_settings: ModelSettings
+    ) -> AsyncIterable[llm.ChatChunk | str] | None:
+        """The draft reply for this llm_node call, or None to generate one as usual."""
+        draft = self._draft
+        if draft is None:
+            return None
+
+        # Only the reply to a user turn can use the draft - tool follow-ups leave it pending
+        items = chat_ctx.items
+        user_index = next(
+            (i for i in range(len(items) - 1, -1, -1)
+             if items[i].type == "message" and items[i].role == "user"),
+            None,
+        )
+        if user_index is None or any(item.type != "message" for item in items[user_index + 1:]):
+            return None
+
+        self._draft = None
+        context_ids = [item.id for i, item in enumerate(items) if i != user_index]
+        if (
+            normalize_transcript(items[user_index].text_content or "") != draft.transcript
+            or context_ids != draft.context_ids
+            or tools != draft.tools
+            or model_settings.tool_choice is not NOT_GIVEN
+            or (draft.task.done() and draft.error is not None)
+        ):
+            self._record_waste(draft, "miss")
+            return None
+
+        self.stats.hits += 1
+        latency_metrics.observe_speculation("hit")
+        logger.debug("Using speculative reply")
+        return self._replay(draft)
+
+    async def _replay(self, draft: _Draft) -> AsyncIterable[llm.ChatChunk | str]:
+        try:
+            while (chunk := await draft.chunks.get()) is not _END:
+                yield chunk
+            if draft.error is not None:
+                raise draft.error
+        finally:
+            draft.task.cancel()  # Interrupted mid-reply
+
+    def _discard(self, outcome: str) -> None:
+        draft, self._draft = self._draft, None
+        if draft is not None:
+            self._record_waste(draft, outcome)
+
+    def _record_waste(self, draft: _Draft, outcome: str) -> None:
+        # The provider bills the prompt as soon as the request is sent
+        draft.task.cancel()
+        if outcome == "miss":
+            self.stats.misses += 1
+        else:
+            self.stats.cancelled += 1
+        self.stats.wasted_prompt_tokens += draft.prompt_tokens
+        self.stats.wasted_completion_tokens += draft.completion_tokens
+        latency_metrics.observe_speculation(outcome, draft.prompt_tokens, draft.completion_tokens)
@@ -0,0 +1,107 @@
+"""
+Structured Logging - Log output off the event loop, with PII redacted
+=====================================================================
+Once a job starts, start() moves the process's log handlers (the LiveKit IPC
+forwarder in a worker, stdout in console mode) behind a queue, so formatting,
+serialization and writes happen on a background thread instead of the asyncio loop
+that schedules audio. Records are queued unformatted; the listener thread formats
+them, redacts email addresses and phone numbers in the message and in any string
+`extra` fields, and hands them on.
+
+Every record created during the job carries the context given to start() (room,
+job id) as extra fields, which the worker's JSON log formatter serializes.
+
+Because messages are formatted on the listener thread, log %-style arguments
+rather than mutable objects that change right after the call.
+"""
+
+import contextvars
+import logging
+import logging.handlers
+import queue
+import re
+
+# "john.smith@acme.com" -> "***@acme.com"
+EMAIL_RE = re.compile(r"[\w.+-]+@((?:[\w-]+\.)+[a-zA-Z]{2,})")
+
+# 7-15 digit numbers, optionally with +, spaces, dots, dashes or parentheses (not ISO dates)
+PHONE_RE = re.compile(r"(?<![\w-])(?!\d{4}-\d{2}-\d{2})\+?\(?\d(?:[\s().-]{0,2}\d){6,14}(?![\w-])")
+
+# Attributes every LogRecord has; anything else was passed as `extra`
+_RECORD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+_formatter = logging.Formatter()
+_log_context: contextvars.ContextVar[dict] = contextvars.ContextVar("log_context", default={})
+_base_record_factory = logging.getLogRecordFactory()
+_listener: "RedactingQueueListener | None" = None
+_original_handlers: list[logging.Handler] = []
+
+
+def redact(text: str) -> str:
+    text = EMAIL_RE.sub(r"***@\1", text)
+    return PHONE_RE.sub("[phone]", text)
+
+
+def configure_levels(spec: str) -> None:
+    """Set per-module log levels from "module=LEVEL,other.module=LEVEL"."""
+    for entry in spec.split(","):
+        name, _, level = entry.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def _record_factory(*args, **kwargs) -> logging.LogRecord:
+    record = _base_record_factory(*args, **kwargs)
+    record.__dict__.update(_log_context.get())
+    return record
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records as-is; QueueHandler would format them on the calling thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class RedactingQueueListener(logging.handlers.QueueListener):
+    """Formats and redacts records on the listener thread before passing them on."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            # Exception messages often quote the failing payload
+            record.exc_text = redact(_formatter.formatException(record.exc_info))
+            record.exc_info = None
+        for key, value in list(record.__dict__.items()):
+            if key not in _RECORD_ATTRS and isinstance(value, str):
+                setattr(record, key, redact(value))
+        return record
+
+
+def start(**context: str) -> None:
+    """Tag this job's log records with `context` and move log output off the event loop."""
+    global _listener, _original_handlers
+
+    _log_context.set(context)
+    logging.setLogRecordFactory(_record_factory)
+    if _listener is not None:
+        return
+
+    root = logging.getLogger()
+    _original_handlers = root.handlers[:]
+    log_queue = queue.SimpleQueue()
+    _listener = RedactingQueueListener(log_queue, *_original_handlers, respect_handler_level=True)
+    root.handlers = [DeferredQueueHandler(log_queue)]
+    _listener.start()
+
+
+def stop() -> None:
+    """Flush queued records and write directly to the original handlers again."""
+    global _listener
+
+    if _listener is None:
+        return
+    logging.getLogger().handlers = _original_handlers
+    _listener.stop()
+    _listener = None
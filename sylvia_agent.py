@@ -9,201 +9,569 @@ Built with LiveKit Agents + ElevenLabs Voice Cloning
 
 from dotenv import load_dotenv
 from livekit import agents
-from livekit.agents import Agent, AgentSession, RunContext, WorkerOptions, cli, JobProcess
+from livekit.agents import Agent, AgentSession, RunContext, WorkerOptions, cli, JobProcess, ModelSettings, NOT_GIVEN
+from livekit.agents import llm, metrics
 from livekit.agents.llm import function_tool
-from livekit.plugins import openai, deepgram, silero, elevenlabs
 from datetime import datetime
+from urllib.parse import urlsplit
+import asyncio
 import logging
 import os
+import sys
 import httpx
 import json
+import tempfile
+
+import audio_cache
+import latency_metrics
+import provider_registry
+import structured_logging
+from agent_config import AgentConfig, ConfigStore, load_config
+from answer_cache import AnswerCache
+from conversation_compaction import ConversationCompactor
+from crm_outbox import CrmOutbox
+from email_validation import check_email
+from endpointing import ASKS_FOR_CONTACT_RE, EndpointingController, EndpointingDelays
+from lead_extraction import extract_lead_fields
+from lead_index import LeadIndex
+from lead_state import LeadStage, LeadState
+from provider_router import ProviderRouter, RoutedLLM, RoutedTTS
+from session_archive import ArchiveWriter, SessionRecorder
+from speculation import SpeculativeReplies
+from worker_load import JobLoadReporter, WorkerLoad
 
 # Load environment variables
 load_dotenv(".env")
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (handlers are set up by the LiveKit CLI; volume per module via LOG_LEVELS)
+structured_logging.configure_levels(os.getenv("LOG_LEVELS", "httpx=WARNING"))
 logger = logging.getLogger(__name__)
 
+# Prompt, greeting, tool messages, service catalog, providers and CRM webhook. New calls pick up
+# changes to these files without a restart; settings missing from it default to the env below
+AGENT_CONFIG_PATH = os.getenv(
+    "AGENT_CONFIG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "agent_config.json")
+)
+
 # CRM Webhook URL
-CRM_WEBHOOK_URL = "https://primary-production-5771.up.railway.app/webhook/sylvia-voice-agent"
+CRM_WEBHOOK_URL = os.getenv(
+    "CRM_WEBHOOK_URL", "https://primary-production-5771.up.railway.app/webhook/sylvia-voice-agent"
+)
+
+
+# Open TLS connections to the providers and the CRM before the room is joined
+PREWARM_CONNECTIONS = os.getenv("PREWARM_CONNECTIONS", "true").lower() == "true"
+
+# Pre-synthesize the configured opening line in prewarm
+GREETING_CACHE = os.getenv("GREETING_CACHE", "true").lower() == "true"
+
+# Where synthesized audio is shared between worker processes (empty = memory only)
+AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", ".cache/audio")
+
+# Cache repeated phrases (tool confirmations, fallbacks) instead of re-synthesizing them
+TTS_CACHE = os.getenv("TTS_CACHE", "true").lower() == "true"
+TTS_CACHE_SIZE = int(os.getenv("TTS_CACHE_SIZE", "256"))
+# Size limit of AUDIO_CACHE_DIR; the oldest files are removed beyond it
+AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "64"))
+
+# Conversation history budget before older turns get summarized (instructions excluded)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+
+# End-of-turn detection model on top of VAD (the model is fetched by `download-files`)
+TURN_DETECTOR = os.getenv("TURN_DETECTOR", "true").lower() == "true"
+# Seconds to wait after the visitor stops speaking: min when the turn looks finished, max when not
+MIN_ENDPOINTING_DELAY = float(os.getenv("MIN_ENDPOINTING_DELAY", "0.5"))
+MAX_ENDPOINTING_DELAY = float(os.getenv("MAX_ENDPOINTING_DELAY", "3.0"))
+# Stricter delays while an email or phone number is being dictated
+DICTATION_MIN_ENDPOINTING_DELAY = float(os.getenv("DICTATION_MIN_ENDPOINTING_DELAY", "1.5"))
+DICTATION_MAX_ENDPOINTING_DELAY = float(os.getenv("DICTATION_MAX_ENDPOINTING_DELAY", "6.0"))
+
+# Start drafting the reply from stable transcript segments, before end of turn (costs extra tokens)
+SPECULATIVE_LLM = os.getenv("SPECULATIVE_LLM", "false").lower() == "true"
+
+# Leads waiting for CRM delivery are kept here until n8n accepts them
+CRM_OUTBOX_DIR = os.getenv("CRM_OUTBOX_DIR", ".cache/crm_outbox")
+# Leads per webhook request; >1 posts a JSON array, so the n8n workflow must accept one
+CRM_BATCH_SIZE = int(os.getenv("CRM_BATCH_SIZE", "1"))
+# How long a finished job keeps trying to deliver before leaving leads for replay
+CRM_FLUSH_TIMEOUT = float(os.getenv("CRM_FLUSH_TIMEOUT", "5.0"))
+
+# Leads already sent from this worker; repeats within the TTL are skipped or sent as updates
+LEAD_INDEX_PATH = os.getenv("LEAD_INDEX_PATH", ".cache/lead_index.sqlite3")
+LEAD_DEDUP_TTL_DAYS = float(os.getenv("LEAD_DEDUP_TTL_DAYS", "30"))
+
+# Job admission: stop taking calls when CPU or a call's event-loop lag gets near its limit
+LOAD_THRESHOLD = float(os.getenv("LOAD_THRESHOLD", "0.75"))
+LOOP_LAG_BUDGET_MS = float(os.getenv("LOOP_LAG_BUDGET_MS", "50"))
+LOAD_STATS_DIR = os.getenv("LOAD_STATS_DIR", os.path.join(tempfile.gettempdir(), "sylvia-load"))
+# Prewarmed idle processes, scaled between these with the recent call arrival rate
+MIN_IDLE_PROCESSES = int(os.getenv("MIN_IDLE_PROCESSES", "1"))
+MAX_IDLE_PROCESSES = int(os.getenv("MAX_IDLE_PROCESSES", "4"))
+
+# Service descriptions and FAQ searched by lookup_services(), and how many entries it returns
+SERVICE_CATALOG_PATH = os.getenv("SERVICE_CATALOG_PATH", "service_catalog.json")  # Relative to the config file
+SERVICE_LOOKUP_TOP_K = int(os.getenv("SERVICE_LOOKUP_TOP_K", "3"))
+
+# Answer recurring questions from faq_answers.json or earlier LLM replies, without an LLM request
+ANSWER_CACHE = os.getenv("ANSWER_CACHE", "true").lower() == "true"
+FAQ_ANSWERS_PATH = os.getenv(
+    "FAQ_ANSWERS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_answers.json")
+)
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", ".cache/answer_cache.sqlite3")
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "24"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.85"))
+# Store LLM replies to short, tool-free questions on a curated topic for later calls (replayed to other visitors)
+ANSWER_CACHE_LEARN = os.getenv("ANSWER_CACHE_LEARN", "false").lower() == "true"
+ANSWER_CACHE_MAX_WORDS = int(os.getenv("ANSWER_CACHE_MAX_WORDS", "12"))
+
+# Speech-to-Text provider ("provider:model", see provider_registry.py)
+STT_PROVIDER = os.getenv("STT_PROVIDER", "deepgram:nova-2")
+
+# Providers per stage in order of preference ("provider:model" for LLMs, "provider:voice" for TTS).
+# With more than one, slow requests are hedged and failing providers skipped (see provider_router.py)
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", f"openai:{os.getenv('LLM_CHOICE', 'gpt-4o-mini')}")
+TTS_PROVIDERS = os.getenv("TTS_PROVIDERS", "openai:nova")
+# Also ask the next provider when the first token / first audio takes longer than this (seconds)
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "1.5"))
+TTS_HEDGE_AFTER = float(os.getenv("TTS_HEDGE_AFTER", "1.0"))
+
+# Per-worker latency histograms on :METRICS_PORT/metrics (0 = disabled)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Transcripts, tool calls, lead stages and turn timings of every call, as Arrow files per day (needs pyarrow)
+SESSION_ARCHIVE = os.getenv("SESSION_ARCHIVE", "true").lower() == "true"
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", ".cache/sessions")
+SESSION_ARCHIVE_MAX_FILE_MB = float(os.getenv("SESSION_ARCHIVE_MAX_FILE_MB", "64"))
+
+# What agent_config.json falls back to for the keys it leaves out
+CONFIG_DEFAULTS = {
+    "crm_webhook_url": CRM_WEBHOOK_URL,
+    "service_catalog_path": SERVICE_CATALOG_PATH,
+    "llm_providers": LLM_PROVIDERS,
+    "tts_providers": TTS_PROVIDERS,
+    "llm_hedge_after": LLM_HEDGE_AFTER,
+    "tts_hedge_after": TTS_HEDGE_AFTER,
+}
+
+
+def _openai_client(userdata: dict):
+    """The OpenAI client (and connection pool) shared by this process's OpenAI LLM and TTS."""
+    if userdata.get("openai_client") is None:
+        import openai as openai_sdk
+
+        userdata["openai_client"] = openai_sdk.AsyncClient(
+            max_retries=0,
+            http_client=httpx.AsyncClient(
+                verify=userdata["ssl_context"],
+                timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=50, keepalive_expiry=120),
+            ),
+        )
+    return userdata["openai_client"]
 
 
-def prewarm(proc: JobProcess):
-    """Prewarm VAD model for faster startup."""
-    proc.userdata["vad"] = silero.VAD.load()
+def _build_stage(stage: str, specs: str, hedge_after: float, client=None):
+    """One provider as-is, or several behind a ProviderRouter (hedging + failover)."""
+    providers = {}
+    for spec in provider_registry.split_specs(specs):
+        try:
+            providers[spec] = provider_registry.build(stage, spec, client=client)
+        except ImportError as e:
+            hint = provider_registry.install_hint(provider_registry.resolve(stage, spec)[0])
+            logger.warning("Skipping %s provider %s: %s%s", stage, spec, e, hint)
+    if not providers:
+        raise RuntimeError(f"No usable {stage} provider in {specs!r}")
+    if len(providers) == 1:
+        return next(iter(providers.values()))
+
+    router = ProviderRouter(stage, providers, hedge_after=hedge_after)
+    return RoutedLLM(router) if stage == "llm" else RoutedTTS(router)
+
+
+def _build_providers(config: AgentConfig, userdata: dict) -> dict:
+    """LLM and TTS for the config's provider settings, as proc.userdata entries."""
+    specs = provider_registry.split_specs(f"{config.llm_providers},{config.tts_providers}")
+    client = _openai_client(userdata) if any(spec.partition(":")[0] == "openai" for spec in specs) else None
+    session_llm = _build_stage("llm", config.llm_providers, config.llm_hedge_after, client=client)
+    tts = _build_stage("tts", config.tts_providers, config.tts_hedge_after, client=client)
+    routers = [model.router for model in (session_llm, tts) if isinstance(model, (RoutedLLM, RoutedTTS))]
+    if TTS_CACHE:
+        tts = audio_cache.CachedTTS(
+            tts,
+            phrases=_cacheable_phrases(config),
+            max_entries=TTS_CACHE_SIZE,
+            cache_dir=AUDIO_CACHE_DIR or None,
+            max_disk_bytes=int(AUDIO_CACHE_MAX_MB * 1024 * 1024),
+        )
+    return {
+        "llm": session_llm,
+        "tts": tts,
+        "provider_routers": routers,
+        "provider_settings": config.provider_settings,
+        "phrases_for": config.version,
+    }
+
+
+def _cacheable_phrases(config: AgentConfig) -> list[str]:
+    """Text the TTS cache may keep: fixed phrases only, never anything with lead data in it."""
+    phrases = config.fixed_phrases
+    if ANSWER_CACHE:
+        phrases += AnswerCache.load_curated(FAQ_ANSWERS_PATH).values()
+    return phrases
+
+
+async def _apply_config(userdata: dict) -> AgentConfig:
+    """The config for a new call, with this process's providers, webhook and greeting brought up to date.
+
+    Idle processes were prewarmed with whatever config was current then; when the files
+    changed since, only what the change touches is rebuilt here.
+    """
+    config = userdata["config_store"].current()
+    if config.provider_settings != userdata["provider_settings"]:
+        logger.info("Provider settings changed, rebuilding LLM/TTS: %s / %s", config.llm_providers, config.tts_providers)
+        userdata["retired_providers"] += [userdata["llm"], userdata["tts"]]
+        userdata.update(_build_providers(config, userdata))
+    elif userdata["phrases_for"] != config.version and isinstance(userdata["tts"], audio_cache.CachedTTS):
+        userdata["tts"].set_phrases(_cacheable_phrases(config))
+        userdata["phrases_for"] = config.version
+    userdata["crm_outbox"].url = config.crm_webhook_url
+
+    if GREETING_CACHE and userdata["greeting_for"] != (config.greeting, config.tts_providers):
+        # Another process may have synthesized it already; otherwise this call greets live
+        tts = userdata["tts"]
+        userdata["greeting_audio"] = await tts.get(config.greeting) if isinstance(tts, audio_cache.CachedTTS) else None
+        userdata["greeting_for"] = (config.greeting, config.tts_providers)
+    return config
+
+
+async def _close_retired_providers(userdata: dict) -> None:
+    """Close LLM/TTS instances a config change replaced, once no call in this process uses them."""
+    in_use = userdata["providers_in_use"]
+    still_used = []
+    for model in userdata["retired_providers"]:
+        if in_use.get(id(model)):
+            still_used.append(model)
+            continue
+        try:
+            await model.aclose()
+        except Exception as e:
+            logger.warning("Closing replaced provider %s failed: %s", type(model).__name__, e)
+    userdata["retired_providers"] = still_used
 
 
-class Sylvia(Agent):
-    """Sylvia - Synctrack's AI Automation Consultant"""
+def prewarm(proc: JobProcess):
+    """Prewarm everything a job needs so calls don't pay for it at greeting time.
+
+    Runs once per worker process, before any job is assigned. Loads the VAD model,
+    builds the provider clients and creates the pooled HTTP client used for the
+    CRM webhook. entrypoint() picks all of these up from proc.userdata.
+    """
+    proc.userdata["vad"] = provider_registry.build("vad", "silero")
+
+    # Speech-to-Text - Deepgram by default, for high accuracy
+    proc.userdata["stt"] = provider_registry.build("stt", STT_PROVIDER)
+
+    # Prompt, providers and endpoints - checked for changes again at the start of every call
+    proc.userdata["config_store"] = ConfigStore(AGENT_CONFIG_PATH, CONFIG_DEFAULTS)
+    config = proc.userdata["config_store"].current()
+
+    # Loading the CA bundle takes ~50ms, so the HTTP clients of this process share one context
+    proc.userdata["ssl_context"] = httpx.create_ssl_context()
+
+    # Large Language Model and Text-to-Speech, possibly several providers each
+    proc.userdata["openai_client"] = None  # Created by the first OpenAI provider
+    proc.userdata.update(_build_providers(config, proc.userdata))
+    proc.userdata["retired_providers"] = []  # Replaced by a config change, closed when unused
+    proc.userdata["providers_in_use"] = {}  # id(model) -> calls using it
+
+    # Pooled client for the n8n webhook, reused by every CRM post in this process
+    proc.userdata["crm_client"] = httpx.AsyncClient(
+        verify=proc.userdata["ssl_context"],
+        timeout=10.0,
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=120),
+    )
+    proc.userdata["crm_outbox"] = CrmOutbox(
+        proc.userdata["crm_client"], config.crm_webhook_url, CRM_OUTBOX_DIR, batch_size=CRM_BATCH_SIZE
+    )
+    proc.userdata["lead_index"] = LeadIndex(LEAD_INDEX_PATH, ttl=LEAD_DEDUP_TTL_DAYS * 86400)
 
-    def __init__(self):
-        super().__init__(
-            instructions="""You are Sylvia, a friendly and confident AI automation consultant for Synctrack.
-
-**Your Role:**
-You help website visitors learn about Synctrack's automation services and capture qualified leads.
-
-**Personality:**
-- Warm, helpful, and professional (like a smart colleague, not a robot)
-- Empathetic, patient, and a clear communicator
-- Use natural speech with occasional fillers like "hm", "sure thing", "makes sense"
-- Always end responses with a question or natural follow-up
-- Know when to pause and let the user speak
-
-**What Synctrack Does:**
-Synctrack builds automation systems and AI agents that help businesses save time and scale faster:
-- AI lead generation systems
-- Workflow automation
-- Smart reporting dashboards
-- Voice AI agents or Sales Assistant Agent
-- Modern website development
-- CRM automations
-
-**Value Proposition:**
-"Automation that drives business growth. We combine AI and data workflows to make SMBs faster, smarter, and more profitable."
-
-**Conversation Strategy:**
-1. Start with warm greeting: "Hey there! I'm Sylvia from Synctrack — how's your day going so far?"
-2. Listen to their needs and challenges
-3. Ask qualifying questions about their business
-4. **CRITICAL LEAD CAPTURE**: When user shows interest or intent, you MUST collect:
-   - Name (REQUIRED)
-   - Company (REQUIRED)
-   - Intent/Pain point (REQUIRED - what they need help with)
-   - **Email (TOP PRIORITY)** - Always ask for email first, frame it as: "Let me send you some info - what's the best email to reach you at?"
-   - Phone (OPTIONAL - collect if they offer, but email is more important)
-5. **CONVINCE THEM TO SHARE EMAIL**: When they show interest:
-   - Make it easy: "I can send you details about how we can help - what's your email?"
-   - Create value: "Let me send you some examples of what we've built - what email should I use?"
-   - Alternative: "Want me to have our team reach out? Just need your email to connect you."
-6. **IMPORTANT**: If they're hesitant about contact info, offer: "No problem! You can also reach out to us at info@synctrack.de"
-7. When you have name, company, intent, and EMAIL → call send_to_crm() immediately
-8. **DON'T MISS LEADS**: Even if someone just wants "someone to reach out" - collect their info and send to CRM!
-
-**Lead Data Tracking:**
-- As you learn information, IMMEDIATELY call the tracking functions to save it
-- Example: User says "I'm John" → call track_name(name="John")
-- Example: User says "I work at Acme Corp" → call track_company(company="Acme Corp")
-- Example: User says "john@acme.com" → call track_email(email="john@acme.com")
-- Example: User says "+1-555-0123" → call track_phone(phone="+1-555-0123")
-- Example: User mentions "need automation" → call track_intent(intent="automation")
-- **MINIMUM REQUIRED TO SEND**: name, company, intent, and EMAIL (phone is bonus but not required)
-- **PRIORITY**: EMAIL is most important contact method - always try to get it!
-- When you have minimum data (name + company + intent + email), call send_to_crm() to save the lead
-- Don't let interested users leave without getting their email
-- Data will also be automatically sent to CRM when call ends if minimum fields are captured
-
-**EMAIL VERIFICATION (CRITICAL):**
-- When you capture an email with track_email(), it will automatically spell it back to the user
-- ALWAYS wait for user confirmation after spelling out the email
-- Listen for "yes", "correct", "that's right" → call confirm_email_spelling(is_correct=True)
-- Listen for "no", "wrong", "incorrect" → call confirm_email_spelling(is_correct=False)
-- If email is incorrect, ask them to spell it out letter by letter and try again
-- NEVER send to CRM without verifying email spelling first (if email was provided)
-- This prevents email typos and ensures we can reach the lead
-
-**Key Guidelines:**
-- Be conversational and natural, not salesy
-- Show genuine interest in their challenges
-- Reference specific Synctrack services that match their needs
-- Make collecting email feel like a natural value exchange: "Let me send you info..."
-- **When they show intent/interest**: Frame email collection as helping them (sending info, connecting with team, etc.)
-- **When someone says "have someone reach out"**: Perfect! Respond with "Happy to! What's the best email for our team to reach you?"
-- If hesitant about contact info after trying, offer: "No problem! You can reach out to us at info@synctrack.de"
-- Be friendly and helpful, not pushy - but don't give up on email too easily
-- Email > Phone (email is more important, get it first!)"""
+    # Buffered here, written to disk by a background task in each job
+    proc.userdata["session_archive"] = None
+    if SESSION_ARCHIVE and ArchiveWriter.available():
+        proc.userdata["session_archive"] = ArchiveWriter(
+            SESSION_ARCHIVE_DIR, max_file_bytes=int(SESSION_ARCHIVE_MAX_FILE_MB * 1024 * 1024)
+        )
+    elif SESSION_ARCHIVE:
+        logger.warning("SESSION_ARCHIVE needs pyarrow (uv sync --extra archive), calls won't be archived")
+    proc.userdata["answer_cache"] = None
+    if ANSWER_CACHE:
+        proc.userdata["answer_cache"] = AnswerCache(
+            ANSWER_CACHE_PATH,
+            ttl=ANSWER_CACHE_TTL_HOURS * 3600,
+            max_entries=ANSWER_CACHE_SIZE,
+            min_similarity=ANSWER_CACHE_MIN_SIMILARITY,
+            curated=AnswerCache.load_curated(FAQ_ANSWERS_PATH),
         )
 
-        # Lead tracking
-        self.lead_data = {
-            "name": None,
-            "email": None,
-            "phone": None,
-            "company": None,
-            "intent": None,
-            "conversation_summary": [],
-            "email_verified": False,
-            "sent_to_crm": False  # Track if already sent to prevent duplicates
-        }
+    # Greeting audio, synthesized once per voice/provider (or loaded from the disk cache).
+    # Uses its own TTS instance because this runs on a throwaway event loop.
+    proc.userdata["greeting_audio"] = None
+    proc.userdata["greeting_for"] = (config.greeting, config.tts_providers)
+    if GREETING_CACHE:
+        proc.userdata["greeting_audio"] = audio_cache.presynthesize(
+            _build_stage("tts", config.tts_providers, config.tts_hedge_after),
+            config.greeting,
+            cache_dir=AUDIO_CACHE_DIR or None,
+        )
 
-    @function_tool
-    async def track_name(
-        self,
-        context: RunContext,
-        name: str
-    ) -> str:
-        """Track the lead's name.
 
-        Args:
-            name: Lead's name (first name, last name, or full name)
-        """
-        self.lead_data["name"] = name
-        logger.info(f"Name tracked: {name}")
-        return "Got it, I've noted your name."
+async def _warm_crm_connection(client: httpx.AsyncClient, url: str):
+    """Open the TLS connection to the CRM host so the first lead post skips the handshake."""
+    parts = urlsplit(url)
+    try:
+        await client.head(f"{parts.scheme}://{parts.netloc}/")
+    except Exception as e:
+        logger.debug("CRM connection prewarm failed: %s", e)
 
-    @function_tool
-    async def track_company(
-        self,
-        context: RunContext,
-        company: str
-    ) -> str:
-        """Track the lead's company name.
 
-        Args:
-            company: Lead's company or business name
-        """
-        self.lead_data["company"] = company
-        logger.info(f"Company tracked: {company}")
-        return "Perfect, I've noted your company."
+class Sylvia(Agent):
+    """Sylvia - Synctrack's AI Automation Consultant"""
 
-    @function_tool
-    async def track_email(
+    def __init__(
         self,
-        context: RunContext,
-        email: str
-    ) -> str:
-        """Track the lead's email address and spell it back for verification.
+        config: AgentConfig,
+        crm_outbox: CrmOutbox,
+        lead_index: LeadIndex,
+        greeting_audio: audio_cache.CachedAudio | None = None,
+        answer_cache: AnswerCache | None = None,
+        speculative: bool = False,
+    ):
+        super().__init__(instructions=config.instructions)
+
+        # Snapshot of the agent config this call started with (later edits apply to new calls)
+        self.config = config
+
+        # Lead tracking (collecting -> email pending verification -> ready -> sent)
+        self.lead = LeadState()
+        # Email domains the visitor stood by; never suggest a "fix" for them again
+        self.known_email_domains: set[str] = set()
+
+        # Shared, pooled HTTP client for the n8n webhook (built in prewarm)
+        self.crm_outbox = crm_outbox
+        self.lead_index = lead_index
+
+        # In-memory search index over the service catalog and FAQ (built with the config)
+        self.service_catalog = config.service_catalog
+
+        # Pre-synthesized greeting, played without an LLM/TTS round trip
+        self.greeting_audio = greeting_audio
+
+        # Keeps the LLM context bounded on long calls; the running summary also
+        # becomes the CRM summary
+        self.compactor = ConversationCompactor(
+            token_budget=CONTEXT_TOKEN_BUDGET,
+            keep_turns=CONTEXT_KEEP_TURNS,
+            on_summary=self._on_conversation_summary,
+        )
 
-        Args:
-            email: Lead's email address (IMPORTANT: Will be spelled back for verification)
-        """
-        self.lead_data["email"] = email
-        self.lead_data["email_verified"] = False  # Reset verification when new email is captured
-        # Spell out the email for verification
-        spelled_email = self._spell_out_email(email)
-        logger.info(f"Email captured: {email}")
-        return f"Got it. Let me confirm that email address: {spelled_email}. Is that correct?"
+        # Canned answers to recurring questions (None = always ask the LLM)
+        self.answer_cache = answer_cache
+
+        # Reply drafts started while the visitor is still finishing their turn
+        self.speculation = SpeculativeReplies(self, self._generate_reply) if speculative else None
+
+    @property
+    def lead_data(self) -> dict:
+        """The captured lead fields and flags."""
+        return self.lead.data
+
+    def _on_conversation_summary(self, summary: str):
+        """Store the latest running summary so it goes out with the CRM payload."""
+        self.lead_data["conversation_summary"] = [summary]
+
+    async def on_user_turn_completed(
+        self, turn_ctx: llm.ChatContext, new_message: llm.ChatMessage
+    ) -> None:
+        """Pre-fill empty lead fields from the final transcript so the LLM doesn't need a tool call per fact."""
+        fields = extract_lead_fields(new_message.text_content or "")
+        fields = {field: value for field, value in fields.items() if not self.lead_data[field]}
+        email_note = self._check_email_field(fields)
+        captured = self.lead.fill(**fields)
+        if not captured:
+            return
+
+        logger.info("Lead fields captured from transcript: %s", ", ".join(captured))
+        note = (
+            f"Pre-filled {', '.join(captured)} from the visitor's last message; "
+            "call update_lead only if one of these is wrong. "
+            + self._describe_lead_update(captured, email_note)
+        )
+        turn_ctx.add_message(role="system", content=note)
 
-    @function_tool
-    async def track_phone(
+    def _check_email_field(self, fields: dict) -> str:
+        """Normalize fields["email"] in place before it's stored and read back.
+
+        The address is stored as given; a likely domain typo only becomes a suggestion.
+
+        Returns:
+            A note for the LLM if the email has a suggested fix or was rejected, else ""
+        """
+        if not fields.get("email"):
+            return ""
+
+        check = check_email(fields["email"], self.known_email_domains)
+        if not check.valid:
+            logger.info("Rejected invalid email: %s", fields["email"])
+            fields["email"] = None
+            return f"The email '{check.original}' isn't a valid address - ask them to spell it out letter by letter."
+
+        fields["email"] = check.email
+        if check.suggestion:
+            logger.info("Suggesting email %s for %s", check.suggestion, check.email)
+            # Offered once: if they spell the same domain again, that's what they meant
+            self.known_email_domains.add(check.email.split("@", 1)[1])
+            return (
+                f"Saved {check.email} as heard, but they may have meant {check.suggestion} - ask which one is right "
+                "and call update_lead with it only if they pick the suggestion."
+            )
+        return ""
+
+    def _describe_lead_update(self, delta: dict[str, str], email_note: str = "") -> str:
+        """Tell the LLM what was saved and what the lead needs next."""
+        saved = "Saved: " + ", ".join(f"{field}={value}" for field, value in delta.items()) + "."
+        if email_note:
+            saved = f"{saved} {email_note}"
+        stage = self.lead.stage
+
+        if stage == LeadStage.EMAIL_PENDING_VERIFICATION and "email" in delta and email_note:
+            return saved  # Settle the suggested fix first, then read back whichever they pick
+        if stage == LeadStage.EMAIL_PENDING_VERIFICATION and "email" in delta:
+            spelled_email = self._spell_out_email(self.lead_data["email"])
+            return f"{saved} Let me confirm that email address: {spelled_email}. Is that correct?"
+        if stage == LeadStage.EMAIL_PENDING_VERIFICATION:
+            return f"{saved} The email still needs to be confirmed by the visitor."
+        if stage == LeadStage.READY and self.lead.has_contact:
+            return f"{saved} All required details captured - call send_to_crm() now."
+        if stage == LeadStage.READY:
+            return f"{saved} Still need an email (or phone) to reach them."
+
+        missing = self.lead.missing_fields()
+        if missing:
+            return f"{saved} Still missing: {', '.join(missing)}."
+        return saved
+
+    async def llm_node(
         self,
-        context: RunContext,
-        phone: str
-    ) -> str:
-        """Track the lead's phone number.
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool | llm.RawFunctionTool],
+        model_settings: ModelSettings,
+    ):
+        """Reply from the answer cache or the speculative draft if they fit, else generate from the compacted context."""
+        question = self._cacheable_question(chat_ctx)
+        # SQLite may wait on another process's write, so keep it off the audio loop
+        if question is not None and (cached := await asyncio.to_thread(self.answer_cache.lookup, question)):
+            logger.info("Answer cache hit (%s, %.2f): %s", cached.source, cached.similarity, cached.question)
+            yield cached.answer
+            return
+
+        draft = self.speculation.take(chat_ctx, tools, model_settings) if self.speculation else None
+        reply = []
+        async for chunk in draft or self._generate_reply(chat_ctx, tools, model_settings):
+            if isinstance(chunk, str):
+                reply.append(chunk)
+            elif chunk.delta and chunk.delta.tool_calls:
+                question = None  # Answers that needed a tool aren't reusable as-is
+            elif chunk.delta and chunk.delta.content:
+                reply.append(chunk.delta.content)
+            yield chunk
+
+        if question is not None and ANSWER_CACHE_LEARN:
+            await self._learn_answer(chat_ctx, question, "".join(reply).strip())
+
+    def _cacheable_question(self, chat_ctx: llm.ChatContext) -> str | None:
+        """The visitor's question if this reply may come from the answer cache, else None."""
+        if self.answer_cache is None:
+            return None
+
+        items = chat_ctx.items
+        user_index = next(
+            (i for i in range(len(items) - 1, -1, -1)
+             if items[i].type == "message" and items[i].role == "user"),
+            None,
+        )
+        if user_index is None or any(item.type != "message" for item in items[user_index + 1:]):
+            return None  # Greeting or tool follow-up, not a reply to the visitor
 
-        Args:
-            phone: Lead's phone number
+        question = items[user_index].text_content or ""
+        previous = next(
+            (item for item in reversed(items[:user_index]) if item.type == "message" and item.role == "assistant"),
+            None,
+        )
+        if (
+            user_index != len(items) - 1  # Lead fields were pre-filled from this turn
+            or self.lead.stage != LeadStage.COLLECTING  # Mid lead capture, or the lead was sent
+            or (previous is not None and ASKS_FOR_CONTACT_RE.search(previous.text_content or ""))
+            or len(question.split()) > ANSWER_CACHE_MAX_WORDS
+        ):
+            self.answer_cache.skip()
+            return None
+        return question
+
+    async def _learn_answer(self, chat_ctx: llm.ChatContext, question: str, answer: str):
+        """Store a generated answer to a question for later calls, unless it's about this visitor.
+
+        Anything the visitor has said or Sylvia picked up about them, and any number
+        that could be a phone number, keeps the answer out of the shared cache.
         """
-        self.lead_data["phone"] = phone
-        logger.info(f"Phone tracked: {phone}")
-        return "Great, I've got your phone number."
+        if not question.rstrip().endswith("?") or not answer or sum(c.isdigit() for c in answer) >= 3:
+            return
+        details = [value for value in self.lead_data.values() if isinstance(value, str)]
+        for item in chat_ctx.items:
+            if item.type == "message" and item.role == "user":
+                details += extract_lead_fields(item.text_content or "").values()  # Said but not saved yet
+        if any(len(value) > 2 and value.lower() in answer.lower() for value in details):
+            return
+        await asyncio.to_thread(self.answer_cache.store, question, answer)
+
+    async def _generate_reply(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list[llm.FunctionTool | llm.RawFunctionTool],
+        model_settings: ModelSettings,
+    ):
+        """Send a compacted context (instructions + running summary + recent turns) to the LLM."""
+        chat_ctx = self.compactor.compact(chat_ctx, self.session.llm)
+        async for chunk in Agent.default.llm_node(self, chat_ctx, tools, model_settings):
+            yield chunk
 
     @function_tool
-    async def track_intent(
+    async def update_lead(
         self,
         context: RunContext,
-        intent: str
+        name: str | None = None,
+        company: str | None = None,
+        email: str | None = None,
+        phone: str | None = None,
+        intent: str | None = None
     ) -> str:
-        """Track what the lead is interested in or their main pain point.
+        """Save lead details the visitor just shared. Pass every field you learned in ONE call.
 
         Args:
+            name: Lead's name (first name, last name, or full name)
+            company: Lead's company or business name
+            email: Lead's email address (IMPORTANT: Will be spelled back for verification)
+            phone: Lead's phone number
             intent: What they're interested in or their main pain point
         """
-        self.lead_data["intent"] = intent
-        logger.info(f"Intent tracked: {intent}")
-        return "Perfect, I understand what you're looking for."
+        fields = {"name": name, "company": company, "email": email, "phone": phone, "intent": intent}
+        email_note = self._check_email_field(fields)
+        delta = self.lead.update(**fields)
+        if not delta:
+            return email_note or "Nothing new to save - those details are already noted."
+        return self._describe_lead_update(delta, email_note)
 
     def _spell_out_email(self, email: str) -> str:
         """Convert email to spoken format for verification."""
@@ -254,110 +622,84 @@ Synctrack builds automation systems and AI agents that help businesses save time
         Args:
             is_correct: True if user confirms email is correct, False if they want to correct it
         """
+        self.lead.confirm_email(is_correct)
+        if is_correct and self.lead_data["email"]:
+            self.known_email_domains.add(self.lead_data["email"].split("@", 1)[1])
         if is_correct:
-            self.lead_data["email_verified"] = True
-            logger.info(f"✅ Email verified: {self.lead_data['email']}")
-            return "Perfect! I've got your email saved correctly."
+            logger.info("✅ Email verified: %s", self.lead_data["email"])
+            return self.config.message("email_confirmed")
         else:
-            self.lead_data["email_verified"] = False
-            logger.warning(f"⚠️ Email needs correction: {self.lead_data['email']}")
-            return "No problem! Could you spell out your email address for me, letter by letter?"
+            logger.warning("⚠️ Email needs correction: %s", self.lead_data["email"])
+            return self.config.message("email_correction")
 
     @function_tool
     async def send_to_crm(
         self,
         context: RunContext,
-        name: str,
-        company: str,
-        intent: str,
-        email: str | None = None,
-        phone: str | None = None,
         summary: str | None = None
     ) -> str:
-        """Send qualified lead information to Synctrack's n8n CRM.
+        """Send the qualified lead saved with update_lead() to Synctrack's n8n CRM.
 
         Args:
-            name: Lead's full name (REQUIRED)
-            company: Lead's company name (REQUIRED)
-            intent: Main interest or pain point (REQUIRED - e.g., "lead generation automation", "AI workflows")
-            email: Lead's email address (OPTIONAL - but highly recommended)
-            phone: Lead's phone number (OPTIONAL - collect if email not available)
             summary: Brief summary of the conversation and lead's needs (OPTIONAL)
 
-        Important: Prioritize collecting at least email. Phone is a bonus if user provides it.
+        Important: Requires name, company, intent and a verified email (or a phone number).
         """
-        # Validate that at least one contact method is provided
-        if not email and not phone:
-            return "I need at least an email address or phone number to send your information to our team. Could you provide one of those?"
+        stage = self.lead.stage
+        if stage == LeadStage.SENT:
+            return self.config.message("crm_already_sent")
+        if stage == LeadStage.EMAIL_PENDING_VERIFICATION:
+            spelled_email = self._spell_out_email(self.lead_data["email"])
+            return self.config.message("crm_email_unconfirmed", spelled_email=spelled_email)
+        if stage == LeadStage.COLLECTING:
+            return self.config.message("crm_missing_fields", missing=", ".join(self.lead.missing_fields()))
 
-        try:
-            # Prepare CRM payload
-            payload = {
-                "source": "voice",
-                "name": name,
-                "email": email if email else "Not provided",
-                "phone": phone if phone else "Not provided",
-                "company": company,
-                "intent": intent,
-                "summary": summary if summary else "Lead captured via voice agent",
-                "timestamp": datetime.utcnow().isoformat() + "Z"
-            }
-
-            logger.info(f"📤 Sending lead to CRM webhook: {CRM_WEBHOOK_URL}")
-            logger.info(f"📋 Payload: {payload}")
-
-            # Send to n8n webhook
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    CRM_WEBHOOK_URL,
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=10.0
-                )
-
-                if response.status_code in [200, 201, 202]:
-                    logger.info(f"✅ Lead sent to CRM: {name} from {company}")
-                    self.lead_data["sent_to_crm"] = True  # Mark as sent only on success
-                    return f"Perfect! I've sent your information to our team. Someone from Synctrack will follow up soon to show you exactly how we can help {company} with {intent}. Thanks for chatting with me today!"
-                else:
-                    logger.error(f"❌ CRM webhook failed: {response.status_code} - {response.text}")
-                    return "I've captured your information and will make sure our team reaches out to you. Thanks for your interest in Synctrack!"
-
-        except Exception as e:
-            logger.error(f"Error sending to CRM: {str(e)}")
-            return "I've noted your details and our team will definitely follow up with you. Thanks for connecting with Synctrack!"
+        # Validate that at least one contact method is provided
+        if not self.lead.has_contact:
+            return self.config.message("crm_needs_contact")
+
+        await self._queue_lead(summary)
+        return self.config.message("crm_sent", company=self.lead_data["company"], intent=self.lead_data["intent"])
+
+    async def _queue_lead(self, summary: str | None = None) -> None:
+        """Hand the lead to the CRM outbox, unless this worker already sent the same lead."""
+        payload = self.lead.crm_payload(summary)
+        lead = dict(self.lead_data)
+        self.lead.mark_sent()  # Before the lookup yields, so a concurrent send_to_crm sees it
+        # SQLite may wait on another process's write, so keep it off the audio loop
+        match = await asyncio.to_thread(self.lead_index.lookup, lead)
+
+        if match and not match.new_fields:
+            logger.info("♻️ %s from %s was already sent to CRM, skipping", lead["name"], lead["company"])
+            return
+
+        if match:
+            # Same person again with new details - let the CRM merge instead of creating a lead
+            logger.info("♻️ Repeat lead with new details (%s), sending as update", ', '.join(match.new_fields))
+            payload["duplicate_of"] = match.idempotency_key
+
+        # Delivered in the background by the outbox - n8n's response time doesn't hold up the reply.
+        # Only recorded for dedup once n8n accepts it, so a rejected lead doesn't block the next call
+        original_key = match.idempotency_key if match else None
+        await self.crm_outbox.enqueue(
+            payload, on_delivered=lambda key: self.lead_index.record(lead, original_key or key)
+        )
 
     @function_tool
-    async def get_synctrack_services(self, context: RunContext) -> str:
-        """Get detailed information about Synctrack's services and offerings."""
-        return """Synctrack's Core Services:
-
-1. **AI Lead Generation Systems**
-   - Automated lead capture and qualification
-   - Multi-channel lead generation (web, voice, chat)
-   - Smart lead scoring and routing
-
-2. **Workflow Automation**
-   - Custom business process automation
-   - Integration with existing tools (CRMs, email, databases)
-   - Data synchronization and reporting
-
-3. **Voice AI Agents**
-   - 24/7 conversational AI assistants
-   - Lead qualification via voice
-   - Customer support automation
-
-4. **Modern Website Development**
-   - High-converting business websites
-   - AI-powered features and chatbots
-   - Mobile-responsive design
+    async def lookup_services(self, context: RunContext, query: str) -> str:
+        """Look up Synctrack's services and answers to common questions.
 
-5. **CRM & Reporting Automation**
-   - Automated CRM updates and management
-   - Real-time dashboards and analytics
-   - Custom reporting systems
+        Args:
+            query: What the visitor asked about, in their words (e.g. "voice agent for phone calls", "works with HubSpot?")
+        """
+        entries = self.service_catalog.search(query, top_k=SERVICE_LOOKUP_TOP_K)
+        if not entries:
+            # Nothing specific matched - give the overview to steer from
+            titles = ", ".join(entry.title for entry in self.service_catalog.services())
+            return self.config.message("no_service_match", services=titles)
 
-All solutions are designed to save time, reduce manual work, and drive measurable business growth."""
+        logger.info("Service lookup '%s': %s", query, ', '.join(entry.id for entry in entries))
+        return "\n".join(entry.snippet for entry in entries)
 
     @function_tool
     async def get_current_time(self, context: RunContext) -> str:
@@ -369,10 +711,18 @@ All solutions are designed to save time, reduce manual work, and drive measurabl
         """Called when Sylvia becomes active in the conversation."""
         logger.info("Sylvia session started")
 
+        if self.speculation is not None:
+            self.speculation.attach(self.session)
+
+        # Play the cached greeting straight into the session (still added to chat history)
+        if self.greeting_audio is not None:
+            await self.session.say(self.config.greeting, audio=self.greeting_audio.stream())
+            return
+
         # Generate warm initial greeting
         await self.session.generate_reply(
-            instructions="""Give a friendly, natural greeting exactly like this:
-            "Hey there! I'm Sylvia from Synctrack — how's your day going so far?"
+            instructions=f"""Give a friendly, natural greeting exactly like this:
+            "{self.config.greeting}"
 
             Keep it warm and conversational."""
         )
@@ -381,127 +731,131 @@ All solutions are designed to save time, reduce manual work, and drive measurabl
         """Called when the session ends - automatically sends lead to CRM if minimum data collected."""
         logger.info("🔚 Sylvia session ended")
 
-        # Check if we have all required fields
+        if self.speculation is not None:
+            logger.info("Speculation stats: %s", self.speculation.stats.as_dict())
+        if self.answer_cache is not None:
+            logger.info("Answer cache stats: %s", self.answer_cache.stats())
+
         # MINIMUM REQUIRED: name, company, intent (contact info is optional but preferred)
-        has_name = bool(self.lead_data.get("name"))
-        has_company = bool(self.lead_data.get("company"))
-        has_intent = bool(self.lead_data.get("intent"))
-        has_email = bool(self.lead_data.get("email"))
-        has_phone = bool(self.lead_data.get("phone"))
-        has_contact_method = has_email or has_phone
-
-        # Check if email was provided and needs verification
-        email_ok = True
-        if has_email and not self.lead_data.get("email_verified"):
-            logger.warning(f"⚠️ Email was provided but not verified: {self.lead_data.get('email')}")
-            email_ok = False
-
-        # Send to CRM if we have minimum data (name + company + intent)
-        # Email is preferred but not strictly required to capture the lead
-        if has_name and has_company and has_intent:
-            # Only proceed if email verification passed (if email was provided)
-            if has_email and not email_ok:
-                logger.warning(f"⚠️ Email was provided but not verified: {self.lead_data.get('email')}")
-                logger.warning(f"⚠️ Not sending to CRM due to unverified email")
-                return
-
-            # Check if already sent to prevent duplicates
-            if self.lead_data.get("sent_to_crm"):
-                logger.info(f"✅ Lead already sent to CRM during conversation, skipping duplicate send")
-                return
-
-            logger.info(f"📤 Sending lead to CRM on exit: {self.lead_data['name']} - {self.lead_data['company']}")
-
-            try:
-                # Prepare summary with note if no contact info
-                summary_text = " | ".join(self.lead_data.get("conversation_summary", [])) if self.lead_data.get("conversation_summary") else ""
-
-                if not has_contact_method:
-                    # Add note that lead didn't provide contact info
-                    note = "Lead declined to provide contact info. Directed to reach out via info@synctrack.de"
-                    summary_text = f"{note} | {summary_text}" if summary_text else note
-                elif not has_email and has_phone:
-                    # Note: Got phone but not email
-                    note = "Lead provided phone only (no email)"
-                    summary_text = f"{note} | {summary_text}" if summary_text else note
-
-                # Prepare CRM payload
-                payload = {
-                    "source": "voice",
-                    "name": self.lead_data.get("name"),
-                    "email": self.lead_data.get("email") if has_email else "Not provided - will contact via info@synctrack.de",
-                    "phone": self.lead_data.get("phone") if has_phone else "Not provided",
-                    "company": self.lead_data.get("company"),
-                    "intent": self.lead_data.get("intent"),
-                    "summary": summary_text if summary_text else "Lead captured via voice agent",
-                    "timestamp": datetime.utcnow().isoformat() + "Z"
-                }
-
-                logger.info(f"📤 Sending to CRM webhook: {CRM_WEBHOOK_URL}")
-                logger.info(f"📋 Payload: {payload}")
-
-                # Send to n8n webhook
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        CRM_WEBHOOK_URL,
-                        json=payload,
-                        headers={"Content-Type": "application/json"},
-                        timeout=10.0
-                    )
-
-                    if response.status_code in [200, 201, 202]:
-                        logger.info(f"✅ Lead successfully sent to CRM: {self.lead_data['name']} from {self.lead_data['company']}")
-                        logger.info(f"✅ CRM Response: {response.status_code}")
-                    else:
-                        logger.error(f"❌ CRM webhook failed: {response.status_code} - {response.text}")
-
-            except Exception as e:
-                logger.error(f"❌ Error sending lead to CRM on exit: {str(e)}")
-        else:
+        stage = self.lead.stage
+        missing = self.lead.missing_fields()
+
+        if missing:
             # Log which required fields are missing
-            missing = []
-            if not has_name:
-                missing.append("name")
-            if not has_company:
-                missing.append("company")
-            if not has_intent:
-                missing.append("intent")
             logger.warning(f"⚠️ Session ended without minimum lead info. Missing: {', '.join(missing)}")
+        elif stage == LeadStage.EMAIL_PENDING_VERIFICATION:
+            # Only proceed if email verification passed (if email was provided)
+            logger.warning("⚠️ Email was provided but not verified: %s", self.lead_data.get("email"))
+            logger.warning("⚠️ Not sending to CRM due to unverified email")
+        elif stage == LeadStage.SENT:
+            logger.info("✅ Lead already sent to CRM during conversation, skipping duplicate send")
+        else:
+            logger.info("📤 Sending lead to CRM on exit: %s - %s", self.lead_data["name"], self.lead_data["company"])
+            await self._queue_lead()
 
 
 async def entrypoint(ctx: agents.JobContext):
     """Main entry point for Sylvia's agent worker."""
 
+    # Log output goes through a background thread from here on, tagged with the room
+    structured_logging.start(room=ctx.room.name, job_id=ctx.job.id)
+
     logger.info(f"Sylvia started in room: {ctx.room.name}")
 
-    # Configure the voice pipeline with OpenAI Realtime-optimized settings
+    # Everything below was built once per process in prewarm(), updated for config changes since
+    userdata = ctx.proc.userdata
+    config = await _apply_config(userdata)
+    logger.info("Agent config %s", config.version)
+
+    # Hold this call's LLM/TTS, so a config change during the call doesn't close them under it
+    session_models = (userdata["llm"], userdata["tts"])
+    for model in session_models:
+        userdata["providers_in_use"][id(model)] = userdata["providers_in_use"].get(id(model), 0) + 1
+    await _close_retired_providers(userdata)
+
+    crm_client = userdata["crm_client"]
+    crm_outbox = userdata["crm_outbox"]
+
+    # Start delivering queued leads (including any a previous process left behind)
+    crm_outbox.start()
+
+    # CPU and event-loop lag of this call, read by the main process's load_fnc
+    load_reporter = JobLoadReporter(LOAD_STATS_DIR)
+    load_reporter.start()
+    ctx.add_shutdown_callback(load_reporter.aclose)
+
+    if PREWARM_CONNECTIONS:
+        # Start the provider/CRM handshakes while we join the room
+        userdata["llm"].prewarm()
+        userdata["tts"].prewarm()
+        userdata["crm_warm_task"] = asyncio.create_task(_warm_crm_connection(crm_client, config.crm_webhook_url))
+
+    # Configure the voice pipeline with the prewarmed components.
+    # The turn detector runs in the worker's shared inference process, which loads the
+    # model once at startup - it needs the job's inference executor, so it can't be built in prewarm().
     session = AgentSession(
-        # Speech-to-Text - Deepgram for high accuracy
-        stt=deepgram.STT(
-            model="nova-2",
-            language="en-US",
-        ),
-
-        # Large Language Model - GPT-4 for natural conversations
-        llm=openai.LLM(
-            model=os.getenv("LLM_CHOICE", "gpt-4o-mini"),
-            temperature=0.8,  # Higher temp for more natural, conversational responses
-        ),
-
-        # Text-to-Speech - OpenAI (temporary while ElevenLabs credits refill)
-        tts=openai.TTS(
-            voice="nova",  # Friendly female voice - switch back to elevenlabs.TTS when credits refill
-        ),
+        stt=userdata["stt"],
+        llm=userdata["llm"],
+        tts=userdata["tts"],
+        vad=userdata["vad"],
+        turn_detection=provider_registry.build("turn_detector", "english") if TURN_DETECTOR else NOT_GIVEN,
+        min_endpointing_delay=MIN_ENDPOINTING_DELAY,
+        max_endpointing_delay=MAX_ENDPOINTING_DELAY,
+    )
+    EndpointingController(
+        session,
+        normal=EndpointingDelays(MIN_ENDPOINTING_DELAY, MAX_ENDPOINTING_DELAY),
+        dictation=EndpointingDelays(DICTATION_MIN_ENDPOINTING_DELAY, DICTATION_MAX_ENDPOINTING_DELAY),
+    )
 
-        # Voice Activity Detection
-        vad=silero.VAD.load(),
+    agent = Sylvia(
+        config=config,
+        crm_outbox=crm_outbox,
+        lead_index=userdata["lead_index"],
+        answer_cache=userdata["answer_cache"],
+        greeting_audio=userdata["greeting_audio"],
+        speculative=SPECULATIVE_LLM,
     )
 
+    # Attached before the session starts, so the greeting is archived too
+    recorder = None
+    archive = userdata["session_archive"]
+    if archive is not None:
+        archive.start()
+        recorder = SessionRecorder(archive, ctx.room.name, session, agent.lead)
+        recorder.start(job_id=ctx.job.id, config=config.version)
+
+    async def close_session():
+        # Shutdown callbacks run concurrently, so everything that has to wait for the call
+        # to end runs here, in order
+        try:
+            await session.aclose()  # on_exit queues the lead, the recorder gets the last items
+            await crm_outbox.aclose(timeout=CRM_FLUSH_TIMEOUT)
+            if archive is not None:
+                await archive.aclose()
+
+            for model in session_models:
+                userdata["providers_in_use"][id(model)] -= 1
+            await _close_retired_providers(userdata)
+
+            if isinstance(session_models[1], audio_cache.CachedTTS):
+                logger.info("TTS cache stats: %s", session_models[1].stats())
+            for router in userdata["provider_routers"]:
+                logger.info("%s provider stats: %s", router.stage.upper(), router.stats())
+        finally:
+            # Nothing observes metrics past this point; job processes are single use,
+            # so their per-process metric files are merged and removed here
+            latency_metrics.mark_process_dead()
+            # Last: the steps above log lead details, which have to go through redaction
+            structured_logging.stop()
+
+    ctx.add_shutdown_callback(close_session)
+
     # Start Sylvia's session
-    await session.start(
-        room=ctx.room,
-        agent=Sylvia()
-    )
+    await session.start(room=ctx.room, agent=agent)
+
+    # Per-turn stage timings and tool spans, exported with the worker's metrics
+    latency_metrics.TurnLatencyTracker(session, on_turn=recorder.record_turn if recorder else None)
 
     # Event handlers for monitoring
     @session.on("agent_state_changed")
@@ -509,6 +863,15 @@ async def entrypoint(ctx: agents.JobContext):
         """Log Sylvia's state changes."""
         logger.info(f"Sylvia state: {ev.old_state} -> {ev.new_state}")
 
+    @session.on("metrics_collected")
+    def on_metrics_collected(ev):
+        """Log per-turn LLM token usage."""
+        if isinstance(ev.metrics, metrics.LLMMetrics):
+            logger.info(
+                "LLM tokens: prompt=%s (cached=%s) completion=%s",
+                ev.metrics.prompt_tokens, ev.metrics.prompt_cached_tokens, ev.metrics.completion_tokens,
+            )
+
     @session.on("user_started_speaking")
     def on_user_speaking():
         """Track when user starts speaking."""
@@ -520,9 +883,45 @@ async def entrypoint(ctx: agents.JobContext):
         logger.debug("User stopped speaking")
 
 
+def preload_plugins() -> list[str]:
+    """Import the configured providers' plugins in the worker's main process; returns their modules.
+
+    Plugins have to be registered on the main thread before the worker starts: LiveKit
+    preloads the registered ones into the forkserver that job processes are forked from,
+    `download-files` fetches their model files, and the turn detector runs its model
+    here. Providers the config doesn't use are never imported.
+    """
+    config = load_config(AGENT_CONFIG_PATH, CONFIG_DEFAULTS)
+    modules = provider_registry.preload("vad", "silero")
+    modules += provider_registry.preload("stt", STT_PROVIDER)
+    modules += provider_registry.preload("llm", config.llm_providers)
+    modules += provider_registry.preload("tts", config.tts_providers)
+    if TURN_DETECTOR:
+        modules += provider_registry.preload("turn_detector", "english")
+    return list(dict.fromkeys(modules))
+
+
 if __name__ == "__main__":
+    preload_plugins()
+
+    if METRICS_PORT:
+        # Before the worker spawns job processes, so they report into the same endpoint
+        latency_metrics.start_metrics_server(METRICS_PORT)
+
+    # Only `start` runs the worker in production mode; dev/console keep LiveKit's dev default of no idle processes
+    max_idle_processes = MAX_IDLE_PROCESSES if sys.argv[1:2] == ["start"] else 0
+
     # Run Sylvia using LiveKit CLI
     cli.run_app(WorkerOptions(
         entrypoint_fnc=entrypoint,
-        prewarm_fnc=prewarm
+        prewarm_fnc=prewarm,
+        load_fnc=WorkerLoad(
+            LOAD_STATS_DIR,
+            load_threshold=LOAD_THRESHOLD,
+            lag_budget=LOOP_LAG_BUDGET_MS / 1000,
+            min_idle_processes=MIN_IDLE_PROCESSES,
+            max_idle_processes=max_idle_processes,
+        ),
+        load_threshold=LOAD_THRESHOLD,
+        **({"num_idle_processes": max_idle_processes} if max_idle_processes else {}),  # Upper bound; WorkerLoad picks the current target
     ))
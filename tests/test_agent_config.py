@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from agent_config import ConfigStore, load_config
+
+DEFAULTS = {
+    "crm_webhook_url": "https://crm.example.com/webhook",
+    "service_catalog_path": "service_catalog.json",
+    "llm_providers": "openai",
+    "tts_providers": "elevenlabs,openai",
+    "llm_hedge_after": 1.5,
+    "tts_hedge_after": 1.0,
+}
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    with open("agent_config.json", encoding="utf-8") as f:
+        data = json.load(f)
+    data["instructions_path"] = "instructions.md"
+    (tmp_path / "instructions.md").write_text("You are Sylvia. Start with: {greeting}")
+    shutil.copy("service_catalog.json", tmp_path / "service_catalog.json")
+    path = tmp_path / "agent_config.json"
+    _write(path, data)
+    return path
+
+
+def _write(path, data) -> None:
+    path.write_text(json.dumps(data))
+    # Make sure the change is visible even on filesystems with coarse timestamps
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def _edit(path, **changes) -> None:
+    data = json.loads(path.read_text())
+    data.update(changes)
+    _write(path, data)
+
+
+def test_loads_the_shipped_config(config_path):
+    config = load_config(str(config_path), DEFAULTS)
+    assert config.instructions == f"You are Sylvia. Start with: {config.greeting}"
+    assert config.crm_webhook_url.startswith("https://")
+    assert config.greeting in config.fixed_phrases
+    assert config.messages["crm_sent"] not in config.fixed_phrases  # Has placeholders
+    assert config.message("crm_missing_fields", missing="email") == "Not ready to send yet. Still missing: email."
+
+
+def test_file_overrides_defaults(config_path):
+    _edit(config_path, llm_providers="openai:gpt-4o", llm_hedge_after=2)
+    config = load_config(str(config_path), DEFAULTS)
+    assert config.llm_providers == "openai:gpt-4o"
+    assert config.llm_hedge_after == 2.0
+    assert config.tts_providers == DEFAULTS["tts_providers"]
+
+
+@pytest.mark.parametrize(
+    "changes, error",
+    [
+        ({"greeting": " "}, "greeting"),
+        ({"crm_webhook_url": "ftp://crm.example.com"}, "crm_webhook_url"),
+        ({"llm_providers": "openai,nosuchllm"}, "nosuchllm"),
+        ({"tts_hedge_after": 0}, "tts_hedge_after"),
+        ({"tts_hedge_after": True}, "tts_hedge_after"),
+        ({"colour": "blue"}, "unknown keys"),
+    ],
+)
+def test_invalid_settings(config_path, changes, error):
+    _edit(config_path, **changes)
+    with pytest.raises(ValueError, match=error):
+        load_config(str(config_path), DEFAULTS)
+
+
+@pytest.mark.parametrize(
+    "messages, error",
+    [
+        ({"email_confirmed": None}, "missing"),
+        ({"crm_sent": "Thanks {name}!"}, "unknown placeholders"),
+        ({"email_confirmed": ""}, "non-empty"),
+        ({"farewell": "Bye!"}, "unknown"),
+    ],
+)
+def test_invalid_messages(config_path, messages, error):
+    data = json.loads(config_path.read_text())
+    data["messages"].update(messages)
+    data["messages"] = {key: text for key, text in data["messages"].items() if text is not None}
+    _write(config_path, data)
+    with pytest.raises(ValueError, match=error):
+        load_config(str(config_path), DEFAULTS)
+
+
+def test_store_reloads_changed_files(config_path):
+    store = ConfigStore(str(config_path), DEFAULTS)
+    first = store.current()
+    assert store.current() is first
+
+    _edit(config_path, greeting="Hi, Sylvia here!")
+    second = store.current()
+    assert second.greeting == "Hi, Sylvia here!"
+    assert second.version != first.version
+    assert store.reloads == 1
+    assert first.greeting != second.greeting  # Running calls keep their snapshot
+
+
+def test_store_reloads_when_instructions_change(config_path):
+    store = ConfigStore(str(config_path), DEFAULTS)
+    instructions = config_path.parent / "instructions.md"
+    instructions.write_text("You are Sylvia, be brief. Start with: {greeting}")
+    stat = os.stat(instructions)
+    os.utime(instructions, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert store.current().instructions.startswith("You are Sylvia, be brief.")
+
+
+def test_store_keeps_last_valid_config(config_path):
+    store = ConfigStore(str(config_path), DEFAULTS)
+    first = store.current()
+    valid = config_path.read_text()
+
+    config_path.write_text("{not json")
+    assert store.current() is first
+
+    config_path.write_text(valid)
+    _edit(config_path, greeting="Hello again!")
+    assert store.current().greeting == "Hello again!"
+
+
+def test_store_refuses_to_start_with_an_invalid_file(config_path):
+    _edit(config_path, greeting="")
+    with pytest.raises(ValueError):
+        ConfigStore(str(config_path), DEFAULTS)
@@ -0,0 +1,56 @@
+import pytest
+
+from answer_cache import AnswerCache, normalize_question
+
+CURATED = {
+    "what do you do": "We build AI automations.",
+    "what is your email": "You can reach us at info@synctrack.de.",
+    "how can i contact you": "Email info@synctrack.de.",
+    "how much does it cost": "It depends on the project.",
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnswerCache(str(tmp_path / "answers.sqlite3"), ttl=3600, curated=CURATED)
+
+
+@pytest.mark.parametrize(
+    "text, known",
+    [
+        ("So what do you guys do?", "what do you do"),
+        ("What is your email?", "what is your email"),
+        ("How can I contact you?", "how can i contact you"),
+    ],
+)
+def test_hit(cache, text, known):
+    cached = cache.lookup(text)
+    assert cached is not None and cached.question == known
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "what is my email?",
+        "what did you do?",
+        "what do you know?",
+        "how much does it cost to host?",
+        "how can we contact you?",
+    ],
+)
+def test_near_miss(cache, text):
+    assert cache.lookup(text) is None
+
+
+def test_learned_answer(cache):
+    assert cache.store("How much does a chatbot cost?", "It depends on the integrations.")
+    assert cache.lookup("how much does a chatbot cost").source == "learned"
+
+
+@pytest.mark.parametrize("text", ["Can you repeat that?", "What was my email again?", "what do you mean?"])
+def test_conversation_bound_questions_are_not_learned(cache, text):
+    assert not cache.store(text, "Sure.")
+
+
+def test_normalize_question():
+    assert normalize_question("Um, so what do you do?") == "what do you do"
@@ -0,0 +1,139 @@
+from livekit.agents import APIStatusError, tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+from audio_cache import CachedTTS, cache_key
+from provider_router import ProviderRouter, RoutedTTS
+
+SAMPLE_RATE = 24000
+PHRASE = "Thanks for calling Sylvia's agency!"
+
+
+class StubTTS(tts.TTS):
+    """Returns 100ms of audio per request, or raises `error` instead; streams if `streaming`."""
+
+    def __init__(self, model: str, error: Exception | None = None, streaming: bool = False):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=streaming), sample_rate=SAMPLE_RATE, num_channels=1
+        )
+        self._model = model
+        self.error = error
+        self.synthesized: list[str] = []
+        self.streamed: list[str] = []
+
+    @property
+    def model(self) -> str:
+        return self._model
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        self.synthesized.append(text)
+        return _StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    def stream(self, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        return _StubSynthesizeStream(tts=self, conn_options=conn_options)
+
+
+def _audio() -> bytes:
+    return b"\x10\x00" * (SAMPLE_RATE // 10)
+
+
+class _StubChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        if self._tts.error:
+            raise self._tts.error
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=SAMPLE_RATE, num_channels=1, mime_type="audio/pcm"
+        )
+        output_emitter.push(_audio())
+        output_emitter.flush()
+
+
+class _StubSynthesizeStream(tts.SynthesizeStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=SAMPLE_RATE, num_channels=1, mime_type="audio/pcm", stream=True
+        )
+        output_emitter.start_segment(segment_id=utils.shortuuid())
+        text = ""
+        async for data in self._input_ch:
+            if isinstance(data, self._FlushSentinel):
+                break
+            text += data
+        self._tts.streamed.append(text)
+        output_emitter.push(_audio())
+        output_emitter.end_segment()
+
+
+async def _synthesize(cached: CachedTTS, text: str) -> int:
+    async with cached.synthesize(text) as stream:
+        return sum([len(ev.frame.data) async for ev in stream])
+
+
+async def _stream(cached: CachedTTS, tokens: list[str]) -> int:
+    stream = cached.stream()
+    for token in tokens:
+        stream.push_text(token)
+    stream.end_input()
+    async with stream:
+        return sum([len(ev.frame.data) async for ev in stream])
+
+
+async def test_fixed_phrase_is_synthesized_once():
+    provider = StubTTS("a")
+    cached = CachedTTS(provider, phrases=[PHRASE])
+    assert await _synthesize(cached, PHRASE) > 0
+    assert await _synthesize(cached, PHRASE) > 0
+    assert provider.synthesized == [PHRASE]
+    assert (cached.hits, cached.misses) == (1, 1)
+
+
+async def test_other_text_is_never_cached():
+    provider = StubTTS("a")
+    cached = CachedTTS(provider, phrases=[PHRASE])
+    await _synthesize(cached, "Your email is jane@example.com")
+    await _synthesize(cached, "Your email is jane@example.com")
+    assert len(provider.synthesized) == 2
+    assert cached.stats()["entries"] == 0
+
+
+async def test_streams_through_a_streaming_provider():
+    provider = StubTTS("a", streaming=True)
+    cached = CachedTTS(provider, phrases=[PHRASE])
+    assert cached.capabilities.streaming
+
+    assert await _stream(cached, ["Sure", ", we build ", "chatbots."]) > 0
+    assert provider.streamed == ["Sure, we build chatbots."]
+    assert provider.synthesized == []
+    assert cached.bypassed == 1
+
+
+async def test_stream_serves_fixed_phrase_from_cache():
+    provider = StubTTS("a", streaming=True)
+    cached = CachedTTS(provider, phrases=[PHRASE])
+    tokens = ["Thanks for ", "calling Sylvia's ", "agency!"]
+    await _stream(cached, tokens)
+    await _stream(cached, tokens)
+    assert provider.synthesized == [PHRASE]
+    assert provider.streamed == []
+    assert (cached.hits, cached.misses) == (1, 1)
+
+
+async def test_fallback_audio_is_keyed_on_the_fallback():
+    primary = StubTTS("a", error=APIStatusError("down", status_code=500, retryable=False))
+    fallback = StubTTS("b")
+    cached = CachedTTS(RoutedTTS(ProviderRouter("tts", {"a": primary, "b": fallback}, hedge_after=1.0)), phrases=[PHRASE])
+
+    await _synthesize(cached, PHRASE)
+    assert cache_key(fallback, PHRASE) in cached._entries
+    # The primary is still preferred, so its voice isn't replaced by the fallback's audio
+    assert await cached.get(PHRASE) is None
+
+
+async def test_disk_tier_is_shared(tmp_path):
+    writer = CachedTTS(StubTTS("a"), phrases=[PHRASE], cache_dir=str(tmp_path))
+    await _synthesize(writer, PHRASE)
+
+    provider = StubTTS("a")
+    cached = CachedTTS(provider, phrases=[PHRASE], cache_dir=str(tmp_path))
+    audio = await cached.get(PHRASE)
+    assert audio is not None and bytes(audio.pcm) == bytes((await writer.get(PHRASE)).pcm)
+    assert provider.synthesized == []
@@ -0,0 +1,93 @@
+from livekit.agents import llm, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS
+
+from conversation_compaction import ConversationCompactor
+
+
+class StubLLM(llm.LLM):
+    """Replies with `text`, or raises `error` instead; records the requests it got."""
+
+    def __init__(self, text: str = "Jane from Acme wants a support chatbot.", error: Exception | None = None):
+        super().__init__()
+        self.text = text
+        self.error = error
+        self.requests: list[llm.ChatContext] = []
+
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        self.requests.append(chat_ctx)
+        return _StubLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+
+class _StubLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        if self._llm.error:
+            raise self._llm.error
+        self._event_ch.send_nowait(
+            llm.ChatChunk(id=utils.shortuuid(), delta=llm.ChoiceDelta(role="assistant", content=self._llm.text))
+        )
+
+
+def _conversation(turns: int) -> llm.ChatContext:
+    chat_ctx = llm.ChatContext.empty()
+    chat_ctx.add_message(role="system", content="You are Sylvia.")
+    for i in range(turns):
+        chat_ctx.add_message(role="user", content=f"Question {i} " + "about automation " * 10)
+        chat_ctx.add_message(role="assistant", content=f"Answer {i} " + "with some detail " * 10)
+    return chat_ctx
+
+
+def _texts(chat_ctx: llm.ChatContext) -> list[str]:
+    return [item.text_content for item in chat_ctx.items if item.type == "message"]
+
+
+async def test_under_budget_is_unchanged():
+    compactor = ConversationCompactor(token_budget=10_000, keep_turns=2)
+    summarizer = StubLLM()
+    chat_ctx = _conversation(5)
+
+    assert _texts(compactor.compact(chat_ctx, summarizer)) == _texts(chat_ctx)
+    assert compactor._summarize_task is None
+
+
+async def test_older_turns_are_replaced_by_the_summary():
+    summaries = []
+    compactor = ConversationCompactor(token_budget=100, keep_turns=2, on_summary=summaries.append)
+    summarizer = StubLLM()
+    chat_ctx = _conversation(5)
+
+    # Sent verbatim until the summary is ready
+    assert _texts(compactor.compact(chat_ctx, summarizer)) == _texts(chat_ctx)
+    await compactor._summarize_task
+    assert summaries == ["Jane from Acme wants a support chatbot."]
+
+    texts = _texts(compactor.compact(chat_ctx, summarizer))
+    assert texts[0] == "You are Sylvia."
+    assert texts[1] == "Summary of the conversation so far:\nJane from Acme wants a support chatbot."
+    assert texts[2:] == _texts(chat_ctx)[-4:]
+
+
+async def test_tool_calls_stay_with_their_turn():
+    compactor = ConversationCompactor(token_budget=0, keep_turns=1)
+    chat_ctx = _conversation(2)
+    chat_ctx.add_message(role="user", content="Which services do you offer?")
+    chat_ctx.items.append(llm.FunctionCall(call_id="1", name="lookup_services", arguments="{}"))
+    chat_ctx.items.append(llm.FunctionCallOutput(call_id="1", name="lookup_services", output="Chatbots", is_error=False))
+
+    compactor.compact(chat_ctx, StubLLM())
+    await compactor._summarize_task
+
+    items = compactor.compact(chat_ctx, StubLLM()).items
+    assert [item.type for item in items[2:]] == ["message", "function_call", "function_call_output"]
+    assert items[2].text_content == "Which services do you offer?"
+
+
+async def test_failed_summary_keeps_history():
+    compactor = ConversationCompactor(token_budget=100, keep_turns=2)
+    summarizer = StubLLM(error=RuntimeError("provider down"))
+    chat_ctx = _conversation(5)
+
+    compactor.compact(chat_ctx, summarizer)
+    await compactor._summarize_task
+
+    assert compactor.summary == ""
+    assert _texts(compactor.compact(chat_ctx, summarizer)) == _texts(chat_ctx)
@@ -0,0 +1,132 @@
+import json
+
+import httpx
+
+from crm_outbox import CrmOutbox
+
+URL = "https://crm.example/webhook"
+
+
+def _lead(name: str) -> dict:
+    return {"name": name, "company": "Acme GmbH", "email": f"{name.lower()}@acme.de"}
+
+
+def _outbox(tmp_path, handler, **kwargs) -> CrmOutbox:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return CrmOutbox(client, URL, str(tmp_path), base_backoff=0.01, max_backoff=0.02, **kwargs)
+
+
+def _dead_letters(tmp_path) -> list[dict]:
+    path = tmp_path / "dead-letter.jsonl"
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+async def test_delivers_and_calls_back(tmp_path):
+    received = []
+
+    def handler(request):
+        received.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    outbox = _outbox(tmp_path, handler)
+    outbox.start()
+    delivered = []
+    key = await outbox.enqueue(_lead("Sarah"), on_delivered=delivered.append)
+    await outbox.aclose(timeout=2.0)
+
+    assert [lead["idempotency_key"] for lead in received] == [key]
+    assert delivered == [key]
+    assert outbox.pending == 0
+
+
+async def test_retries_until_accepted(tmp_path):
+    statuses = iter([503, 429, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses))
+
+    outbox = _outbox(tmp_path, handler)
+    outbox.start()
+    await outbox.enqueue(_lead("Sarah"))
+    await outbox.aclose(timeout=2.0)
+
+    assert outbox.pending == 0
+    assert _dead_letters(tmp_path) == []
+
+
+async def test_rejected_lead_is_dead_lettered_without_callback(tmp_path):
+    outbox = _outbox(tmp_path, lambda request: httpx.Response(400, text="bad lead"))
+    outbox.start()
+    delivered = []
+    key = await outbox.enqueue(_lead("Sarah"), on_delivered=delivered.append)
+    await outbox.aclose(timeout=2.0)
+
+    assert [record["key"] for record in _dead_letters(tmp_path)] == [key]
+    assert delivered == []
+    assert outbox.pending == 0
+
+
+async def test_unexpected_error_dead_letters_and_keeps_delivering(tmp_path):
+    def handler(request):
+        if json.loads(request.content)["name"] == "Broken":
+            raise RuntimeError("unexpected")
+        return httpx.Response(200)
+
+    outbox = _outbox(tmp_path, handler)
+    outbox.start()
+    broken = await outbox.enqueue(_lead("Broken"))
+    delivered = []
+    await outbox.enqueue(_lead("Sarah"), on_delivered=delivered.append)
+    await outbox.aclose(timeout=2.0)
+
+    assert [record["key"] for record in _dead_letters(tmp_path)] == [broken]
+    assert len(delivered) == 1
+    assert outbox.pending == 0
+
+
+async def test_claims_orphaned_file(tmp_path):
+    orphan = tmp_path / "outbox-dead.jsonl"
+    records = [
+        {"op": "enqueue", "key": "a", "payload": {**_lead("Sarah"), "idempotency_key": "a"}},
+        {"op": "enqueue", "key": "b", "payload": {**_lead("Tom"), "idempotency_key": "b"}},
+        {"op": "delivered", "keys": ["a"]},
+        {"op": "enqueue"},  # Malformed
+    ]
+    orphan.write_text("\n".join(json.dumps(record) for record in records) + '\n{"op": "enq')
+
+    received = []
+
+    def handler(request):
+        received.append(json.loads(request.content)["idempotency_key"])
+        return httpx.Response(200)
+
+    outbox = _outbox(tmp_path, handler)
+    outbox.start()
+    await outbox.aclose(timeout=2.0)
+
+    assert received == ["b"]
+    assert not orphan.exists()
+
+
+async def test_undelivered_lead_stays_on_disk_for_replay(tmp_path):
+    outbox = _outbox(tmp_path, lambda request: httpx.Response(503))
+    outbox.start()
+    await outbox.enqueue(_lead("Sarah"))
+    await outbox.aclose(timeout=0.05)
+    assert outbox.pending == 1
+
+    # The owner "exits": its lock is released and another outbox picks the lead up
+    outbox._file.close()
+    received = []
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(200)
+
+    replay = _outbox(tmp_path, handler)
+    replay.start()
+    await replay.aclose(timeout=2.0)
+    assert len(received) == 1
+    assert replay.pending == 0
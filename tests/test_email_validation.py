@@ -0,0 +1,45 @@
+import pytest
+
+from email_validation import check_email, normalize_email, suggest_domain
+
+
+@pytest.mark.parametrize(
+    "domain, suggestion",
+    [
+        ("gmial.com", "gmail.com"),
+        ("hotmial.com", "hotmail.com"),
+        ("gmail.con", "gmail.com"),
+        ("gmial.con", "gmail.com"),
+        ("wbe.de", "web.de"),
+    ],
+)
+def test_suggests_provider_for_typo(domain, suggestion):
+    assert suggest_domain(domain) == suggestion
+
+
+@pytest.mark.parametrize(
+    "domain",
+    ["five.com", "hive.com", "line.com", "mall.com", "wed.de", "gmc.de", "acme.ed", "acme.com", "gmail.com"],
+)
+def test_leaves_real_domains_alone(domain):
+    assert suggest_domain(domain) is None
+
+
+def test_stores_what_was_heard_and_only_suggests():
+    check = check_email("john dot smith at gmial dot com")
+    assert check.email == "john.smith@gmial.com"
+    assert check.suggestion == "john.smith@gmail.com"
+
+
+def test_no_suggestion_for_a_domain_the_visitor_stood_by():
+    check = check_email("jane@gmial.com", known_domains={"gmial.com"})
+    assert check.email == "jane@gmial.com"
+    assert check.suggestion is None
+
+
+def test_invalid_email():
+    assert not check_email("jane at").valid
+
+
+def test_normalize_spoken_email():
+    assert normalize_email("John Dot Smith at acme dot com") == "john.smith@acme.com"
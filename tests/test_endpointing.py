@@ -0,0 +1,79 @@
+from types import SimpleNamespace
+
+import pytest
+
+from livekit.agents import llm
+
+from endpointing import ASKS_FOR_CONTACT_RE, EndpointingController, EndpointingDelays
+
+NORMAL = EndpointingDelays(min_delay=0.3, max_delay=3.0)
+DICTATION = EndpointingDelays(min_delay=1.5, max_delay=6.0)
+
+
+class FakeSession:
+    def __init__(self):
+        self.handlers = {}
+        self.options: list[dict] = []
+
+    def on(self, event, callback):
+        self.handlers[event] = callback
+
+    def update_options(self, **options):
+        self.options.append(options)
+
+    def transcribed(self, transcript: str) -> None:
+        self.handlers["user_input_transcribed"](SimpleNamespace(transcript=transcript))
+
+    def said(self, role: str, text: str) -> None:
+        self.handlers["conversation_item_added"](SimpleNamespace(item=llm.ChatMessage(role=role, content=[text])))
+
+
+@pytest.fixture
+def session():
+    session = FakeSession()
+    EndpointingController(session, NORMAL, DICTATION)
+    return session
+
+
+def _delays(options: dict) -> EndpointingDelays:
+    return EndpointingDelays(options["min_endpointing_delay"], options["max_endpointing_delay"])
+
+
+def test_dictation_switches_to_strict_delays_until_the_turn_ends(session):
+    session.transcribed("sure, it's john")
+    assert session.options == []
+
+    session.transcribed("sure, it's john dot smith at")
+    session.transcribed("sure, it's john dot smith at acme dot com")
+    assert [_delays(options) for options in session.options] == [DICTATION]
+
+    session.said("user", "sure, it's john dot smith at acme dot com")
+    assert [_delays(options) for options in session.options] == [DICTATION, NORMAL]
+
+
+def test_asking_for_contact_details_is_strict_for_the_answer(session):
+    session.said("assistant", "Great! What's the best email to reach you?")
+    assert [_delays(options) for options in session.options] == [DICTATION]
+
+    session.said("user", "john at acme dot com")
+    assert [_delays(options) for options in session.options] == [DICTATION, NORMAL]
+
+
+def test_ordinary_turns_keep_normal_delays(session):
+    session.transcribed("we need a chatbot for our website")
+    session.said("user", "we need a chatbot for our website")
+    session.said("assistant", "We build those. What does your team do today?")
+    assert session.options == []
+
+
+@pytest.mark.parametrize(
+    "text, asks",
+    [
+        ("What's your phone number?", True),
+        ("Could you share your e-mail address?", True),
+        ("Thanks, I've noted your email.", False),
+        ("We'll send the quote by email. Anything else?", False),
+    ],
+)
+def test_asks_for_contact(text, asks):
+    assert bool(ASKS_FOR_CONTACT_RE.search(text)) == asks
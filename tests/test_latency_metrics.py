@@ -0,0 +1,49 @@
+import os
+
+from prometheus_client import CollectorRegistry, multiprocess
+from prometheus_client.mmap_dict import MmapedDict, mmap_key
+
+import latency_metrics
+
+KEY = mmap_key("sylvia_test_total", "sylvia_test_total", ["outcome"], ["hit"], "Test counter")
+
+
+def _write(path, value):
+    values = MmapedDict(str(path))
+    values.write_value(KEY, value, 0.0)
+    values.close()
+
+
+def _total(metrics_dir):
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=str(metrics_dir))
+    return registry.get_sample_value("sylvia_test_total", {"outcome": "hit"})
+
+
+def test_mark_process_dead_merges_and_removes_own_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    _write(tmp_path / "counter_merged.db", 3.0)
+    _write(tmp_path / f"counter_{os.getpid()}.db", 2.0)
+    _write(tmp_path / "counter_1.db", 1.0)  # another job, still running
+    assert _total(tmp_path) == 6.0
+
+    latency_metrics.mark_process_dead()
+
+    assert not (tmp_path / f"counter_{os.getpid()}.db").exists()
+    assert (tmp_path / "counter_1.db").exists()
+    assert _total(tmp_path) == 6.0
+
+
+def test_mark_process_dead_starts_merged_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+    _write(tmp_path / f"counter_{os.getpid()}.db", 2.0)
+
+    latency_metrics.mark_process_dead()
+
+    assert sorted(p.name for p in tmp_path.glob("*.db")) == ["counter_merged.db"]
+    assert _total(tmp_path) == 2.0
+
+
+def test_mark_process_dead_without_metrics_dir(monkeypatch):
+    monkeypatch.delenv("PROMETHEUS_MULTIPROC_DIR", raising=False)
+    latency_metrics.mark_process_dead()
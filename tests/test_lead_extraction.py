@@ -0,0 +1,111 @@
+import pytest
+
+from lead_extraction import extract_email, extract_lead_fields, extract_phone
+from lead_state import LeadState
+
+
+@pytest.mark.parametrize(
+    "text, email",
+    [
+        ("it's john dot smith at acme dot com", "john.smith@acme.com"),
+        ("sure, sales at acme dot io", "sales@acme.io"),
+        ("my email is jane@acme.de", "jane@acme.de"),
+    ],
+)
+def test_spoken_email(text, email):
+    assert extract_email(text) == email
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "that's at acme dot com",
+        "that’s at acme dot com",
+        "we're at acme dot io",
+        "I'm at acme dot com right now",
+        "we met at Google dot com",
+        "we work at acme dot com",
+        "it was at acme dot com",
+    ],
+)
+def test_not_an_email(text):
+    assert extract_email(text) is None
+
+
+@pytest.mark.parametrize(
+    "text, phone",
+    [
+        ("call me at 555-0123 456", "5550123456"),
+        ("my number is +49 30 1234567", "+49301234567"),
+        ("it's (555) 012-3456", "5550123456"),
+        ("five five five, zero one two three four", "55501234"),
+        ("my phone number is 5550123456", "5550123456"),
+    ],
+)
+def test_phone(text, phone):
+    assert extract_phone(text) == phone
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "we have 1000000 customers",
+        "we did 2500000 in revenue last year",
+        "we ship about 12345678 parcels",
+        "the meeting is on 2024-05-17",
+    ],
+)
+def test_not_a_phone(text):
+    assert extract_phone(text) is None
+
+
+def test_contraction_is_not_saved_as_email():
+    fields = extract_lead_fields("Hi, I'm Sarah from Acme GmbH, that's at acme dot com")
+    assert "email" not in fields
+    assert fields["name"] == "Sarah"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Do you offer CRM Solutions for small teams?",
+        "This is Amazing",
+        "Call me Maybe",
+        "Thanks, this is Helpful",
+        "We're Currently using HubSpot",
+        "I'm Interested in a chatbot",
+    ],
+)
+def test_ordinary_speech_is_not_lead_data(text):
+    fields = extract_lead_fields(text)
+    assert "name" not in fields
+    assert "company" not in fields
+
+
+@pytest.mark.parametrize(
+    "text, name, company",
+    [
+        ("I'm John from Acme GmbH", "John", "Acme GmbH"),
+        ("My name is Sarah Miller and I work at Bright Labs", "Sarah Miller", "Bright Labs"),
+        ("this is Tom here, calling from Contoso Ltd.", "Tom", "Contoso Ltd"),
+    ],
+)
+def test_name_and_company_after_a_cue(text, name, company):
+    fields = extract_lead_fields(text)
+    assert fields["name"] == name
+    assert fields["company"] == company
+
+
+def test_transcript_fields_do_not_overwrite_the_lead():
+    lead = LeadState()
+    lead.fill(**extract_lead_fields("I'm John from Acme GmbH"))
+    for text in ["Do you offer CRM Solutions for small teams?", "This is Amazing", "I'm Jane from Globex Inc"]:
+        assert lead.fill(**extract_lead_fields(text)) == {}
+    assert lead.data["name"] == "John"
+    assert lead.data["company"] == "Acme GmbH"
+
+
+def test_update_lead_still_corrects_a_field():
+    lead = LeadState()
+    lead.fill(name="Jon")
+    assert lead.update(name="John") == {"name": "John"}
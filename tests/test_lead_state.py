@@ -0,0 +1,74 @@
+from lead_state import LeadStage, LeadState
+
+
+def _ready() -> LeadState:
+    lead = LeadState()
+    lead.update(name="Jane Doe", company="Acme", intent="chatbot for support")
+    return lead
+
+
+def test_stages_follow_the_captured_fields():
+    lead = LeadState()
+    assert lead.stage == LeadStage.COLLECTING
+    assert lead.missing_fields() == ["name", "company", "intent"]
+
+    lead.update(name="Jane Doe", company="Acme")
+    assert lead.stage == LeadStage.COLLECTING
+    assert lead.missing_fields() == ["intent"]
+
+    lead.update(intent="chatbot for support")
+    assert lead.stage == LeadStage.READY
+
+    lead.update(email="jane@acme.com")
+    assert lead.stage == LeadStage.EMAIL_PENDING_VERIFICATION
+
+    lead.confirm_email(True)
+    assert lead.stage == LeadStage.READY
+
+    lead.mark_sent()
+    assert lead.stage == LeadStage.SENT
+
+
+def test_new_email_needs_verification_again():
+    lead = _ready()
+    lead.update(email="jane@acme.com")
+    lead.confirm_email(True)
+
+    assert lead.update(email="jane.doe@acme.com") == {"email": "jane.doe@acme.com"}
+    assert lead.stage == LeadStage.EMAIL_PENDING_VERIFICATION
+
+
+def test_rejected_email_stays_pending():
+    lead = _ready()
+    lead.update(email="jane@acme.com")
+    lead.confirm_email(False)
+    assert lead.stage == LeadStage.EMAIL_PENDING_VERIFICATION
+
+
+def test_update_returns_only_changes():
+    lead = _ready()
+    assert lead.update(name=" Jane Doe ", company="", phone=None, intent="new website") == {"intent": "new website"}
+    assert lead.update(budget="10k") == {}
+
+
+def test_fill_keeps_existing_values():
+    lead = LeadState()
+    lead.update(name="Jane Doe")
+    assert lead.fill(name="Just Looking", company="Acme") == {"company": "Acme"}
+    assert lead.data["name"] == "Jane Doe"
+
+
+def test_payload_without_contact_info():
+    payload = _ready().crm_payload()
+    assert payload["email"].startswith("Not provided")
+    assert payload["phone"] == "Not provided"
+    assert payload["summary"].startswith("Lead declined to provide contact info")
+
+
+def test_payload_with_phone_only():
+    lead = _ready()
+    lead.update(phone="+49 30 1234567")
+    lead.data["conversation_summary"].append("Wants a support chatbot")
+    payload = lead.crm_payload()
+    assert payload["phone"] == "+49 30 1234567"
+    assert payload["summary"] == "Lead provided phone only (no email) | Wants a support chatbot"
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+import types
+
+import pytest
+
+import provider_registry
+
+
+def test_import_loads_no_plugins():
+    code = (
+        "import sys, agent_config, provider_registry; "
+        "print(sorted(m for m in sys.modules if m.startswith('livekit.plugins')))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_resolve_checks_names_only():
+    provider, argument = provider_registry.resolve("tts", "elevenlabs:abc123")
+    assert (provider.module, argument) == ("livekit.plugins.elevenlabs", "abc123")
+
+    with pytest.raises(ValueError, match="Unknown llm provider 'nosuch'"):
+        provider_registry.resolve("llm", "nosuch")
+
+
+def test_split_specs():
+    assert provider_registry.split_specs(" openai:gpt-4o, ,anthropic ") == ["openai:gpt-4o", "anthropic"]
+
+
+@pytest.fixture
+def fake_plugin(monkeypatch):
+    plugin = types.ModuleType("fake_tts_plugin")
+    plugin.TTS = lambda voice: ("tts", voice)
+    monkeypatch.setitem(sys.modules, "fake_tts_plugin", plugin)
+    monkeypatch.setitem(provider_registry.PROVIDERS, ("tts", "fake"), provider_registry.Provider(
+        "tts", "fake", "fake_tts_plugin", lambda plugin, voice, client: plugin.TTS(voice)
+    ))
+    monkeypatch.setitem(provider_registry.PROVIDERS, ("tts", "missing"), provider_registry.Provider(
+        "tts", "missing", "no_such_tts_plugin", lambda plugin, voice, client: None, extra="tts"
+    ))
+
+
+def test_build_imports_on_first_use(fake_plugin):
+    assert provider_registry.build("tts", "fake:nova") == ("tts", "nova")
+
+
+def test_build_missing_plugin_raises(fake_plugin):
+    with pytest.raises(ImportError):
+        provider_registry.build("tts", "missing")
+
+
+def test_preload_skips_missing_plugins(fake_plugin, caplog):
+    assert provider_registry.preload("tts", "missing,fake") == ["fake_tts_plugin"]
+    assert "uv sync --extra tts" in caplog.text
@@ -0,0 +1,159 @@
+import asyncio
+
+import pytest
+
+from livekit.agents import APIStatusError, llm, tts, utils
+from livekit.agents.types import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions
+
+from provider_router import ProviderRouter, RoutedLLM, RoutedTTS
+
+SAMPLE_RATE = 24000
+
+
+class StubLLM(llm.LLM):
+    """Replies with `text` after `delay`, or raises `error` instead."""
+
+    def __init__(self, text: str, delay: float = 0.0, error: Exception | None = None):
+        super().__init__()
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.requests = 0
+        self.cancelled = 0
+        self.closed = False
+
+    def chat(self, *, chat_ctx, tools=None, conn_options=DEFAULT_API_CONNECT_OPTIONS, **kwargs):
+        self.requests += 1
+        return _StubLLMStream(self, chat_ctx=chat_ctx, tools=tools or [], conn_options=conn_options)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class _StubLLMStream(llm.LLMStream):
+    async def _run(self) -> None:
+        stub: StubLLM = self._llm
+        try:
+            await asyncio.sleep(stub.delay)
+        except asyncio.CancelledError:
+            stub.cancelled += 1
+            raise
+        if stub.error:
+            raise stub.error
+        self._event_ch.send_nowait(
+            llm.ChatChunk(id=utils.shortuuid(), delta=llm.ChoiceDelta(role="assistant", content=stub.text))
+        )
+
+
+class StubTTS(tts.TTS):
+    """Returns `duration` seconds of audio after `delay`, or raises `error` instead."""
+
+    def __init__(self, delay: float = 0.0, error: Exception | None = None, sample_rate=SAMPLE_RATE, num_channels=1):
+        super().__init__(
+            capabilities=tts.TTSCapabilities(streaming=False), sample_rate=sample_rate, num_channels=num_channels
+        )
+        self.delay = delay
+        self.error = error
+        self.requests = 0
+        self.closed = False
+
+    def synthesize(self, text: str, *, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS):
+        self.requests += 1
+        return _StubChunkedStream(tts=self, input_text=text, conn_options=conn_options)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class _StubChunkedStream(tts.ChunkedStream):
+    async def _run(self, output_emitter: tts.AudioEmitter) -> None:
+        stub: StubTTS = self._tts
+        await asyncio.sleep(stub.delay)
+        if stub.error:
+            raise stub.error
+        output_emitter.initialize(
+            request_id=utils.shortuuid(), sample_rate=stub.sample_rate, num_channels=stub.num_channels, mime_type="audio/pcm"
+        )
+        output_emitter.push(b"\x10\x00" * (stub.sample_rate // 10) * stub.num_channels)
+        output_emitter.flush()
+
+
+async def _reply(routed: RoutedLLM) -> str:
+    chat_ctx = llm.ChatContext()
+    chat_ctx.add_message(role="user", content="hi")
+    parts = []
+    async with routed.chat(chat_ctx=chat_ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                parts.append(chunk.delta.content)
+    return "".join(parts)
+
+
+async def test_primary_answers():
+    primary, secondary = StubLLM("primary"), StubLLM("secondary")
+    routed = RoutedLLM(ProviderRouter("llm", {"a": primary, "b": secondary}, hedge_after=1.0))
+    assert await _reply(routed) == "primary"
+    assert secondary.requests == 0
+
+
+async def test_primary_failure_fails_over():
+    primary = StubLLM("primary", error=APIStatusError("down", status_code=500, retryable=False))
+    secondary = StubLLM("secondary")
+    router = ProviderRouter("llm", {"a": primary, "b": secondary}, hedge_after=1.0)
+    assert await _reply(RoutedLLM(router)) == "secondary"
+    assert router.health["a"].errors[-1] is True
+    assert router.health["b"].wins == 1
+
+
+async def test_quota_error_puts_provider_on_cooldown():
+    primary = StubLLM("primary", error=APIStatusError("no credits", status_code=402, retryable=False))
+    router = ProviderRouter("llm", {"a": primary, "b": StubLLM("secondary")}, hedge_after=1.0)
+    await _reply(RoutedLLM(router))
+    assert router.ranked() == ["b", "a"]
+
+
+async def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary, secondary = StubLLM("primary", delay=5.0), StubLLM("secondary", delay=0.01)
+    router = ProviderRouter("llm", {"a": primary, "b": secondary}, hedge_after=0.05)
+    assert await _reply(RoutedLLM(router)) == "secondary"
+    await asyncio.sleep(0)
+    assert primary.cancelled == 1
+    assert router.health["a"].hedged == 1
+    assert router.health["b"].wins == 1
+
+
+async def test_hedged_primary_still_wins_if_first():
+    primary, secondary = StubLLM("primary", delay=0.08), StubLLM("secondary", delay=5.0)
+    router = ProviderRouter("llm", {"a": primary, "b": secondary}, hedge_after=0.05)
+    assert await _reply(RoutedLLM(router)) == "primary"
+    await asyncio.sleep(0)
+    assert secondary.cancelled == 1
+
+
+async def test_all_providers_fail():
+    error = APIStatusError("down", status_code=500, retryable=False)
+    routed = RoutedLLM(ProviderRouter("llm", {"a": StubLLM("a", error=error), "b": StubLLM("b", error=error)}, hedge_after=1.0))
+    with pytest.raises(Exception):
+        await _reply(routed)
+
+
+async def test_tts_failover_resamples_to_primary_rate():
+    primary = StubTTS(error=APIStatusError("no credits", status_code=402, retryable=False))
+    secondary = StubTTS(sample_rate=16000)
+    routed = RoutedTTS(ProviderRouter("tts", {"a": primary, "b": secondary}, hedge_after=1.0))
+    audio = await routed.synthesize("hello").collect()
+    assert audio.sample_rate == SAMPLE_RATE
+    assert secondary.requests == 1
+
+
+def test_tts_channel_mismatch_is_rejected():
+    with pytest.raises(ValueError):
+        RoutedTTS(ProviderRouter("tts", {"a": StubTTS(), "b": StubTTS(num_channels=2)}, hedge_after=1.0))
+
+
+async def test_aclose_closes_every_provider():
+    llms = {"a": StubLLM("a"), "b": StubLLM("b")}
+    ttses = {"a": StubTTS(), "b": StubTTS()}
+    await RoutedLLM(ProviderRouter("llm", llms, hedge_after=1.0)).aclose()
+    await RoutedTTS(ProviderRouter("tts", ttses, hedge_after=1.0)).aclose()
+    assert all(provider.closed for provider in [*llms.values(), *ttses.values()])
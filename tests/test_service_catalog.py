@@ -0,0 +1,59 @@
+import pytest
+
+from service_catalog import CatalogEntry, CatalogIndex, tokenize
+
+
+@pytest.fixture
+def index():
+    return CatalogIndex([
+        CatalogEntry("automation", "service", "Workflow Automation", "We automate repetitive manual work.", ["n8n", "zapier"]),
+        CatalogEntry("voice", "service", "Voice AI Agents", "Agents that answer phone calls.", ["receptionist"]),
+        CatalogEntry("web", "service", "Website Development", "Fast websites that convert visitors.", ["landing page"]),
+        CatalogEntry("contact", "faq", "How can I get started?", "Email us to book a consultation.", ["demo"]),
+    ])
+
+
+def test_tokenize_stems_and_drops_stopwords():
+    assert tokenize("Can you automate our invoicing?") == tokenize("automation invoices")
+    assert tokenize("What does Synctrack do for us?") == []
+
+
+@pytest.mark.parametrize(
+    "query, best",
+    [
+        ("Do you build websites?", "web"),
+        ("an agent that answers our phone calls", "voice"),
+        ("we're drowning in manual work, can you automate it", "automation"),
+        ("do you use zapier", "automation"),
+        ("I'd like a demo", "contact"),
+    ],
+)
+def test_best_match(index, query, best):
+    assert index.search(query)[0].id == best
+
+
+def test_title_outweighs_body(index):
+    index = CatalogIndex(index.entries + [
+        CatalogEntry("blog", "faq", "Do you write blog posts?", "Our websites include a blog."),
+    ])
+    assert [entry.id for entry in index.search("website")][:2] == ["web", "blog"]
+
+
+def test_unrelated_query_finds_nothing(index):
+    assert index.search("what's the weather tomorrow") == []
+
+
+def test_results_are_capped_and_cut_off(index):
+    assert len(index.search("voice agents phone website automation demo", top_k=2)) == 2
+    # "agents" alone is a strong match for one entry; weak ones are dropped
+    assert [entry.id for entry in index.search("voice agents")] == ["voice"]
+
+
+def test_services(index):
+    assert [entry.id for entry in index.services()] == ["automation", "voice", "web"]
+
+
+def test_shipped_catalog_loads():
+    index = CatalogIndex.load("service_catalog.json")
+    assert index.search("voice agent for phone calls")[0].id == "voice-ai-agents"
+    assert index.services()
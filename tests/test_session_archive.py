@@ -0,0 +1,49 @@
+import glob
+import os
+import time
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+import session_archive  # noqa: E402
+
+
+async def _record_call(directory, session, ts, rows=3):
+    writer = session_archive.ArchiveWriter(directory)
+    writer.start()
+    for turn in range(rows):
+        writer.append(session, "user", turn=turn, text=f"turn {turn}", ts=ts)
+    await writer.aclose()
+
+
+def _files(directory):
+    return glob.glob(os.path.join(directory, "date=*", f"*{session_archive.SUFFIX}"))
+
+
+async def test_rows_round_trip(tmp_path):
+    await _record_call(str(tmp_path), "room-1", time.time())
+    table = session_archive.read_archive(str(tmp_path))
+    assert table.num_rows == 3
+    assert table["text"].to_pylist() == ["turn 0", "turn 1", "turn 2"]
+
+
+async def test_finished_day_is_merged_into_one_file(tmp_path):
+    ts = time.time() - 3 * 86400
+    for i in range(4):
+        await _record_call(str(tmp_path), f"room-{i}", ts)
+    for path in _files(str(tmp_path)):
+        os.utime(path, (ts, ts))
+
+    assert len(session_archive.compact_finished_days(str(tmp_path))) == 1
+    assert len(_files(str(tmp_path))) == 1
+    table = session_archive.read_archive(str(tmp_path))
+    assert table.num_rows == 12
+    assert sorted(set(table["session"].to_pylist())) == ["room-0", "room-1", "room-2", "room-3"]
+
+
+async def test_today_is_not_merged(tmp_path):
+    for i in range(2):
+        await _record_call(str(tmp_path), f"room-{i}", time.time())
+    assert session_archive.compact_finished_days(str(tmp_path)) == []
+    assert len(_files(str(tmp_path))) == 2
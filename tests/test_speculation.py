@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from livekit.agents import ModelSettings, llm
+
+from speculation import SpeculativeReplies, normalize_transcript
+
+REPLY = ["Sure, ", "we build chatbots ", "for support teams."]
+
+
+class FakeSession:
+    def __init__(self):
+        self.handlers = {}
+        self.agent_state = "listening"
+
+    def on(self, event, callback):
+        self.handlers[event] = callback
+
+    def transcribed(self, transcript: str, is_final: bool = True) -> None:
+        self.handlers["user_input_transcribed"](SimpleNamespace(transcript=transcript, is_final=is_final))
+
+
+@pytest.fixture
+def agent():
+    chat_ctx = llm.ChatContext.empty()
+    chat_ctx.add_message(role="system", content="You are Sylvia.")
+    chat_ctx.add_message(role="assistant", content="Hi, how can I help?")
+    return SimpleNamespace(chat_ctx=chat_ctx, tools=[], generated=[])
+
+
+@pytest.fixture
+def speculation(agent):
+    async def generate(chat_ctx, tools, model_settings):
+        agent.generated.append(chat_ctx.items[-1].text_content)
+        for part in REPLY:
+            yield part
+
+    return SpeculativeReplies(agent, generate)
+
+
+def _committed(agent, transcript: str) -> llm.ChatContext:
+    chat_ctx = agent.chat_ctx.copy()
+    chat_ctx.add_message(role="user", content=transcript)
+    return chat_ctx
+
+
+async def _collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
+
+
+async def test_matching_turn_uses_the_draft(agent, speculation):
+    speculation.speculate("Do you build chatbots?")
+    await asyncio.sleep(0)
+
+    draft = speculation.take(_committed(agent, "do you build chatbots"), [], ModelSettings())
+    assert await _collect(draft) == REPLY
+    assert speculation.stats.hits == 1
+    assert speculation.stats.wasted_completion_tokens == 0
+
+
+async def test_different_transcript_is_a_miss(agent, speculation):
+    speculation.speculate("Do you build chatbots?")
+    await asyncio.sleep(0)
+
+    assert speculation.take(_committed(agent, "Do you build chatbots for Slack?"), [], ModelSettings()) is None
+    assert speculation.stats.misses == 1
+    assert speculation.stats.wasted_prompt_tokens > 0
+
+
+async def test_changed_context_is_a_miss(agent, speculation):
+    speculation.speculate("Do you build chatbots?")
+    agent.chat_ctx.add_message(role="system", content="Pre-filled company from the visitor's last message.")
+
+    assert speculation.take(_committed(agent, "Do you build chatbots?"), [], ModelSettings()) is None
+    assert speculation.stats.misses == 1
+
+
+async def test_tool_follow_up_leaves_the_draft_pending(agent, speculation):
+    speculation.speculate("Do you build chatbots?")
+    chat_ctx = _committed(agent, "Do you build chatbots?")
+    chat_ctx.items.append(llm.FunctionCall(call_id="1", name="lookup_services", arguments="{}"))
+
+    assert speculation.take(chat_ctx, [], ModelSettings()) is None
+    assert speculation.stats.as_dict()["misses"] == 0
+    assert speculation.take(_committed(agent, "Do you build chatbots?"), [], ModelSettings()) is not None
+
+
+async def test_new_segments_replace_the_draft(agent, speculation):
+    session = FakeSession()
+    speculation.attach(session)
+
+    session.transcribed("We need", is_final=False)
+    session.transcribed("We need a chatbot.")
+    await asyncio.sleep(0)
+    session.transcribed("For our shop.")
+    await asyncio.sleep(0)
+    assert agent.generated == ["We need a chatbot.", "We need a chatbot. For our shop."]
+    assert speculation.stats.cancelled == 1
+
+    # Same transcript, different punctuation: the running draft is kept
+    speculation.speculate("we need a chatbot for our shop")
+    assert len(agent.generated) == 2
+
+
+async def test_no_draft_while_sylvia_is_speaking(agent, speculation):
+    session = FakeSession()
+    speculation.attach(session)
+    session.agent_state = "speaking"
+
+    session.transcribed("Wait, one more thing.")
+    assert agent.generated == []
+
+
+def test_normalize_transcript():
+    assert normalize_transcript("  It's  John@Acme.com!") == normalize_transcript("it s john@acme com")
@@ -0,0 +1,23 @@
+import asyncio
+import os
+
+from worker_load import JobLoadReporter, WorkerLoad
+
+
+async def test_reporter_publishes_stats_and_removes_its_file(tmp_path):
+    reporter = JobLoadReporter(str(tmp_path), interval=0.01)
+    reporter.start()
+    await asyncio.sleep(0.05)
+
+    stats = WorkerLoad(str(tmp_path), load_threshold=0.7).read_job_stats()
+    assert len(stats) == 1
+
+    await reporter.aclose()
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_reporter_close_tolerates_removed_file(tmp_path):
+    reporter = JobLoadReporter(str(tmp_path), interval=0.01)
+    reporter.start()
+    os.unlink(tmp_path / f"job-{os.getpid()}.stats")
+    await reporter.aclose()
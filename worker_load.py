@@ -0,0 +1,179 @@
+"""
+Worker Load - Admission control and idle-process sizing from real job load
+==========================================================================
+Every call runs Silero VAD and audio processing on the CPU of its job process, so
+a host should stop accepting calls before audio starts to stutter - not when the
+machine as a whole hits an arbitrary CPU percentage.
+
+Each job process runs a JobLoadReporter that measures its own CPU use and asyncio
+event-loop lag and publishes them to a small per-process stats file. In the main
+worker process, WorkerLoad is the WorkerOptions.load_fnc: it reports
+
+    max(host CPU + CPU of one more average job,  threshold * worst loop lag / lag budget)
+
+so the worker is marked full when the next call wouldn't fit, or as soon as any
+running call's event loop falls behind its lag budget. It also sizes the pool of
+prewarmed idle processes to the recent job arrival rate.
+"""
+
+from collections import deque
+import asyncio
+import glob
+import logging
+import math
+import os
+import struct
+import time
+
+import psutil
+
+from livekit.agents import Worker
+
+logger = logging.getLogger(__name__)
+
+# updated_at, loop lag (s), CPU (fraction of one core)
+_STATS = struct.Struct("ddd")
+
+# Stats older than this belong to a job that exited without cleaning up
+STALE_AFTER = 5.0
+
+# Arrivals older than this don't count towards the arrival rate
+ARRIVAL_WINDOW = 120.0
+
+
+class JobLoadReporter:
+    """Publishes this job process's event-loop lag and CPU use for the main worker process."""
+
+    def __init__(self, directory: str, interval: float = 0.25, smoothing: float = 0.3):
+        self.directory = directory
+        self.interval = interval
+        self.smoothing = smoothing
+        self.lag = 0.0
+        self.cpu = 0.0
+        self._path = os.path.join(directory, f"job-{os.getpid()}.stats")
+        self._fd: int | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            try:
+                os.unlink(self._path)
+            except FileNotFoundError:
+                pass  # The directory was cleaned up under us
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_wall, last_cpu = time.monotonic(), time.process_time()
+        while True:
+            scheduled = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - scheduled)
+
+            # process_time() covers every thread, including VAD inference
+            wall, cpu = time.monotonic(), time.process_time()
+            cpu_share = (cpu - last_cpu) / max(wall - last_wall, 1e-6)
+            last_wall, last_cpu = wall, cpu
+
+            # React to spikes right away, decay slowly
+            self.lag = lag if lag > self.lag else self.lag + self.smoothing * (lag - self.lag)
+            self.cpu += self.smoothing * (cpu_share - self.cpu)
+            os.pwrite(self._fd, _STATS.pack(time.time(), self.lag, self.cpu), 0)
+
+
+class WorkerLoad:
+    """load_fnc for WorkerOptions, built from the stats the job processes publish."""
+
+    def __init__(
+        self,
+        directory: str,
+        load_threshold: float,
+        lag_budget: float = 0.05,
+        min_idle_processes: int = 1,
+        max_idle_processes: int = 4,
+        process_warmup: float = 8.0,
+    ):
+        self.directory = directory
+        self.load_threshold = load_threshold
+        self.lag_budget = lag_budget
+        self.min_idle_processes = min_idle_processes
+        self.max_idle_processes = max_idle_processes
+        self.process_warmup = process_warmup
+
+        self._cpu_count = psutil.cpu_count() or 1
+        self._host_cpu: deque[float] = deque(maxlen=5)  # ~2.5s at the worker's 0.5s polling
+        self._arrivals: deque[float] = deque()
+        self._known_jobs: set[str] = set()
+        self._idle_target = max_idle_processes
+
+    def read_job_stats(self) -> list[tuple[float, float]]:
+        """(loop lag, CPU share of the host) for every running job process."""
+        stats = []
+        now = time.time()
+        for path in glob.glob(os.path.join(self.directory, "job-*.stats")):
+            try:
+                with open(path, "rb") as f:
+                    updated_at, lag, cpu = _STATS.unpack(f.read(_STATS.size))
+            except (OSError, struct.error):
+                continue
+            if now - updated_at > STALE_AFTER:
+                continue
+            stats.append((lag, cpu / self._cpu_count))
+        return stats
+
+    def arrival_rate(self) -> float:
+        """Jobs per second over the arrival window."""
+        cutoff = time.monotonic() - ARRIVAL_WINDOW
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+        return len(self._arrivals) / ARRIVAL_WINDOW
+
+    def __call__(self, worker: Worker) -> float:
+        # Runs every 0.5s on an executor thread of the main worker process
+        self._track_arrivals(worker)
+        self._host_cpu.append(psutil.cpu_percent() / 100)
+        host_cpu = sum(self._host_cpu) / len(self._host_cpu)
+
+        jobs = self.read_job_stats()
+        per_job_cpu = sum(cpu for _, cpu in jobs) / len(jobs) if jobs else 0.0
+        worst_lag = max((lag for lag, _ in jobs), default=0.0)
+
+        cpu_load = host_cpu + per_job_cpu  # Would one more call still fit?
+        lag_load = self.load_threshold * worst_lag / self.lag_budget
+        load = min(1.0, max(cpu_load, lag_load))
+
+        self._size_idle_pool(worker)
+        return load
+
+    def _track_arrivals(self, worker: Worker) -> None:
+        running = {job.job.id for job in worker.active_jobs}
+        now = time.monotonic()
+        self._arrivals.extend(now for _ in running - self._known_jobs)
+        self._known_jobs = running
+
+    def _size_idle_pool(self, worker: Worker) -> None:
+        # Enough warm processes to cover the calls that arrive while a replacement warms up
+        target = math.ceil(self.arrival_rate() * self.process_warmup) + self.min_idle_processes
+        target = min(self.max_idle_processes, target)
+        if target != self._idle_target:
+            logger.info("Idle process target: %s -> %s (%.1f jobs/min)", self._idle_target, target, self.arrival_rate() * 60)
+            self._idle_target = target
+
+        # The worker re-reads this after every load_fnc call and caps the pool's target with it
+        # (the pool itself never grows beyond the num_idle_processes it was created with).
+        # _opts is private to livekit-agents; pyproject.toml pins it <1.3, re-check this
+        # before moving the pin
+        worker._opts.num_idle_processes = target